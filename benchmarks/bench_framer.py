@@ -0,0 +1,101 @@
+"""
+Microbenchmark comparing the byte-by-byte header scan previously used by
+AbstractPrecilaserDevice._read_single_message with the buffered PrecilaserFramer.
+
+Run with `python benchmarks/bench_framer.py [number of frames]`.
+"""
+
+import sys
+import time
+
+import precilaser.device
+from precilaser.amplifier import Amplifier
+from precilaser.enums import PrecilaserMessageType, PrecilaserReturn
+from precilaser.message import (
+    PrecilaserMessage,
+    PrecilaserReturnParamLength,
+    decompose_message,
+)
+
+
+class FakeSerial:
+    """Minimal stand-in for serial.Serial with a static rx buffer."""
+
+    def __init__(self, rx: bytes = b"", **kwargs):
+        self._rx = bytearray(rx)
+        self.reads = 0
+
+    def read(self, n: int = 1) -> bytes:
+        self.reads += 1
+        chunk = bytes(self._rx[:n])
+        del self._rx[:n]
+        return chunk
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def close(self) -> None:
+        pass
+
+
+def read_exact(dev: Amplifier, n: int) -> bytes:
+    """The previous AbstractPrecilaserDevice._read_exact, raising on a short read."""
+    data = dev.instrument.read(n)
+    if len(data) < n:
+        raise TimeoutError(f"expected {n} bytes, received {len(data)}")
+    return data
+
+
+def byte_by_byte_read(dev: Amplifier) -> PrecilaserMessage:
+    """The previous implementation of _read_single_message."""
+    while True:
+        msg = dev.instrument.read(1)
+        if len(msg) == 0:
+            raise TimeoutError("no data received from device")
+        if msg != dev.header:
+            continue
+        msg += read_exact(dev, 2)
+        if msg != dev.header + b"\x00" + dev.address.to_bytes(1, dev.endian):
+            continue
+        msg += read_exact(dev, 2)
+        msg += read_exact(dev, msg[-1] + 4)
+        return decompose_message(msg, dev.address, dev.header, dev.terminator, "big")
+
+
+def status_stream(nframes: int) -> bytes:
+    frame = PrecilaserMessage(
+        command=PrecilaserReturn.AMP_STATUS,
+        address=0,
+        payload=bytes(range(PrecilaserReturnParamLength.AMP_STATUS)),
+        type=PrecilaserMessageType.RETURN,
+    ).command_bytes
+    # a few garbage bytes between frames to exercise resynchronization
+    return (bytes(frame) + b"\x00\xff") * nframes
+
+
+def run(nframes: int) -> None:
+    stream = status_stream(nframes)
+    for name, read in [
+        ("byte-by-byte", byte_by_byte_read),
+        ("framer", lambda dev: dev._read_single_message()),
+    ]:
+        fake = FakeSerial(stream)
+        precilaser.device.serial.Serial = lambda **kw: fake
+        dev = Amplifier(port="BENCH", address=0)
+        tstart = time.perf_counter()
+        for _ in range(nframes):
+            read(dev)
+        dt = time.perf_counter() - tstart
+        print(
+            f"{name:>14}: {nframes / dt:>10.0f} frames/s,"
+            f" {dt / nframes * 1e6:.2f} us/frame,"
+            f" {fake.reads / nframes:.2f} reads/frame"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
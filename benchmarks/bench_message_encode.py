@@ -0,0 +1,97 @@
+"""
+Benchmark of PrecilaserMessage encoding, comparing the previous PrecilaserMessage,
+which concatenated the frame byte by byte, with the current PrecilaserMessage and the
+compiled frame templates it uses, for a piezo voltage sweep
+(SEED_SET_VOLTAGE commands as sent by Seed.piezo_voltage).
+
+Run with `python benchmarks/bench_message_encode.py [number of frames]`.
+"""
+
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+from precilaser.check import checksum, xor_check
+from precilaser.enums import (
+    Endian,
+    PrecilaserCommand,
+    PrecilaserMessageType,
+    PrecilaserReturn,
+)
+from precilaser.message import (
+    PrecilaserCommandParamLength,
+    PrecilaserMessage,
+    PrecilaserReturnParamLength,
+    frame_template,
+)
+
+
+@dataclass(frozen=True)
+class PreviousPrecilaserMessage:
+    """The previous PrecilaserMessage, encoding by concatenation in __post_init__."""
+
+    command: Union[PrecilaserCommand, PrecilaserReturn]
+    address: int
+    payload: Optional[bytes] = None
+    header: bytes = field(default=b"P", repr=False)
+    terminator: bytes = field(default=b"\r\n", repr=False)
+    endian: Endian = field(default="big", repr=False)
+    type: PrecilaserMessageType = PrecilaserMessageType.COMMAND
+    command_bytes: bytearray = field(init=False)
+    checksum: int = field(init=False)
+    xor_check: int = field(init=False)
+
+    def __post_init__(self):
+        command_bytes = b""
+        command_bytes += self.header
+        command_bytes += b"\x00"
+        command_bytes += self.address.to_bytes(1, self.endian)
+        command_bytes += self.command.value
+
+        if self.type == PrecilaserMessageType.COMMAND:
+            param_byte_length = getattr(PrecilaserCommandParamLength, self.command.name)
+        else:
+            param_byte_length = getattr(PrecilaserReturnParamLength, self.command.name)
+
+        command_bytes += param_byte_length.to_bytes(1, self.endian)
+        if self.payload is not None:
+            command_bytes += self.payload
+
+        sum = checksum(command_bytes[1:])
+        xor = xor_check(command_bytes[1:])
+
+        command_bytes += sum.to_bytes(1, self.endian)
+        command_bytes += xor.to_bytes(1, self.endian)
+        command_bytes += self.terminator
+        object.__setattr__(self, "command_bytes", command_bytes)
+        object.__setattr__(self, "checksum", sum)
+        object.__setattr__(self, "xor_check", xor)
+
+
+def run(nframes: int) -> None:
+    command = PrecilaserCommand.SEED_SET_VOLTAGE
+    payloads = [
+        (voltage % 7400).to_bytes(2, "big") + b"0" for voltage in range(nframes)
+    ]
+    template = frame_template(
+        command, 100, b"P", b"\r\n", "big", PrecilaserMessageType.COMMAND
+    )
+    for payload in payloads[:100]:
+        previous = PreviousPrecilaserMessage(command, 100, payload).command_bytes
+        assert previous == template.encode(payload)[0]
+
+    for name, encode in [
+        ("previous", lambda payload: PreviousPrecilaserMessage(command, 100, payload)),
+        ("message", lambda payload: PrecilaserMessage(command, 100, payload)),
+        ("template", template.encode),
+    ]:
+        tstart = time.perf_counter()
+        for payload in payloads:
+            encode(payload)
+        dt = time.perf_counter() - tstart
+        print(f"{name:>14}: {nframes / dt:>10.0f} frames/s")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,36 @@
+"""
+Benchmark of an SHG temperature scan against the simulator in virtual time: each
+point sets the SHG temperature and waits with wait_until_shg_temperature_stable, as
+in examples/shg_temperature_scan.py. Reports the simulated and the wall-clock time.
+
+Run with `python benchmarks/bench_sim_scan.py [number of points]`.
+"""
+
+import sys
+import time
+
+from precilaser import PrecilaserBus
+from precilaser.sim import SimulatedSerial, SimulatedSHGAmplifier, VirtualClock
+from precilaser.utils import wait_until_shg_temperature_stable
+
+
+def run(points: int) -> None:
+    clock = VirtualClock()
+    sim = SimulatedSerial(
+        [SimulatedSHGAmplifier(temperature_noise=0.003, time_constant=5.0)],
+        clock=clock,
+    )
+    amp = PrecilaserBus(sim).shg_amplifier(0)
+
+    tstart = time.perf_counter()
+    with clock.patch():
+        for point in range(points):
+            temperature = 38.0 + 4.0 * point / max(points - 1, 1)
+            amp.shg_temperature = temperature
+            wait_until_shg_temperature_stable(amp, temperature, time_stable=2)
+    dt = time.perf_counter() - tstart
+    print(f"{points} points: {clock.monotonic():>8.1f} s simulated, {dt:>6.2f} s wall")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 101)
@@ -0,0 +1,79 @@
+"""
+Benchmark of decoding recorded amplifier status frames into AmplifierStatus, either
+only reading driver_current or reading all fields, plus the memory retained when
+keeping the decoded statuses.
+
+Run with `python benchmarks/bench_status_decode.py [number of frames]`.
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from precilaser.enums import PrecilaserMessageType, PrecilaserReturn
+from precilaser.message import (
+    PrecilaserMessage,
+    PrecilaserReturnParamLength,
+    decode_message,
+)
+from precilaser.status import AmplifierStatus
+
+FIELDS = [
+    "stable",
+    "system_status",
+    "driver_unlock",
+    "driver_current",
+    "pd_value",
+    "pd_status",
+    "temperatures",
+]
+
+
+def recorded_payloads(nframes: int, nunique: int = 1_000) -> list:
+    """Payloads of received status frames, as views into the received frames."""
+    rng = random.Random(0)
+    frames = [
+        PrecilaserMessage(
+            PrecilaserReturn.AMP_STATUS,
+            address=0,
+            payload=rng.randbytes(PrecilaserReturnParamLength.AMP_STATUS),
+            type=PrecilaserMessageType.RETURN,
+        ).command_bytes
+        for _ in range(nunique)
+    ]
+    payloads = [
+        decode_message(frame, 0, b"P", b"\r\n", "big").payload for frame in frames
+    ]
+    return [payloads[i % nunique] for i in range(nframes)]
+
+
+def run(nframes: int) -> None:
+    payloads = recorded_payloads(nframes)
+
+    tstart = time.perf_counter()
+    for payload in payloads:
+        AmplifierStatus(payload).driver_current
+    dt = time.perf_counter() - tstart
+    print(f"driver_current only: {dt:>6.2f} s, {nframes / dt:>9.0f} frames/s")
+
+    tstart = time.perf_counter()
+    for payload in payloads:
+        status = AmplifierStatus(payload)
+        for field in FIELDS:
+            getattr(status, field)
+    dt = time.perf_counter() - tstart
+    print(f"all fields:          {dt:>6.2f} s, {nframes / dt:>9.0f} frames/s")
+
+    nkeep = min(nframes, 100_000)
+    tracemalloc.start()
+    statuses = [AmplifierStatus(payload) for payload in payloads[:nkeep]]
+    for status in statuses:
+        status.driver_current
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"memory retained:     {size / nkeep:>6.0f} bytes/status")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
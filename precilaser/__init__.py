@@ -1,4 +1,14 @@
+from .aio import AsyncAmplifier, AsyncSeed, AsyncSHGAmplifier
 from .amplifier import Amplifier, SHGAmplifier
+from .bus import PrecilaserBus
 from .seed import Seed
 
-__all__ = ["Seed", "Amplifier", "SHGAmplifier"]
+__all__ = [
+    "Seed",
+    "Amplifier",
+    "SHGAmplifier",
+    "AsyncSeed",
+    "AsyncAmplifier",
+    "AsyncSHGAmplifier",
+    "PrecilaserBus",
+]
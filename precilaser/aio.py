@@ -0,0 +1,755 @@
+import asyncio
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Optional, Self, Tuple, Union
+
+import serial
+
+from .amplifier import status_handler, temperature_handler
+from .cache import WavelengthParamCache
+from .enums import (
+    Endian,
+    PrecilaserCommand,
+    PrecilaserDeviceType,
+    PrecilaserMessageType,
+    PrecilaserReturn,
+)
+from .framer import PrecilaserFramer
+from .message import PrecilaserFrame, PrecilaserMessage, decode_message
+from .seed import cached_wavelength_params, serial_wavelength_handler
+from .seed import status_handler as seed_status_handler
+from .status import AmplifierStatus, SeedStatus
+from .wavelength import WavelengthCalibration
+
+# asyncio counterparts of Seed, Amplifier and SHGAmplifier. Each device runs a reader
+# task that drains its transport, handles the periodic status messages as they arrive
+# and delivers replies to the coroutines waiting for them, so many devices can share
+# one event loop without blocking it.
+
+
+class AsyncTransport(ABC):
+    """Byte transport used by the asyncio Precilaser devices."""
+
+    @abstractmethod
+    async def read(self) -> bytes:
+        """
+        Wait for and return received bytes
+
+        Raises:
+            ConnectionError: if the transport is closed
+
+        Returns:
+            bytes: at least one received byte
+        """
+
+    @abstractmethod
+    async def write(self, data: bytes) -> None:
+        """
+        Write bytes to the device
+
+        Args:
+            data (bytes): bytes to write
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Close the transport."""
+
+
+class SerialTransport(AsyncTransport):
+    def __init__(self, port: str, baudrate: int = 115200, poll_interval: float = 0.005):
+        """
+        Non-blocking asyncio transport for a serial port. On POSIX systems the event
+        loop is notified when the port becomes readable; elsewhere the port is polled
+        every poll_interval seconds.
+
+        Args:
+            port (str): serial port, e.g. "COM6" or "/dev/ttyUSB0"
+            baudrate (int): baud rate. Defaults to 115200.
+            poll_interval (float): polling interval [s] when the port can't be
+                                    watched by the event loop. Defaults to 5 ms.
+        """
+        # timeout=0 makes reads non-blocking
+        self.instrument = serial.Serial(port=port, baudrate=baudrate, timeout=0)
+        self.poll_interval = poll_interval
+
+    async def _wait_readable(self) -> None:
+        if os.name != "posix":
+            await asyncio.sleep(self.poll_interval)
+            return
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = self.instrument.fileno()
+
+        def set_readable() -> None:
+            if not readable.done():
+                readable.set_result(None)
+
+        loop.add_reader(fd, set_readable)
+        try:
+            await readable
+        finally:
+            loop.remove_reader(fd)
+
+    async def read(self) -> bytes:
+        while True:
+            if not self.instrument.is_open:
+                raise ConnectionError("serial port closed")
+            data = self.instrument.read(max(1, self.instrument.in_waiting))
+            if len(data) > 0:
+                return data
+            await self._wait_readable()
+
+    async def write(self, data: bytes) -> None:
+        self.instrument.write(data)
+
+    async def close(self) -> None:
+        self.instrument.close()
+
+
+class LoopbackTransport(AsyncTransport):
+    def __init__(self, responder: Optional[Callable[[bytes], Optional[bytes]]] = None):
+        """
+        In-memory transport for testing the asyncio devices without hardware. Bytes
+        passed to feed are returned by read, and written bytes are collected in
+        written.
+
+        Args:
+            responder (Optional[Callable[[bytes], Optional[bytes]]]): called with
+                every written frame, the returned bytes (if any) are fed back as the
+                device reply. Defaults to None.
+        """
+        self.responder = responder
+        self.written = bytearray()
+        self._rx = bytearray()
+        self._data = asyncio.Event()
+        self._closed = False
+
+    def feed(self, data: bytes) -> None:
+        """
+        Make bytes available for reading, as if sent by the device
+
+        Args:
+            data (bytes): bytes sent by the device
+        """
+        self._rx += data
+        self._data.set()
+
+    async def read(self) -> bytes:
+        while len(self._rx) == 0:
+            if self._closed:
+                raise ConnectionError("loopback transport closed")
+            self._data.clear()
+            await self._data.wait()
+        data = bytes(self._rx)
+        self._rx.clear()
+        return data
+
+    async def write(self, data: bytes) -> None:
+        self.written += data
+        if self.responder is not None:
+            reply = self.responder(data)
+            if reply is not None:
+                self.feed(reply)
+
+    async def close(self) -> None:
+        self._closed = True
+        self._data.set()
+
+
+class AsyncPrecilaserDevice(ABC):
+    def __init__(
+        self,
+        transport: AsyncTransport,
+        address: int,
+        header: bytes,
+        terminator: bytes,
+        device_type: PrecilaserDeviceType,
+        endian: Endian,
+        timeout: float = 1.0,
+    ):
+        """
+        Generic asyncio Precilaser device interface
+
+        Args:
+            transport (AsyncTransport): byte transport to the device
+            address (int): device address
+            header (bytes): message header
+            terminator (bytes): message terminator
+            device_type (PrecilaserDeviceType): device type
+            endian (str): endian of message payload
+            timeout (float): reply timeout [s]. Defaults to 1.0 s.
+        """
+        self.transport = transport
+
+        self.address = address
+        self.header = header
+        self.terminator = terminator
+        self.device_type = device_type
+        self.endian = endian
+        self.timeout = timeout
+
+        self._framer = PrecilaserFramer(address, header, terminator, endian)
+
+        # dict with return types that require message handling; the tuple for each
+        # return type includes the attr to write to and the transformation function
+        self._message_handling: dict[PrecilaserReturn, tuple[str, Callable]] = {}
+        # monotonic time at which the last message of each return type was received
+        self._timestamps: dict[PrecilaserReturn, float] = {}
+
+        # futures waiting for the next message of each return type, in order
+        self._replies: dict[PrecilaserReturn, deque[asyncio.Future]] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    @classmethod
+    def open(cls, port: str, address: int, **kwargs) -> Self:
+        """
+        Connect to a device on a serial port
+
+        Args:
+            port (str): serial port, e.g. "COM6" or "/dev/ttyUSB0"
+            address (int): device address
+            **kwargs: additional device arguments, e.g. timeout
+
+        Returns:
+            device interface
+        """
+        return cls(SerialTransport(port), address, **kwargs)  # type: ignore[call-arg]
+
+    def _handle_message(self, message: PrecilaserFrame) -> PrecilaserFrame:
+        """
+        message handling function, see AbstractPrecilaserDevice._handle_message
+
+        Args:
+            message (PrecilaserFrame): message
+
+        Raises:
+            ValueError: raises if the message payload is empty
+
+        Returns:
+            PrecilaserFrame: message
+        """
+        for ret_cmd, (attr, transform) in self._message_handling.items():
+            if message.command == ret_cmd:
+                if message.payload is not None:
+                    setattr(self, attr, transform(message))
+                else:
+                    raise ValueError(f"{ret_cmd.name} no data bytes retrieved")
+        self._timestamps[message.command] = time.monotonic()
+        return message
+
+    def _resolve_reply(self, message: PrecilaserFrame) -> None:
+        pending = self._replies.get(message.command)
+        while pending:
+            future = pending.popleft()
+            # skip futures of callers that timed out or were cancelled
+            if not future.done():
+                future.set_result(message)
+                return
+
+    async def _reader_loop(self) -> None:
+        while True:
+            data = await self.transport.read()
+            self._framer.feed(data)
+            for frame in self._framer.frames():
+                try:
+                    # the framer only yields frames with valid checks
+                    message = decode_message(
+                        frame,
+                        self.address,
+                        self.header,
+                        self.terminator,
+                        self.endian,
+                        verify=False,
+                    )
+                    self._handle_message(message)
+                except ValueError:
+                    # corrupted or empty message; continue with the next frame
+                    continue
+                self._resolve_reply(message)
+
+    def _ensure_reader(self) -> None:
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.get_running_loop().create_task(self._reader_loop())
+
+    async def start(self) -> None:
+        """Start the reader task that drains the transport."""
+        self._ensure_reader()
+
+    async def close(self) -> None:
+        """Stop the reader task and close the transport."""
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except (asyncio.CancelledError, ConnectionError):
+                pass
+            self._reader = None
+        await self.transport.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _expect_reply(self, return_command: PrecilaserReturn) -> asyncio.Future:
+        self._ensure_reader()
+        future = asyncio.get_running_loop().create_future()
+        self._replies.setdefault(return_command, deque()).append(future)
+        return future
+
+    async def _wait_for_reply(
+        self, return_command: PrecilaserReturn, future: asyncio.Future
+    ) -> PrecilaserFrame:
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except TimeoutError:
+            raise TimeoutError(f"no {return_command.name} reply received from device")
+
+    async def _read_until_reply(
+        self, return_command: PrecilaserReturn
+    ) -> PrecilaserFrame:
+        """
+        Wait for the next message with the return code matching return_command
+
+        Args:
+            return_command (PrecilaserReturn): message command to wait for
+
+        Returns:
+            PrecilaserFrame: Message matching the return command
+        """
+        return await self._wait_for_reply(
+            return_command, self._expect_reply(return_command)
+        )
+
+    async def _query(
+        self, message: PrecilaserMessage, return_command: PrecilaserReturn
+    ) -> PrecilaserFrame:
+        """
+        Write a message to the device and wait for the reply
+
+        Args:
+            message (PrecilaserMessage): message
+            return_command (PrecilaserReturn): return code of the reply
+
+        Returns:
+            PrecilaserFrame: reply
+        """
+        future = self._expect_reply(return_command)
+        await self.transport.write(bytes(message.command_bytes))
+        return await self._wait_for_reply(return_command, future)
+
+    def _check_write_return(
+        self,
+        data: Union[bytes, memoryview],
+        value: int,
+        value_name: Optional[str] = None,
+    ):
+        if int.from_bytes(data, self.endian) != value:
+            error_str = (
+                f"not set to requested value: {value} !="
+                f" {int.from_bytes(data, self.endian)}"
+            )
+            if value_name is not None:
+                error_str = f"{value_name} {error_str}"
+            raise ValueError(error_str)
+        return
+
+    def _generate_message(
+        self, command: PrecilaserCommand, payload: Optional[bytes] = None
+    ) -> PrecilaserMessage:
+        return PrecilaserMessage(
+            command=command,
+            address=self.address,
+            payload=payload,
+            header=self.header,
+            terminator=self.terminator,
+            endian=self.endian,
+            type=PrecilaserMessageType.COMMAND,
+        )
+
+
+class AsyncSeed(AsyncPrecilaserDevice):
+    def __init__(
+        self,
+        transport: AsyncTransport,
+        address: int,
+        header: bytes = b"P",
+        terminator: bytes = b"\r\n",
+        device_type: PrecilaserDeviceType = PrecilaserDeviceType.SEED,
+        endian: Endian = "big",
+        timeout: float = 1.0,
+    ):
+        super().__init__(
+            transport, address, header, terminator, device_type, endian, timeout
+        )
+        # maximum age [s] of a cached status returned by status instead of retrieving
+        # a new one, see Seed.max_age
+        self.max_age = 0.0
+        self._status_invalidated = -math.inf
+        self._message_handling[PrecilaserReturn.SEED_STATUS] = (
+            "_status",
+            seed_status_handler,
+        )
+        self._status: Optional[SeedStatus] = None
+        self.serial: Optional[bytes] = None
+        self.wavelength_params: Optional[Tuple[int, ...]] = None
+        # optional on-disk cache of the serial number and wavelength parameters, see
+        # Seed.wavelength_cache
+        self.wavelength_cache: Optional[WavelengthParamCache] = None
+        self._calibration: Optional[Tuple[Tuple[int, ...], WavelengthCalibration]] = (
+            None
+        )
+
+    async def _set_value(
+        self,
+        value: int,
+        command: PrecilaserCommand,
+        return_command: PrecilaserReturn,
+        nbytes: int = 2,
+        save: bool = False,
+    ) -> PrecilaserFrame:
+        payload = value.to_bytes(nbytes, self.endian)
+        if save:
+            payload += b"1"
+        else:
+            payload += b"0"
+        message = self._generate_message(command, payload)
+        reply = await self._query(message, return_command)
+        self.invalidate_status()
+        return reply
+
+    def invalidate_status(self) -> None:
+        """
+        Discard the cached status; called by setters, so the next status reflects the
+        change
+        """
+        self._status_invalidated = time.monotonic()
+
+    async def refresh(self) -> SeedStatus:
+        """
+        Retrieve a new status, regardless of the age of the cached status
+
+        Returns:
+            SeedStatus: seed status
+        """
+        self.invalidate_status()
+        return await self.status()
+
+    async def status(self) -> SeedStatus:
+        timestamp = self._timestamps.get(PrecilaserReturn.SEED_STATUS)
+        if (
+            self.max_age > 0
+            and timestamp is not None
+            and timestamp > self._status_invalidated
+            and time.monotonic() - timestamp <= self.max_age
+        ):
+            assert self._status is not None
+            return self._status
+        message = self._generate_message(PrecilaserCommand.SEED_STATUS)
+        await self._query(message, PrecilaserReturn.SEED_STATUS)
+        assert self._status is not None
+        return self._status
+
+    async def temperature_setpoint(self) -> float:
+        return (await self.status()).temperature_set
+
+    async def set_temperature_setpoint(self, temperature: float) -> None:
+        setpoint = int(temperature * 1_000)
+        message = await self._set_value(
+            setpoint, PrecilaserCommand.SEED_SET_TEMP, PrecilaserReturn.SEED_SET_TEMP
+        )
+        if message.payload is not None:
+            self._check_write_return(
+                message.payload[:2], setpoint, "temperature setpoint"
+            )
+        else:
+            raise ValueError(f"not set to requested value: {setpoint}")
+
+    async def piezo_voltage(self) -> float:
+        return (await self.status()).piezo_voltage
+
+    async def set_piezo_voltage(self, voltage: float) -> None:
+        assert voltage >= 0 and voltage <= 74, (
+            "Piezo voltage cannot exceed 0V-74V range"
+        )
+        setpoint = int(voltage * 100)
+        message = await self._set_value(
+            setpoint,
+            PrecilaserCommand.SEED_SET_VOLTAGE,
+            PrecilaserReturn.SEED_SET_VOLTAGE,
+        )
+        if message.payload is not None:
+            self._check_write_return(message.payload[:2], setpoint, "piezo voltage")
+        else:
+            raise ValueError(f"not set to requested value: {setpoint}")
+
+    def _cache_key(self) -> Optional[str]:
+        instrument = getattr(self.transport, "instrument", None)
+        port = getattr(instrument, "port", None)
+        if port is None:
+            return None
+        return f"{port}:{self.address}"
+
+    async def load_wavelength_params(self, status: Optional[SeedStatus] = None) -> None:
+        """
+        Load the serial number and wavelength parameters, from wavelength_cache if
+        they are cached and match the device, otherwise from the device
+
+        Args:
+            status (Optional[SeedStatus], optional): status to check the cached
+                                        parameters against. Defaults to None, which
+                                        retrieves the status.
+        """
+        if self.wavelength_cache is not None and status is None:
+            status = await self.status()
+        cached = None
+        if status is not None:
+            cached = cached_wavelength_params(
+                self.wavelength_cache, self._cache_key(), status
+            )
+        if cached is not None:
+            self.serial, self.wavelength_params = cached
+            return
+        message = self._generate_message(PrecilaserCommand.SEED_SERIAL_WAV)
+        reply = await self._query(message, PrecilaserReturn.SEED_SERIAL_WAV)
+        self.serial, self.wavelength_params = serial_wavelength_handler(reply)
+        key = self._cache_key()
+        if self.wavelength_cache is not None and key is not None:
+            self.wavelength_cache.set(key, self.serial, self.wavelength_params)
+
+    async def wavelength_calibration(self) -> WavelengthCalibration:
+        """
+        Calibration between grating temperature and wavelength, see
+        Seed.wavelength_calibration; the parameters are loaded if required
+
+        Returns:
+            WavelengthCalibration: wavelength calibration
+        """
+        if self.wavelength_params is None:
+            await self.load_wavelength_params()
+        assert self.wavelength_params is not None
+        parameters = tuple(self.wavelength_params)
+        if self._calibration is None or self._calibration[0] != parameters:
+            self._calibration = (
+                parameters,
+                WavelengthCalibration.from_params(parameters),
+            )
+        return self._calibration[1]
+
+    async def wavelength(self) -> float:
+        status = await self.status()
+        if self.wavelength_params is None:
+            await self.load_wavelength_params(status)
+        calibration = await self.wavelength_calibration()
+        return calibration.wavelength(status.temperature_act)
+
+    async def set_wavelength(self, wavelength: float) -> None:
+        calibration = await self.wavelength_calibration()
+        await self.set_temperature_setpoint(calibration.temperature(wavelength))
+
+
+class AsyncAmplifier(AsyncPrecilaserDevice):
+    def __init__(
+        self,
+        transport: AsyncTransport,
+        address: int,
+        header: bytes = b"\x50",
+        terminator: bytes = b"\x0d\x0a",
+        device_type: PrecilaserDeviceType = PrecilaserDeviceType.AMP,
+        endian: Endian = "big",
+        timeout: float = 1.0,
+    ):
+        super().__init__(
+            transport, address, header, terminator, device_type, endian, timeout
+        )
+        # the reader task transforms the periodic status messages to an
+        # AmplifierStatus and writes it to _status
+        self._message_handling[PrecilaserReturn.AMP_STATUS] = (
+            "_status",
+            status_handler,
+        )
+        self._status: Optional[AmplifierStatus] = None
+
+    async def status(self) -> AmplifierStatus:
+        """
+        Latest amplifier status, waits for the first status message if none was
+        received yet
+
+        Returns:
+            AmplifierStatus: amplifier status
+        """
+        if self._status is None:
+            await self._read_until_reply(PrecilaserReturn.AMP_STATUS)
+        assert self._status is not None
+        return self._status
+
+    @property
+    def status_timestamp(self) -> Optional[float]:
+        """
+        Time at which the latest status message was received, in seconds of
+        time.monotonic()
+
+        Returns:
+            Optional[float]: receive time [s], None if no status was received yet
+        """
+        return self._timestamps.get(PrecilaserReturn.AMP_STATUS)
+
+    async def fault(self) -> bool:
+        status = await self.status()
+        fault = sum([pds.fault for pds in status.pd_status]) != 0
+        fault |= status.system_status.fault
+        return fault
+
+    async def current(self) -> Tuple[float, ...]:
+        """
+        Amplifier current [A] of all stages
+
+        Returns:
+            Tuple[float, ...]: amplifier current [A] of all stages
+        """
+        return (await self.status()).driver_current
+
+    async def set_current(self, current: float) -> None:
+        """
+        Set the amplifier current
+
+        Args:
+            current (float): current [A]
+        """
+        current_int = int(round(current * 100, 0))
+        message = self._generate_message(
+            PrecilaserCommand.AMP_SET_CURRENT, current_int.to_bytes(2, self.endian)
+        )
+        await self._query(message, PrecilaserReturn.AMP_SET_CURRENT)
+
+    async def enable(self) -> None:
+        """
+        Enable amplifier
+
+        Raises:
+            ValueError: raises if the amplifier isn't enabled
+        """
+        message = self._generate_message(
+            PrecilaserCommand.AMP_ENABLE, 0b111.to_bytes(1, self.endian)
+        )
+        reply = await self._query(message, PrecilaserReturn.AMP_ENABLE)
+        if reply.payload != b"Enable set ok":
+            raise ValueError(f"Amplifier not enabled; {reply.payload.tobytes()!r}")
+
+    async def disable(self) -> None:
+        """
+        Disable amplifier
+
+        Raises:
+            ValueError: raises if the amplifier isn't disabled
+        """
+        message = self._generate_message(
+            PrecilaserCommand.AMP_ENABLE, 0b0.to_bytes(1, self.endian)
+        )
+        reply = await self._query(message, PrecilaserReturn.AMP_ENABLE)
+        if reply.payload != b"Enable set ok":
+            raise ValueError(f"Amplifier not disabled; {reply.payload.tobytes()!r}")
+
+    async def save(self) -> None:
+        """
+        Save settings to ROM
+
+        Raises:
+            ValueError: raises if settings aren't saved
+        """
+        message = self._generate_message(PrecilaserCommand.AMP_SAVE, None)
+        reply = await self._query(message, PrecilaserReturn.AMP_SAVE)
+        if reply.payload != b"ROM saved":
+            raise ValueError(f"Values not saved to ROM; {reply.payload.tobytes()!r}")
+
+    async def enable_power_stabilization(self) -> None:
+        """
+        Enable power stabilization
+
+        Raises:
+            ValueError: raises if power stabilization isn't enabled
+        """
+        message = self._generate_message(PrecilaserCommand.AMP_POWER_STAB, b"\x01")
+        reply = await self._query(message, PrecilaserReturn.AMP_ENABLE)
+        if reply.payload != b"Stable set ok":
+            raise ValueError(
+                f"Power stabilization not enabled: {reply.payload.tobytes()!r}"
+            )
+
+    async def disable_power_stabilization(self) -> None:
+        """
+        Disable power stabilization
+
+        Raises:
+            ValueError: raises if power stabilization isn't disabled
+        """
+        message = self._generate_message(PrecilaserCommand.AMP_POWER_STAB, b"\x00")
+        reply = await self._query(message, PrecilaserReturn.AMP_ENABLE)
+        if reply.payload != b"Stable set ok":
+            raise ValueError(
+                f"Power stabilization not disabled: {reply.payload.tobytes()!r}"
+            )
+
+
+class AsyncSHGAmplifier(AsyncAmplifier):
+    def __init__(
+        self,
+        transport: AsyncTransport,
+        address: int,
+        header: bytes = b"\x50",
+        terminator: bytes = b"\x0d\x0a",  # '\r\n'
+        device_type: PrecilaserDeviceType = PrecilaserDeviceType.AMP,
+        endian: Endian = "big",
+        timeout: float = 1.0,
+    ):
+        super().__init__(
+            transport, address, header, terminator, device_type, endian, timeout
+        )
+        # the reader task transforms the periodic TEC temperature messages to a
+        # tuple[float, float] and writes it to _temperatures
+        self._message_handling[PrecilaserReturn.AMP_TEC_TEMPERATURE] = (
+            "_temperatures",
+            temperature_handler,
+        )
+        self._temperatures = (0.0, 0.0)
+
+    async def shg_temperature(self) -> float:
+        """
+        Temperature [C] of the SHG crystal, waits for the first TEC temperature
+        message if none was received yet
+
+        Returns:
+            float: crystal temperature [C]
+        """
+        if PrecilaserReturn.AMP_TEC_TEMPERATURE not in self._timestamps:
+            await self._read_until_reply(PrecilaserReturn.AMP_TEC_TEMPERATURE)
+        return self._temperatures[1]
+
+    @property
+    def shg_temperature_timestamp(self) -> Optional[float]:
+        """
+        Time at which the latest TEC temperature message was received, in seconds of
+        time.monotonic()
+
+        Returns:
+            Optional[float]: receive time [s], None if no temperatures were received yet
+        """
+        return self._timestamps.get(PrecilaserReturn.AMP_TEC_TEMPERATURE)
+
+    async def set_shg_temperature(self, temperature: float) -> None:
+        """
+        Set the SHG crystal temperature [C]
+
+        Args:
+            temperature (float): crystal temperature [C]
+        """
+        payload = b"\x00\x02"
+        payload += int(temperature * 100).to_bytes(2, self.endian)
+        message = self._generate_message(PrecilaserCommand.AMP_TEC_TEMPERATURE, payload)
+        await self._query(message, PrecilaserReturn.AMP_TEC_TEMPERATURE)
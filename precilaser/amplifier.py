@@ -1,10 +1,16 @@
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple, Union
 
+from .bus import PrecilaserBus
 from .device import AbstractPrecilaserDevice
 from .enums import Endian, PrecilaserCommand, PrecilaserDeviceType, PrecilaserReturn
-from .message import PrecilaserMessage
+from .message import PrecilaserFrame, PrecilaserMessage
 from .status import AmplifierStatus
 
+# message, return code of the reply and an optional function checking the reply
+_ConfigureCommand = Tuple[
+    PrecilaserMessage, PrecilaserReturn, Optional[Callable[[PrecilaserFrame], None]]
+]
+
 # The Precilaser Amplifiers send out periodic messages with the laser status and in the
 # case of the SHG amplifier also the TEC temperatures. This happens roughly every
 # 300 ms, which means the serial buffer can fill up quickly. Some additional functions
@@ -12,12 +18,15 @@ from .status import AmplifierStatus
 # this.
 
 
-def status_handler(message: PrecilaserMessage) -> AmplifierStatus:
+def status_handler(
+    message: Union[PrecilaserMessage, PrecilaserFrame],
+) -> AmplifierStatus:
     """
     Message handler for receiving the status message from the amplifier.
 
     Args:
-        message (PrecilaserMessage): message with the status payload
+        message (Union[PrecilaserMessage, PrecilaserFrame]): message with the status
+                                                            payload
 
     Raises:
         ValueError: Raise if the payload is empty
@@ -27,15 +36,18 @@ def status_handler(message: PrecilaserMessage) -> AmplifierStatus:
     """
     if message.payload is None:
         raise ValueError("No status bytes retrieved")
-    return AmplifierStatus(message.payload)
+    return AmplifierStatus(message.payload, message.endian)
 
 
-def temperature_handler(message: PrecilaserMessage) -> Tuple[float, float]:
+def temperature_handler(
+    message: Union[PrecilaserMessage, PrecilaserFrame],
+) -> Tuple[float, float]:
     """
     Message handler for receiving the TEC temperatures
 
     Args:
-        message (PrecilaserMessage): message with the temperature payload
+        message (Union[PrecilaserMessage, PrecilaserFrame]): message with the
+                                                            temperature payload
 
     Raises:
         ValueError: raise if the payload is empty
@@ -51,10 +63,12 @@ def temperature_handler(message: PrecilaserMessage) -> Tuple[float, float]:
     )
 
 
-class Amplifier(AbstractPrecilaserDevice):
+class Amplifier(AbstractPrecilaserDevice[AmplifierStatus]):
+    _status_return = PrecilaserReturn.AMP_STATUS
+
     def __init__(
         self,
-        port: str,
+        port: Union[str, PrecilaserBus],
         address: int,
         header: bytes = b"\x50",
         terminator: bytes = b"\x0d\x0a",
@@ -75,50 +89,30 @@ class Amplifier(AbstractPrecilaserDevice):
 
         self._status: Optional[AmplifierStatus] = None
 
-    def _read_until_reply(self, return_command: PrecilaserReturn) -> PrecilaserMessage:
+    def _read_until_buffer_empty(
+        self, max_bytes: int = 65_536, max_time: float = 0.1
+    ) -> None:
         """
-        Retrieve messages from the device until a message with the return code matching
-        return_command is retrieved.
+        Retrieve the received messages from the device, within a byte and time budget
+        so a flooded port can't stall the caller; only the newest status and TEC
+        temperature messages are decoded, see _drain. Does nothing if the background
+        reader is running, as it already drains the buffer.
 
         Args:
-            return_command (PrecilaserReturn): message command to wait for
-
-        Returns:
-            PrecilaserMessage: Message matching the return command
-        """
-        while True:
-            try:
-                message = self._read()
-            except ValueError as error:
-                # when the buffer is full a partial message can lead to a invalid
-                # message terminator error
-                if "invalid message terminator" in error.args[0]:
-                    continue
-                else:
-                    raise error
-            if message.command == return_command:
-                return message
-
-    def _read_until_buffer_empty(self) -> None:
+            max_bytes (int, optional): maximum number of bytes to drain. Defaults to
+                                        64 kiB.
+            max_time (float, optional): maximum drain time [s]. Defaults to 0.1 s.
         """
-        Retrieve messages from the device until the serial buffer is empty.
-        """
-        while self.instrument.in_waiting > 0:
-            try:
-                self._read()
-            except ValueError as error:
-                # when the buffer is full a partial message can lead to a invalid
-                # message terminator error
-                if "invalid message terminator" in error.args[0]:
-                    continue
-                else:
-                    raise error
+        if self.reader_running:
+            return
+        self._drain(max_bytes, max_time)
 
     @property
     def fault(self) -> bool:
-        if self.status is not None:
-            fault = sum([pds.fault for pds in self.status.pd_status]) != 0
-            fault |= self.status.system_status.fault
+        status = self.status
+        if status is not None:
+            fault = sum([pds.fault for pds in status.pd_status]) != 0
+            fault |= status.system_status.fault
             return fault
         else:
             return False
@@ -127,12 +121,34 @@ class Amplifier(AbstractPrecilaserDevice):
     def status(self) -> AmplifierStatus:
         # message = self._generate_message(PrecilaserCommand.AMP_STATUS)
         # self._write(message)
+        if self.reader_running:
+            # return the latest status cached by the background reader, only waiting
+            # if no status message was received yet
+            if self._status is None:
+                self._read_until_reply(PrecilaserReturn.AMP_STATUS)
+            assert self._status is not None
+            return self._status
         self._read_until_buffer_empty()
+        if self._status_fresh():
+            # a status younger than max_age was received since the last setting change
+            assert self._status is not None
+            return self._status
         self._read_until_reply(PrecilaserReturn.AMP_STATUS)
         if self._status is None:
             raise ValueError("No status retrieved")
         return self._status
 
+    @property
+    def status_timestamp(self) -> Optional[float]:
+        """
+        Time at which the latest status message was received, in seconds of
+        time.monotonic()
+
+        Returns:
+            Optional[float]: receive time [s], None if no status was received yet
+        """
+        return self._timestamps.get(PrecilaserReturn.AMP_STATUS)
+
     @property
     def current(self) -> Tuple[float, ...]:
         """
@@ -152,12 +168,17 @@ class Amplifier(AbstractPrecilaserDevice):
         Args:
             current (float): current [A]
         """
+        self._query(*self._current_command(current))
+        self.invalidate_status()
+
+    def _current_command(
+        self, current: float
+    ) -> Tuple[PrecilaserMessage, PrecilaserReturn]:
         current_int = int(round(current * 100, 0))
         message = self._generate_message(
             PrecilaserCommand.AMP_SET_CURRENT, current_int.to_bytes(2, self.endian)
         )
-        self._write(message)
-        self._read_until_reply(PrecilaserReturn.AMP_SET_CURRENT)
+        return message, PrecilaserReturn.AMP_SET_CURRENT
 
     def enable(self) -> None:
         """
@@ -169,10 +190,10 @@ class Amplifier(AbstractPrecilaserDevice):
         message = self._generate_message(
             PrecilaserCommand.AMP_ENABLE, 0b111.to_bytes(1, self.endian)
         )
-        self._write(message)
-        message = self._read_until_reply(PrecilaserReturn.AMP_ENABLE)
-        if message.payload != b"Enable set ok":
-            raise ValueError(f"Amplifier not enabled; {message.payload!r}")
+        reply = self._query(message, PrecilaserReturn.AMP_ENABLE)
+        self.invalidate_status()
+        if reply.payload != b"Enable set ok":
+            raise ValueError(f"Amplifier not enabled; {reply.payload.tobytes()!r}")
 
     def disable(self) -> None:
         """
@@ -184,10 +205,10 @@ class Amplifier(AbstractPrecilaserDevice):
         message = self._generate_message(
             PrecilaserCommand.AMP_ENABLE, 0b0.to_bytes(1, self.endian)
         )
-        self._write(message)
-        message = self._read_until_reply(PrecilaserReturn.AMP_ENABLE)
-        if message.payload != b"Enable set ok":
-            raise ValueError(f"Amplifier not disabled; {message.payload!r}")
+        reply = self._query(message, PrecilaserReturn.AMP_ENABLE)
+        self.invalidate_status()
+        if reply.payload != b"Enable set ok":
+            raise ValueError(f"Amplifier not disabled; {reply.payload.tobytes()!r}")
 
     def save(self) -> None:
         """
@@ -197,10 +218,9 @@ class Amplifier(AbstractPrecilaserDevice):
             ValueError: raises if settings aren't saved
         """
         message = self._generate_message(PrecilaserCommand.AMP_SAVE, None)
-        self._write(message)
-        message = self._read_until_reply(PrecilaserReturn.AMP_SAVE)
-        if message.payload != b"ROM saved":
-            raise ValueError(f"Values not saved to ROM; {message.payload!r}")
+        reply = self._query(message, PrecilaserReturn.AMP_SAVE)
+        if reply.payload != b"ROM saved":
+            raise ValueError(f"Values not saved to ROM; {reply.payload.tobytes()!r}")
 
     def enable_power_stabilization(self) -> None:
         """
@@ -209,11 +229,9 @@ class Amplifier(AbstractPrecilaserDevice):
         Raises:
             ValueError: raises if power stabilization isn't enabled
         """
-        message = self._generate_message(PrecilaserCommand.AMP_POWER_STAB, b"\x01")
-        self._write(message)
-        message = self._read_until_reply(PrecilaserReturn.AMP_ENABLE)
-        if message.payload != b"Stable set ok":
-            raise ValueError(f"Power stabilization not enabled: {message.payload!r}")
+        reply = self._query(*self._power_stabilization_command(True))
+        self.invalidate_status()
+        self._check_power_stabilization(reply, True)
 
     def disable_power_stabilization(self) -> None:
         """
@@ -222,17 +240,83 @@ class Amplifier(AbstractPrecilaserDevice):
         Raises:
             ValueError: raises if power stabilization isn't disabled
         """
-        message = self._generate_message(PrecilaserCommand.AMP_POWER_STAB, b"\x00")
-        self._write(message)
-        message = self._read_until_reply(PrecilaserReturn.AMP_ENABLE)
-        if message.payload != b"Stable set ok":
-            raise ValueError(f"Power stabilization not disabled: {message.payload!r}")
+        reply = self._query(*self._power_stabilization_command(False))
+        self.invalidate_status()
+        self._check_power_stabilization(reply, False)
+
+    def _power_stabilization_command(
+        self, enable: bool
+    ) -> Tuple[PrecilaserMessage, PrecilaserReturn]:
+        payload = b"\x01" if enable else b"\x00"
+        message = self._generate_message(PrecilaserCommand.AMP_POWER_STAB, payload)
+        # the amplifier replies to the power stabilization command with the enable
+        # return code
+        return message, PrecilaserReturn.AMP_ENABLE
+
+    def _check_power_stabilization(self, reply: PrecilaserFrame, enable: bool) -> None:
+        if reply.payload != b"Stable set ok":
+            state = "enabled" if enable else "disabled"
+            raise ValueError(
+                f"Power stabilization not {state}: {reply.payload.tobytes()!r}"
+            )
+
+    def _configure(self, commands: list[_ConfigureCommand]) -> None:
+        """
+        Send commands with pipeline() and check the replies
+
+        Args:
+            commands (list[_ConfigureCommand]): messages, the return codes of their
+                                            replies and optional reply checks
+        """
+        futures = self.pipeline([(message, ret) for message, ret, _ in commands])
+        self.invalidate_status()
+        for (_, _, check), future in zip(commands, futures):
+            reply = future.result()
+            if check is not None:
+                check(reply)
+
+    def configure(
+        self,
+        current: Optional[float] = None,
+        power_stabilization: Optional[bool] = None,
+    ) -> None:
+        """
+        Apply several settings at once; the commands are written back-to-back and
+        complete in about one round trip. Settings that are None are left unchanged.
+
+        Args:
+            current (Optional[float], optional): current [A]. Defaults to None.
+            power_stabilization (Optional[bool], optional): enable or disable power
+                                                stabilization. Defaults to None.
+
+        Raises:
+            ValueError: raises if a setting isn't applied
+            TimeoutError: raises if a reply isn't received before the timeout
+        """
+        self._configure(self._configure_commands(current, power_stabilization))
+
+    def _configure_commands(
+        self, current: Optional[float], power_stabilization: Optional[bool]
+    ) -> list[_ConfigureCommand]:
+        commands: list[_ConfigureCommand] = []
+        if current is not None:
+            commands.append((*self._current_command(current), None))
+        if power_stabilization is not None:
+            commands.append(
+                (
+                    *self._power_stabilization_command(power_stabilization),
+                    lambda reply: self._check_power_stabilization(
+                        reply, power_stabilization
+                    ),
+                )
+            )
+        return commands
 
 
 class SHGAmplifier(Amplifier):
     def __init__(
         self,
-        port: str,
+        port: Union[str, PrecilaserBus],
         address: int,
         header: bytes = b"\x50",
         terminator: bytes = b"\x0d\x0a",  # '\r\n'
@@ -271,8 +355,50 @@ class SHGAmplifier(Amplifier):
         Args:
             temperature (float): crystal temperature [C]
         """
+        self._query(*self._shg_temperature_command(temperature))
+        self.invalidate_status()
+
+    def _shg_temperature_command(
+        self, temperature: float
+    ) -> Tuple[PrecilaserMessage, PrecilaserReturn]:
         payload = b"\x00\x02"
         payload += int(temperature * 100).to_bytes(2, self.endian)
         message = self._generate_message(PrecilaserCommand.AMP_TEC_TEMPERATURE, payload)
-        self._write(message)
-        self._read_until_reply(PrecilaserReturn.AMP_TEC_TEMPERATURE)
+        return message, PrecilaserReturn.AMP_TEC_TEMPERATURE
+
+    def configure(
+        self,
+        current: Optional[float] = None,
+        power_stabilization: Optional[bool] = None,
+        shg_temperature: Optional[float] = None,
+    ) -> None:
+        """
+        Apply several settings at once; the commands are written back-to-back and
+        complete in about one round trip. Settings that are None are left unchanged.
+
+        Args:
+            current (Optional[float], optional): current [A]. Defaults to None.
+            power_stabilization (Optional[bool], optional): enable or disable power
+                                                stabilization. Defaults to None.
+            shg_temperature (Optional[float], optional): SHG crystal temperature [C].
+                                                Defaults to None.
+
+        Raises:
+            ValueError: raises if a setting isn't applied
+            TimeoutError: raises if a reply isn't received before the timeout
+        """
+        commands = self._configure_commands(current, power_stabilization)
+        if shg_temperature is not None:
+            commands.append((*self._shg_temperature_command(shg_temperature), None))
+        self._configure(commands)
+
+    @property
+    def shg_temperature_timestamp(self) -> Optional[float]:
+        """
+        Time at which the latest TEC temperature message was received, in seconds of
+        time.monotonic()
+
+        Returns:
+            Optional[float]: receive time [s], None if no temperatures were received yet
+        """
+        return self._timestamps.get(PrecilaserReturn.AMP_TEC_TEMPERATURE)
@@ -0,0 +1,431 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Optional, Union
+
+import serial
+
+from .enums import Endian
+from .framer import PrecilaserFramer
+from .instrumentation import Instrumentation
+
+if TYPE_CHECKING:
+    from .amplifier import Amplifier, SHGAmplifier
+    from .device import AbstractPrecilaserDevice
+    from .seed import Seed
+
+logger = logging.getLogger(__name__)
+
+
+class PrecilaserBus:
+    def __init__(
+        self,
+        port: Union[str, serial.Serial],
+        header: bytes = b"P",
+        terminator: bytes = b"\r\n",
+        timeout: float = 1.0,
+        queue_length: int = 256,
+    ):
+        """
+        Serial port shared by several Precilaser devices with different addresses,
+        e.g. a seed and an amplifier on one RS-485 line. Received frames are
+        demultiplexed by address into a queue per device. Devices are bound to the
+        bus by passing the bus as their port, or created with seed(), amplifier()
+        and shg_amplifier(). The queues are bounded, so a streaming device that is
+        never read doesn't build up an ever-growing backlog; the oldest frames are
+        discarded first, counted in discarded and logged as a warning when a queue
+        overflows.
+
+        Args:
+            port (Union[str, serial.Serial]): serial port, e.g. "COM6" or
+                                            "/dev/ttyUSB0", or an open serial port
+            header (bytes): message header. Defaults to b"P".
+            terminator (bytes): message terminator. Defaults to b"\\r\\n".
+            timeout (float): serial read timeout [s]. Defaults to 1.0 s.
+            queue_length (int): maximum number of frames queued per device.
+                                Defaults to 256.
+        """
+        if isinstance(port, str):
+            self.instrument = serial.Serial(port=port, baudrate=115200, timeout=timeout)
+        else:
+            self.instrument = port
+        self.header = header
+        self.terminator = terminator
+        self.timeout = timeout
+        self.queue_length = queue_length
+        # number of frames received for addresses without a bound device
+        self.dropped = 0
+        # number of queued frames discarded because the queue of a device was full
+        self.discarded = 0
+        # optional serial I/O counters
+        self._instrumentation: Optional[Instrumentation] = None
+
+        # framer accepting frames for any address
+        self._framer = PrecilaserFramer(None, header, terminator, "big")
+        self._address_index = len(header) + 1
+        self._devices: dict[int, "AbstractPrecilaserDevice"] = {}
+        self._queues: dict[int, deque[bytes]] = {}
+        # addresses whose queue overflowed since it was last emptied
+        self._overflowing: set[int] = set()
+
+        # only one thread reads the serial port at a time; other threads wait on the
+        # condition until a frame for their address is queued
+        self._condition = threading.Condition()
+        self._reading = False
+        self._write_lock = threading.Lock()
+
+        self._reader: Optional[threading.Thread] = None
+        self._reader_stop = threading.Event()
+
+    @property
+    def instrumentation(self) -> Optional[Instrumentation]:
+        """
+        Optional Instrumentation counting the serial I/O of the bus, resynchronization
+        and checksum failures; assign it to the devices as well to count their frames,
+        round trips and message handling
+        """
+        return self._instrumentation
+
+    @instrumentation.setter
+    def instrumentation(self, instrumentation: Optional[Instrumentation]) -> None:
+        if instrumentation is not None:
+            instrumentation.watch_framer(self._framer)
+        self._instrumentation = instrumentation
+
+    def attach(self, device: "AbstractPrecilaserDevice") -> None:
+        """
+        Bind a device to the bus; frames with the device address are queued for it
+
+        Args:
+            device (AbstractPrecilaserDevice): device
+
+        Raises:
+            ValueError: if the device header or terminator differ from the bus, or a
+                        device with the same address is already bound
+        """
+        if device.header != self.header or device.terminator != self.terminator:
+            raise ValueError(
+                "device header and terminator must match the bus header and terminator"
+            )
+        with self._condition:
+            if device.address in self._devices:
+                raise ValueError(f"address {device.address} already bound to the bus")
+            self._devices[device.address] = device
+            self._queues[device.address] = deque(maxlen=self.queue_length)
+
+    def detach(self, device: "AbstractPrecilaserDevice") -> None:
+        """
+        Unbind a device from the bus
+
+        Args:
+            device (AbstractPrecilaserDevice): device
+        """
+        with self._condition:
+            if self._devices.get(device.address) is device:
+                del self._devices[device.address]
+                del self._queues[device.address]
+                self._overflowing.discard(device.address)
+                # wake up threads waiting for a frame of the device
+                self._condition.notify_all()
+
+    def seed(
+        self, address: int, endian: Endian = "big", timeout: float = 1.0
+    ) -> "Seed":
+        """
+        Create a Seed bound to the bus
+
+        Args:
+            address (int): device address
+            endian (str): endian of message payload. Defaults to "big".
+            timeout (float): reply timeout [s]. Defaults to 1.0 s.
+
+        Returns:
+            Seed: seed
+        """
+        from .seed import Seed
+
+        return Seed(
+            self, address, self.header, self.terminator, endian=endian, timeout=timeout
+        )
+
+    def amplifier(
+        self, address: int, endian: Endian = "big", timeout: float = 1.0
+    ) -> "Amplifier":
+        """
+        Create an Amplifier bound to the bus
+
+        Args:
+            address (int): device address
+            endian (str): endian of message payload. Defaults to "big".
+            timeout (float): reply timeout [s]. Defaults to 1.0 s.
+
+        Returns:
+            Amplifier: amplifier
+        """
+        from .amplifier import Amplifier
+
+        return Amplifier(
+            self, address, self.header, self.terminator, endian=endian, timeout=timeout
+        )
+
+    def shg_amplifier(
+        self, address: int, endian: Endian = "big", timeout: float = 1.0
+    ) -> "SHGAmplifier":
+        """
+        Create an SHGAmplifier bound to the bus
+
+        Args:
+            address (int): device address
+            endian (str): endian of message payload. Defaults to "big".
+            timeout (float): reply timeout [s]. Defaults to 1.0 s.
+
+        Returns:
+            SHGAmplifier: SHG amplifier
+        """
+        from .amplifier import SHGAmplifier
+
+        return SHGAmplifier(
+            self, address, self.header, self.terminator, endian=endian, timeout=timeout
+        )
+
+    def write(self, data: bytes) -> None:
+        """
+        Write to the serial port, serialized between devices
+
+        Args:
+            data (bytes): data to write
+        """
+        with self._write_lock:
+            self.instrument.write(data)
+        if self._instrumentation is not None:
+            self._instrumentation.on_write(len(data))
+
+    def _distribute(self, data: bytes) -> None:
+        """Frame received bytes and queue the frames per address."""
+        self._framer.feed(data)
+        for frame in self._framer.frames():
+            address = frame[self._address_index]
+            queue = self._queues.get(address)
+            if queue is None:
+                self.dropped += 1
+                continue
+            if len(queue) == queue.maxlen:
+                self.discarded += 1
+                if address not in self._overflowing:
+                    self._overflowing.add(address)
+                    logger.warning(
+                        "frame queue of address %d is full, discarding the oldest "
+                        "frames",
+                        address,
+                    )
+            queue.append(frame)
+
+    def _queue(self, address: int) -> deque[bytes]:
+        """
+        Frame queue of address; must be called with the condition held
+
+        Raises:
+            ValueError: if no device is bound to address, e.g. because it was
+                        detached while waiting for a frame
+        """
+        queue = self._queues.get(address)
+        if queue is None:
+            raise ValueError(f"no device bound to address {address}")
+        return queue
+
+    def _fill(self, blocking: bool = True) -> None:
+        """
+        Read all bytes waiting in the serial buffer and queue the received frames;
+        must only be called by the thread that holds the read token
+
+        Args:
+            blocking (bool): wait up to the read timeout for at least one byte if the
+                            serial buffer is empty. Defaults to True.
+
+        Raises:
+            TimeoutError: if no data is received before the read timeout
+        """
+        waiting = self.instrument.in_waiting
+        if waiting == 0 and not blocking:
+            return
+        data = self.instrument.read(max(1, waiting))
+        if len(data) == 0:
+            raise TimeoutError("no data received from device")
+        if self._instrumentation is not None:
+            self._instrumentation.on_read(len(data))
+        with self._condition:
+            self._distribute(data)
+            self._condition.notify_all()
+
+    def _acquire_read(self, address: int, deadline: float) -> Optional[bytes]:
+        """
+        Pop the next frame queued for address, or acquire the read token if no frame
+        is queued and no other thread is reading the serial port.
+
+        Raises:
+            TimeoutError: if no frame is queued before the deadline
+            ValueError: if no device is bound to address, e.g. because it was
+                        detached while waiting
+
+        Returns:
+            Optional[bytes]: queued frame, or None if the read token was acquired
+        """
+        with self._condition:
+            while True:
+                queue = self._queue(address)
+                if queue:
+                    frame = queue.popleft()
+                    if not queue:
+                        self._overflowing.discard(address)
+                    return frame
+                if not self._reading:
+                    self._reading = True
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("no data received from device")
+                self._condition.wait(remaining)
+
+    def _release_read(self) -> None:
+        with self._condition:
+            self._reading = False
+            self._condition.notify_all()
+
+    def next_frame(self, address: int, timeout: Optional[float] = None) -> bytes:
+        """
+        Retrieve the next frame for address, reading the serial port if no frame is
+        queued and no other thread is reading it
+
+        Args:
+            address (int): device address
+            timeout (Optional[float], optional): timeout [s]. Defaults to None, which
+                                                uses the bus timeout.
+
+        Raises:
+            TimeoutError: if no frame is received before the timeout
+            ValueError: if no device is bound to address
+
+        Returns:
+            bytes: frame
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            frame = self._acquire_read(address, deadline)
+            if frame is not None:
+                return frame
+            try:
+                self._fill()
+            finally:
+                self._release_read()
+
+    def data_pending(self, address: int) -> bool:
+        """
+        Check if a frame for address is waiting, after queueing the frames in the
+        serial buffer if no other thread is reading the serial port
+
+        Args:
+            address (int): device address
+
+        Raises:
+            ValueError: if no device is bound to address
+
+        Returns:
+            bool: True if a frame is waiting
+        """
+        with self._condition:
+            if self._queue(address):
+                return True
+            if self._reading:
+                return False
+            self._reading = True
+        try:
+            self._fill(blocking=False)
+        finally:
+            self._release_read()
+        with self._condition:
+            return len(self._queue(address)) > 0
+
+    @property
+    def reader_running(self) -> bool:
+        """
+        Check if the background reader is running
+
+        Returns:
+            bool: True if the background reader is running
+        """
+        return self._reader is not None and self._reader.is_alive()
+
+    def start_reader(self) -> None:
+        """
+        Start a single background thread that reads the serial port and handles the
+        messages of all bound devices, delivering replies to the waiting callers.
+        """
+        if self.reader_running:
+            return
+        self._reader_stop.clear()
+        self._reader = threading.Thread(
+            target=self._reader_loop, name="PrecilaserBus-reader", daemon=True
+        )
+        self._reader.start()
+
+    def stop_reader(self) -> None:
+        """Stop the background reader thread."""
+        if self._reader is None:
+            return
+        self._reader_stop.set()
+        self._reader.join()
+        self._reader = None
+
+    def _reader_loop(self) -> None:
+        # wait for a synchronous read by a device to finish, then hold the read token
+        # until the reader is stopped
+        with self._condition:
+            while self._reading:
+                self._condition.wait()
+            self._reading = True
+        try:
+            while not self._reader_stop.is_set():
+                try:
+                    self._fill()
+                except TimeoutError:
+                    continue
+                except OSError:
+                    # serial port closed or disconnected
+                    break
+                self._dispatch()
+        finally:
+            self._release_read()
+
+    def _dispatch(self) -> None:
+        """Deliver all queued frames to their devices."""
+        with self._condition:
+            pending = []
+            for address, queue in self._queues.items():
+                if queue:
+                    pending.append((self._devices[address], list(queue)))
+                    queue.clear()
+            self._overflowing.clear()
+        for device, frames in pending:
+            for frame in frames:
+                try:
+                    device._receive_frame(frame)
+                except ValueError:
+                    # corrupted or empty message; continue with the next frame
+                    continue
+                except Exception:
+                    # an exception would stop the reader thread of all devices
+                    logger.exception(
+                        "handling a frame for address %d failed", device.address
+                    )
+
+    def close(self) -> None:
+        """Stop the background reader and close the serial port."""
+        self.stop_reader()
+        self.instrument.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+
+def default_cache_path() -> Path:
+    """
+    Default location of the wavelength parameter cache, in $XDG_CACHE_HOME or
+    ~/.cache
+
+    Returns:
+        Path: cache file path
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join("~", ".cache")
+    return Path(cache_home).expanduser() / "precilaser" / "wavelength_params.json"
+
+
+class WavelengthParamCache:
+    def __init__(self, path: Optional[Union[str, os.PathLike]] = None):
+        """
+        On-disk cache of the seed serial numbers and wavelength parameters, keyed by
+        serial port and device address, so the SEED_SERIAL_WAV transaction is only
+        required the first time a seed is connected.
+
+        Args:
+            path (Optional[Union[str, os.PathLike]], optional): JSON cache file.
+                                        Defaults to None, which uses
+                                        default_cache_path().
+        """
+        self.path = Path(path) if path is not None else default_cache_path()
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            # missing or corrupted cache file
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Tuple[int, ...]]]:
+        """
+        Retrieve the cached serial number and wavelength parameters
+
+        Args:
+            key (str): port and address of the seed
+
+        Returns:
+            Optional[Tuple[bytes, Tuple[int, ...]]]: serial number and wavelength
+                                                    parameters, None if not cached
+        """
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None:
+            return None
+        try:
+            return bytes.fromhex(entry["serial"]), tuple(entry["wavelength_params"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def set(self, key: str, serial: bytes, wavelength_params: Tuple[int, ...]) -> None:
+        """
+        Store the serial number and wavelength parameters of a seed
+
+        Args:
+            key (str): port and address of the seed
+            serial (bytes): serial number
+            wavelength_params (Tuple[int, ...]): wavelength parameters
+        """
+        with self._lock:
+            entries = self._load()
+            entries[key] = {
+                "serial": serial.hex(),
+                "wavelength_params": list(wavelength_params),
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # write to a temporary file first, so a crash can't truncate the cache
+            temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(temporary, "w") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(temporary, self.path)
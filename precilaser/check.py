@@ -1,13 +1,90 @@
-def checksum(data: bytes) -> int:
-    checksum = 0
-    for b in data:
-        checksum += b
-    checksum %= 2**8
-    return checksum
-
-
-def xor_check(data: bytes) -> int:
-    xor = 0
-    for b in data:
-        xor = xor ^ b
-    return xor
+from typing import Optional, Sequence, Union
+
+# below this length a plain loop is faster than folding the bytes as a single integer
+_XOR_FOLD_THRESHOLD = 96
+# minimum number of frames for which verify_frames uses NumPy by default
+_NUMPY_BATCH_THRESHOLD = 64
+
+
+def checksum(data: Union[bytes, memoryview]) -> int:
+    return sum(data) & 0xFF
+
+
+def xor_check(data: Union[bytes, memoryview]) -> int:
+    nbytes = len(data)
+    if nbytes < _XOR_FOLD_THRESHOLD:
+        xor = 0
+        for b in data:
+            xor ^= b
+        return xor
+    # interpret the bytes as one integer and repeatedly xor the upper half onto the
+    # lower half, which takes log2(n) big integer operations instead of n byte ones
+    value = int.from_bytes(data, "little")
+    while nbytes > 1:
+        half = (nbytes + 1) >> 1
+        value = (value & ((1 << (8 * half)) - 1)) ^ (value >> (8 * half))
+        nbytes = half
+    return value
+
+
+def verify_frames(
+    frames: Sequence[bytes],
+    terminator_length: int = 2,
+    use_numpy: Optional[bool] = None,
+) -> list[bool]:
+    """
+    Verify the checksum and xor check of many frames at once, e.g. when replaying
+    recorded frames. The checks cover all bytes following the first header byte up
+    to the checksum byte, which is followed by the xor byte and the terminator.
+
+    Args:
+        frames (Sequence[bytes]): complete frames
+        terminator_length (int, optional): terminator length. Defaults to 2.
+        use_numpy (Optional[bool], optional): verify with NumPy, grouping frames of
+                                            equal length. Defaults to None, which uses
+                                            NumPy if it is installed and there are
+                                            enough frames.
+
+    Returns:
+        list[bool]: True for each frame with a valid checksum and xor check
+    """
+    if use_numpy is None:
+        use_numpy = len(frames) >= _NUMPY_BATCH_THRESHOLD
+        if use_numpy:
+            try:
+                import numpy  # noqa: F401
+            except ImportError:
+                use_numpy = False
+    if use_numpy:
+        return _verify_frames_numpy(frames, terminator_length)
+
+    valid = []
+    end = -2 - terminator_length
+    for frame in frames:
+        body = frame[1:end]
+        valid.append(
+            len(frame) > 2 + terminator_length
+            and checksum(body) == frame[end]
+            and xor_check(body) == frame[end + 1]
+        )
+    return valid
+
+
+def _verify_frames_numpy(frames: Sequence[bytes], terminator_length: int) -> list[bool]:
+    import numpy as np
+
+    valid = np.zeros(len(frames), dtype=bool)
+    groups: dict[int, list[int]] = {}
+    for index, frame in enumerate(frames):
+        groups.setdefault(len(frame), []).append(index)
+    for length, indices in groups.items():
+        end = length - 2 - terminator_length
+        if end < 1:
+            continue
+        data = np.frombuffer(b"".join(frames[i] for i in indices), dtype=np.uint8)
+        data = data.reshape(len(indices), length)
+        body = data[:, 1:end]
+        sums = body.sum(axis=1, dtype=np.uint64) & 0xFF
+        xors = np.bitwise_xor.reduce(body, axis=1)
+        valid[indices] = (sums == data[:, end]) & (xors == data[:, end + 1])
+    return valid.tolist()
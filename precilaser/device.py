@@ -1,8 +1,15 @@
+import logging
+import math
+import threading
+import time
 from abc import ABC
-from typing import Callable, Optional
+from collections import deque
+from concurrent.futures import Future, wait
+from typing import Callable, Generic, Optional, Sequence, Tuple, TypeVar, Union
 
 import serial
 
+from .bus import PrecilaserBus
 from .enums import (
     Endian,
     PrecilaserCommand,
@@ -10,13 +17,30 @@ from .enums import (
     PrecilaserMessageType,
     PrecilaserReturn,
 )
-from .message import PrecilaserMessage, decompose_message
+from .framer import PrecilaserFramer
+from .instrumentation import Instrumentation
+from .message import (
+    _RETURN_CODES,
+    PrecilaserFrame,
+    PrecilaserMessage,
+    decode_message,
+)
+from .recorder import TelemetryRecorder
+
+logger = logging.getLogger(__name__)
+
+# status type of a device, e.g. AmplifierStatus
+S = TypeVar("S")
 
 
-class AbstractPrecilaserDevice(ABC):
+class AbstractPrecilaserDevice(ABC, Generic[S]):
+    # return type of the status message, which subclasses cache in _status through
+    # the message handling
+    _status_return: Optional[PrecilaserReturn] = None
+
     def __init__(
         self,
-        port: str,
+        port: Union[str, PrecilaserBus],
         address: int,
         header: bytes,
         terminator: bytes,
@@ -28,7 +52,9 @@ class AbstractPrecilaserDevice(ABC):
         Generic Precilaser device interface
 
         Args:
-            port (str): serial port, e.g. "COM6" or "/dev/ttyUSB0"
+            port (Union[str, PrecilaserBus]): serial port, e.g. "COM6" or
+                                            "/dev/ttyUSB0", or a bus shared with other
+                                            devices
             address (int): device address
             header (bytes): message header
             terminator (bytes): message terminator
@@ -36,43 +62,133 @@ class AbstractPrecilaserDevice(ABC):
             endian (str): endian of message payload
             timeout (float): serial read timeout [s]. Defaults to 1.0 s.
         """
-        self.instrument = serial.Serial(port=port, baudrate=115200, timeout=timeout)
+        # bus shared with other devices, which owns the serial port
+        self.bus: Optional[PrecilaserBus] = None
+        if isinstance(port, PrecilaserBus):
+            self.bus = port
+            self.instrument = port.instrument
+        else:
+            self.instrument = serial.Serial(port=port, baudrate=115200, timeout=timeout)
 
         self.address = address
         self.header = header
         self.terminator = terminator
         self.device_type = device_type
         self.endian = endian
+        self.timeout = timeout
+
+        # received bytes are buffered in the framer, which slices out complete frames
+        self._framer = PrecilaserFramer(address, header, terminator, endian)
 
         # dict with return types that require message handling; the tuple for each
         # return type includes the attr to write to and the transformation function
         self._message_handling: dict[PrecilaserReturn, tuple[str, Callable]] = {}
+        # monotonic time at which the last message of each return type was received
+        self._timestamps: dict[PrecilaserReturn, float] = {}
+        # callbacks called with every handled message, per return type; the lists are
+        # replaced instead of modified, so they can be iterated without a lock
+        self._subscribers: dict[
+            PrecilaserReturn, list[Callable[[PrecilaserFrame], None]]
+        ] = {}
+        # optional recorder to which every received frame is written
+        self.recorder: Optional[TelemetryRecorder] = None
+        # optional I/O and message handling counters
+        self._instrumentation: Optional[Instrumentation] = None
+        # maximum age [s] of a cached status returned by status instead of retrieving
+        # a new one; 0 always retrieves a new status
+        self.max_age = 0.0
+        # monotonic time of the last setting change, statuses received before it are
+        # outdated
+        self._status_invalidated = -math.inf
+
+        # background reader state; when the reader is running it owns the serial port
+        # and replies are delivered to waiting callers through futures, queued per
+        # return type in the order the commands were sent
+        self._reader: Optional[threading.Thread] = None
+        self._reader_stop = threading.Event()
+        self._replies: dict[PrecilaserReturn, deque[Future]] = {}
+        self._replies_lock = threading.Lock()
+
+        if self.bus is not None:
+            self.bus.attach(self)
 
-    def _handle_message(self, message: PrecilaserMessage) -> PrecilaserMessage:
+    def _handle_message(self, message: PrecilaserFrame) -> PrecilaserFrame:
         """
         message handling function. Some precilaser devices periodically send status
         updates to the host, which require some message handling to save those results.
         Examples are the SHG crystal temperature and amplifier status
 
         Args:
-            message (PrecilaserMessage): message
+            message (PrecilaserFrame): message
 
         Raises:
             ValueError: raises if the message payload is empty
 
         Returns:
-            PrecilaserMessage: message
+            PrecilaserFrame: message
         """
-        if len(self._message_handling) == 0:
-            return message
-        else:
+        instrumentation = self._instrumentation
+        if instrumentation is not None:
+            instrumentation.on_frame(message.command)
+        if len(self._message_handling) != 0:
             for ret_cmd, (attr, transform) in self._message_handling.items():
                 if message.command == ret_cmd:
-                    if message.payload is not None:
+                    if message.payload is None:
+                        raise ValueError(f"{ret_cmd.name} no data bytes retrieved")
+                    if instrumentation is None:
                         setattr(self, attr, transform(message))
                     else:
-                        raise ValueError(f"{ret_cmd.name} no data bytes retrieved")
-            return message
+                        tstart = time.perf_counter()
+                        setattr(self, attr, transform(message))
+                        instrumentation.on_decode(ret_cmd, time.perf_counter() - tstart)
+        self._timestamps[message.command] = time.monotonic()
+        for callback in self._subscribers.get(message.command, ()):
+            try:
+                callback(message)
+            except Exception:
+                # a failing subscriber must not stop the reader thread or keep the
+                # other subscribers from receiving the message
+                logger.exception(
+                    "%s subscriber %r failed", message.command.name, callback
+                )
+        return message
+
+    def subscribe(
+        self,
+        return_command: PrecilaserReturn,
+        callback: Callable[[PrecilaserFrame], None],
+    ) -> None:
+        """
+        Call callback with every received message with return code return_command,
+        after the message is handled. Callbacks run in the thread reading the message,
+        e.g. the background reader, and should return quickly. Exceptions raised by a
+        callback are logged and not propagated.
+
+        Args:
+            return_command (PrecilaserReturn): return code to subscribe to
+            callback (Callable[[PrecilaserFrame], None]): callback
+        """
+        with self._replies_lock:
+            callbacks = self._subscribers.get(return_command, [])
+            self._subscribers[return_command] = callbacks + [callback]
+
+    def unsubscribe(
+        self,
+        return_command: PrecilaserReturn,
+        callback: Callable[[PrecilaserFrame], None],
+    ) -> None:
+        """
+        Remove a callback registered with subscribe()
+
+        Args:
+            return_command (PrecilaserReturn): return code subscribed to
+            callback (Callable[[PrecilaserFrame], None]): callback
+        """
+        with self._replies_lock:
+            callbacks = self._subscribers.get(return_command, [])
+            self._subscribers[return_command] = [
+                registered for registered in callbacks if registered != callback
+            ]
 
     def _write(self, message: PrecilaserMessage):
         """
@@ -81,31 +197,50 @@ class AbstractPrecilaserDevice(ABC):
         Args:
             message (PrecilaserMessage): message
         """
-        self.instrument.write(bytes(message.command_bytes))
+        self._write_bytes(bytes(message.command_bytes))
 
-    def _read_exact(self, n: int) -> bytes:
+    def _write_bytes(self, data: bytes) -> None:
         """
-        Read exactly n bytes from the device, raising on a short read.
-
-        pyserial's read(n) returns up to n bytes, returning fewer (or none) once
-        the read timeout elapses. A short read therefore means the device went
-        silent mid-frame.
+        Write encoded messages to the Precilaser device
 
         Args:
-            n (int): number of bytes to read
+            data (bytes): encoded messages
+        """
+        if self.bus is not None:
+            self.bus.write(data)
+        else:
+            self.instrument.write(data)
+            if self._instrumentation is not None:
+                self._instrumentation.on_write(len(data))
+
+    def _fill_buffer(self) -> None:
+        """
+        Read all bytes waiting in the serial buffer (at least one byte) in a single
+        read and append them to the framer buffer.
 
         Raises:
-            TimeoutError: if fewer than n bytes are received before the timeout
+            TimeoutError: if no data is received before the read timeout
+        """
+        data = self.instrument.read(max(1, self.instrument.in_waiting))
+        if len(data) == 0:
+            raise TimeoutError("no data received from device")
+        if self._instrumentation is not None:
+            self._instrumentation.on_read(len(data))
+        self._framer.feed(data)
+
+    def _data_pending(self) -> bool:
+        """
+        Check if received data is waiting to be read, either in the serial buffer or
+        as a complete frame in the framer buffer.
 
         Returns:
-            bytes: exactly n bytes
+            bool: True if data is waiting
         """
-        data = self.instrument.read(n)
-        if len(data) < n:
-            raise TimeoutError(f"expected {n} bytes, received {len(data)}")
-        return data
+        if self.bus is not None:
+            return self.bus.data_pending(self.address)
+        return self.instrument.in_waiting > 0 or self._framer.has_frame()
 
-    def _read_single_message(self) -> PrecilaserMessage:
+    def _read_single_message(self) -> PrecilaserFrame:
         """
         Read a single message from the Precilaser device
 
@@ -113,37 +248,407 @@ class AbstractPrecilaserDevice(ABC):
             TimeoutError: if no data is received before the read timeout
 
         Returns:
-            PrecilaserMessage: message
+            PrecilaserFrame: message
         """
-        while True:
-            # scan byte-by-byte until the header is found to (re)synchronize
-            msg = self.instrument.read(1)
-            if len(msg) == 0:
-                raise TimeoutError("no data received from device")
-            if msg != self.header:
-                continue
-            msg += self._read_exact(2)
-            if msg != self.header + b"\x00" + self.address.to_bytes(1, self.endian):
-                continue
-            msg += self._read_exact(2)
-            msg += self._read_exact(msg[-1] + 4)
-            return decompose_message(
-                msg, self.address, self.header, self.terminator, self.endian
+        if self.bus is not None:
+            return decode_message(
+                self.bus.next_frame(self.address, self.timeout),
+                self.address,
+                self.header,
+                self.terminator,
+                self.endian,
+                verify=False,
             )
+        while True:
+            # the framer only returns frames with a valid checksum and xor check
+            frame = self._framer.next_frame()
+            if frame is not None:
+                return decode_message(
+                    frame,
+                    self.address,
+                    self.header,
+                    self.terminator,
+                    self.endian,
+                    verify=False,
+                )
+            self._fill_buffer()
+
+    def _pending_frame(self) -> Optional[bytes]:
+        """
+        Retrieve the next complete frame if one was received, without waiting
+
+        Returns:
+            Optional[bytes]: frame, or None if no complete frame was received
+        """
+        if self.bus is not None:
+            if self.bus.data_pending(self.address):
+                return self.bus.next_frame(self.address)
+            return None
+        frame = self._framer.next_frame()
+        if frame is None and self.instrument.in_waiting > 0:
+            data = self.instrument.read(self.instrument.in_waiting)
+            if self._instrumentation is not None:
+                self._instrumentation.on_read(len(data))
+            self._framer.feed(data)
+            frame = self._framer.next_frame()
+        return frame
+
+    def _drain(self, max_bytes: int = 65_536, max_time: float = 0.1) -> int:
+        """
+        Handle the received messages without waiting for new ones. Only the newest
+        message of each return type is decoded and handled, as the handled values of
+        older ones are overwritten anyway; messages of return types with subscribers,
+        and all messages if a recorder is set, are still handled individually.
+        Incomplete frames are left in the buffer.
+
+        Args:
+            max_bytes (int, optional): stop after draining this many bytes. Defaults
+                                        to 64 kiB.
+            max_time (float, optional): stop after this time [s]. Defaults to 0.1 s.
+
+        Raises:
+            ValueError: if a frame has an invalid return code
+
+        Returns:
+            int: number of drained frames
+        """
+        deadline = time.monotonic() + max_time
+        code_index = len(self.header) + 2
+        # newest frame per return code, in the order they were received
+        latest: dict[int, bytes] = {}
+        nbytes = 0
+        nframes = 0
+        while nbytes < max_bytes and time.monotonic() < deadline:
+            frame = self._pending_frame()
+            if frame is None:
+                break
+            nbytes += len(frame)
+            nframes += 1
+            return_command = _RETURN_CODES.get(frame[code_index])
+            if (
+                self.recorder is not None
+                or return_command is None
+                or self._subscribers.get(return_command)
+            ):
+                self._receive_frame(frame)
+            else:
+                replaced = latest.pop(frame[code_index], None)
+                # replaced frames are never handled, so count them here
+                if replaced is not None and self._instrumentation is not None:
+                    self._instrumentation.on_frame(return_command)
+                latest[frame[code_index]] = frame
+        for frame in latest.values():
+            self._receive_frame(frame)
+        return nframes
 
-    def _read(self) -> PrecilaserMessage:
+    def _read(self) -> PrecilaserFrame:
         """
         Read and handle a message from a Precilaser device
 
         Returns:
-            PrecilaserMessage: message
+            PrecilaserFrame: message
         """
         message = self._read_single_message()
+        if self.recorder is not None:
+            self.recorder.record(message)
         self._handle_message(message)
         return message
 
+    def _receive_frame(self, frame: bytes) -> None:
+        """
+        Decode, handle and deliver a frame received for this device by the bus reader
+
+        Args:
+            frame (bytes): received frame
+
+        Raises:
+            ValueError: if the frame is invalid
+        """
+        message = decode_message(
+            frame, self.address, self.header, self.terminator, self.endian, verify=False
+        )
+        if self.recorder is not None:
+            self.recorder.record(message)
+        self._handle_message(message)
+        self._resolve_reply(message)
+
+    def _read_until_reply(self, return_command: PrecilaserReturn) -> PrecilaserFrame:
+        """
+        Retrieve messages from the device until a message with the return code matching
+        return_command is retrieved. If the background reader is running, wait for the
+        reader to receive the message instead.
+
+        Args:
+            return_command (PrecilaserReturn): message command to wait for
+
+        Returns:
+            PrecilaserFrame: Message matching the return command
+        """
+        if self.reader_running:
+            return self._wait_for_reply(
+                return_command, self._expect_reply(return_command)
+            )
+        while True:
+            # partial and corrupted frames are skipped by the framer
+            message = self._read()
+            if message.command == return_command:
+                return message
+
+    def _query(
+        self, message: PrecilaserMessage, return_command: PrecilaserReturn
+    ) -> PrecilaserFrame:
+        """
+        Write a message to the device and retrieve the reply
+
+        Args:
+            message (PrecilaserMessage): message
+            return_command (PrecilaserReturn): return code of the reply
+
+        Returns:
+            PrecilaserFrame: reply
+        """
+        instrumentation = self._instrumentation
+        if instrumentation is not None:
+            tstart = time.perf_counter()
+        if self.reader_running:
+            # register the future before writing, so the reply can't be missed
+            future = self._expect_reply(return_command)
+            self._write(message)
+            reply = self._wait_for_reply(return_command, future)
+        else:
+            self._write(message)
+            reply = self._read_until_reply(return_command)
+        if instrumentation is not None:
+            instrumentation.on_round_trip(message.command, time.perf_counter() - tstart)
+        return reply
+
+    def pipeline(
+        self, commands: Sequence[Tuple[PrecilaserMessage, PrecilaserReturn]]
+    ) -> list[Future]:
+        """
+        Write several commands back-to-back and retrieve their replies, which are
+        matched to the commands by return code in the order they arrive. The commands
+        complete in about one round trip instead of one round trip per command.
+
+        Args:
+            commands (Sequence[Tuple[PrecilaserMessage, PrecilaserReturn]]): messages
+                                            and the return codes of their replies
+
+        Returns:
+            list[Future]: futures resolving to the reply of each command, or raising
+                        TimeoutError if no reply was received before the timeout
+        """
+        # register the futures before writing, so no reply can be missed
+        futures = [self._expect_reply(return_command) for _, return_command in commands]
+        self._write_bytes(
+            b"".join(bytes(message.command_bytes) for message, _ in commands)
+        )
+        deadline = time.monotonic() + self.timeout
+        if self.reader_running:
+            wait(futures, timeout=self.timeout)
+        else:
+            while not all(future.done() for future in futures):
+                if time.monotonic() > deadline:
+                    break
+                try:
+                    message = self._read()
+                except TimeoutError:
+                    break
+                self._resolve_reply(message)
+        for (_, return_command), future in zip(commands, futures):
+            # futures still queued were not resolved; resolved futures are removed
+            # from the queue before their result is set
+            with self._replies_lock:
+                pending = self._replies.get(return_command, deque())
+                expired = future in pending
+                if expired:
+                    pending.remove(future)
+            if not expired:
+                continue
+            future.set_exception(
+                TimeoutError(f"no {return_command.name} reply received from device")
+            )
+        return futures
+
+    def _expect_reply(self, return_command: PrecilaserReturn) -> Future:
+        """
+        Register a future that is resolved by the background reader with the next
+        message matching return_command
+
+        Args:
+            return_command (PrecilaserReturn): return code to wait for
+
+        Returns:
+            Future: future resolving to the reply
+        """
+        future: Future = Future()
+        with self._replies_lock:
+            self._replies.setdefault(return_command, deque()).append(future)
+        return future
+
+    def _wait_for_reply(
+        self, return_command: PrecilaserReturn, future: Future
+    ) -> PrecilaserFrame:
+        """
+        Wait for a future registered with _expect_reply to resolve
+
+        Args:
+            return_command (PrecilaserReturn): return code of the reply
+            future (Future): future registered with _expect_reply
+
+        Raises:
+            TimeoutError: if no reply is received before the read timeout
+
+        Returns:
+            PrecilaserFrame: reply
+        """
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._replies_lock:
+                pending = self._replies.get(return_command)
+                if pending is not None and future in pending:
+                    pending.remove(future)
+            raise TimeoutError(f"no {return_command.name} reply received from device")
+
+    def _resolve_reply(self, message: PrecilaserFrame) -> None:
+        """
+        Resolve the oldest future waiting for a message with this return code
+
+        Args:
+            message (PrecilaserFrame): message
+        """
+        with self._replies_lock:
+            pending = self._replies.get(message.command)
+            future = pending.popleft() if pending else None
+        if future is not None:
+            future.set_result(message)
+
+    @property
+    def instrumentation(self) -> Optional[Instrumentation]:
+        """
+        Optional Instrumentation counting the I/O and message handling of the device.
+        For devices on a PrecilaserBus the serial I/O, resynchronization and checksum
+        failures are counted by the instrumentation of the bus.
+        """
+        return self._instrumentation
+
+    @instrumentation.setter
+    def instrumentation(self, instrumentation: Optional[Instrumentation]) -> None:
+        if instrumentation is not None and self.bus is None:
+            instrumentation.watch_framer(self._framer)
+        self._instrumentation = instrumentation
+
+    def _status_fresh(self) -> bool:
+        """
+        Check if the cached status was received after the last setting change and is
+        at most max_age old
+
+        Returns:
+            bool: True if the cached status can be used
+        """
+        if self.max_age <= 0 or self._status_return is None:
+            return False
+        timestamp = self._timestamps.get(self._status_return)
+        return (
+            timestamp is not None
+            and timestamp > self._status_invalidated
+            and time.monotonic() - timestamp <= self.max_age
+        )
+
+    def invalidate_status(self) -> None:
+        """
+        Discard the cached status; called by setters, so the next status reflects the
+        change
+        """
+        self._status_invalidated = time.monotonic()
+
+    @property
+    def status(self) -> S:
+        """
+        Status of the device; the cached status while it is fresh, otherwise a new
+        status retrieved from the device
+
+        Returns:
+            status of the device
+        """
+        raise NotImplementedError
+
+    def refresh(self) -> S:
+        """
+        Retrieve a new status, regardless of the age of the cached status
+
+        Returns:
+            status of the device
+        """
+        self.invalidate_status()
+        return self.status
+
+    @property
+    def reader_running(self) -> bool:
+        """
+        Check if the background reader is running
+
+        Returns:
+            bool: True if the background reader is running
+        """
+        if self.bus is not None:
+            return self.bus.reader_running
+        return self._reader is not None and self._reader.is_alive()
+
+    def start_reader(self) -> None:
+        """
+        Start a background thread that continuously reads and handles all messages
+        sent by the device. Periodic messages, e.g. the amplifier status, are cached
+        as they arrive and replies to commands are delivered to the waiting callers.
+        For a device bound to a bus, this starts the bus reader shared by all devices.
+        """
+        if self.bus is not None:
+            self.bus.start_reader()
+            return
+        if self.reader_running:
+            return
+        self._reader_stop.clear()
+        self._reader = threading.Thread(
+            target=self._reader_loop,
+            name=f"{type(self).__name__}-{self.address}-reader",
+            daemon=True,
+        )
+        self._reader.start()
+
+    def stop_reader(self) -> None:
+        """
+        Stop the background reader thread. For a device bound to a bus, this stops
+        the bus reader shared by all devices.
+        """
+        if self.bus is not None:
+            self.bus.stop_reader()
+            return
+        if self._reader is None:
+            return
+        self._reader_stop.set()
+        self._reader.join()
+        self._reader = None
+
+    def _reader_loop(self) -> None:
+        while not self._reader_stop.is_set():
+            try:
+                message = self._read()
+            except TimeoutError:
+                continue
+            except ValueError:
+                # corrupted or empty message; continue with the next frame
+                continue
+            except OSError:
+                # serial port closed or disconnected
+                break
+            self._resolve_reply(message)
+
     def _check_write_return(
-        self, data: bytes, value: int, value_name: Optional[str] = None
+        self,
+        data: Union[bytes, memoryview],
+        value: int,
+        value_name: Optional[str] = None,
     ):
         if int.from_bytes(data, self.endian) != value:
             error_str = (
@@ -180,7 +685,14 @@ class AbstractPrecilaserDevice(ABC):
         return message
 
     def close(self) -> None:
-        """Close the underlying serial port."""
+        """
+        Close the underlying serial port. A device bound to a bus is only unbound,
+        the bus owns the serial port.
+        """
+        if self.bus is not None:
+            self.bus.detach(self)
+            return
+        self.stop_reader()
         self.instrument.close()
 
     def __enter__(self):
@@ -0,0 +1,378 @@
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Mapping, Optional, Sequence, Tuple
+
+from .amplifier import Amplifier, SHGAmplifier, temperature_handler
+from .amplifier import status_handler as amplifier_status_handler
+from .device import AbstractPrecilaserDevice
+from .enums import PrecilaserCommand, PrecilaserReturn
+from .message import PrecilaserFrame
+from .seed import Seed
+from .seed import status_handler as seed_status_handler
+from .status import AmplifierStatus, SeedStatus
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# metric name: type, help
+METRICS = {
+    "precilaser_amplifier_stable": ("gauge", "Amplifier output stable"),
+    "precilaser_amplifier_fault": ("gauge", "Amplifier fault, system or photodiode"),
+    "precilaser_amplifier_system_status": ("gauge", "Amplifier system status register"),
+    "precilaser_amplifier_pd_protection": ("gauge", "Photodiode protection triggered"),
+    "precilaser_amplifier_temperature_protection": (
+        "gauge",
+        "Temperature protection triggered",
+    ),
+    "precilaser_amplifier_interlock_ok": ("gauge", "Amplifier interlock ok"),
+    "precilaser_amplifier_driver_enabled": ("gauge", "Amplifier driver enable flag"),
+    "precilaser_amplifier_driver_current_amperes": (
+        "gauge",
+        "Amplifier driver current [A]",
+    ),
+    "precilaser_amplifier_pd_value": ("gauge", "Photodiode value [arb. units]"),
+    "precilaser_amplifier_pd_fault": ("gauge", "Photodiode fault event"),
+    "precilaser_amplifier_temperature_celsius": (
+        "gauge",
+        "Amplifier internal temperature [C]",
+    ),
+    "precilaser_shg_tec_temperature_celsius": ("gauge", "SHG TEC temperature [C]"),
+    "precilaser_seed_temperature_setpoint_celsius": (
+        "gauge",
+        "Seed grating temperature setpoint [C]",
+    ),
+    "precilaser_seed_temperature_celsius": ("gauge", "Seed grating temperature [C]"),
+    "precilaser_seed_diode_temperature_celsius": (
+        "gauge",
+        "Seed diode temperature [C]",
+    ),
+    "precilaser_seed_current_setpoint_milliamperes": (
+        "gauge",
+        "Seed current setpoint [mA]",
+    ),
+    "precilaser_seed_current_milliamperes": ("gauge", "Seed current [mA]"),
+    "precilaser_seed_wavelength_nanometers": ("gauge", "Seed wavelength [nm]"),
+    "precilaser_seed_piezo_voltage_volts": ("gauge", "Seed piezo voltage [V]"),
+    "precilaser_seed_emission": ("gauge", "Seed emission enabled"),
+    "precilaser_seed_power": ("gauge", "Seed power [arb. units]"),
+    "precilaser_seed_run_hours": ("gauge", "Seed run time [h]"),
+    "precilaser_message_timestamp_seconds": (
+        "gauge",
+        "Unix time at which the latest message was received",
+    ),
+    "precilaser_exporter_errors_total": (
+        "counter",
+        "Seed status requests and message updates by the exporter that failed",
+    ),
+}
+
+# metric name, labels, value
+_Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+
+def _amplifier_samples(status: AmplifierStatus) -> list[_Sample]:
+    system_status = status.system_status
+    driver_unlock = status.driver_unlock
+    fault = system_status.fault or any(pds.fault for pds in status.pd_status)
+    samples: list[_Sample] = [
+        ("precilaser_amplifier_stable", (), status.stable),
+        ("precilaser_amplifier_fault", (), fault),
+        ("precilaser_amplifier_system_status", (), system_status.status),
+        ("precilaser_amplifier_interlock_ok", (), driver_unlock.interlock),
+    ]
+    # metric, label, values
+    indexed: list[Tuple[str, str, Sequence[float]]] = [
+        ("precilaser_amplifier_pd_protection", "pd", system_status.pd_protection),
+        (
+            "precilaser_amplifier_temperature_protection",
+            "sensor",
+            system_status.temperature_protection,
+        ),
+        (
+            "precilaser_amplifier_driver_enabled",
+            "driver",
+            driver_unlock.driver_enable_flag,
+        ),
+        (
+            "precilaser_amplifier_driver_current_amperes",
+            "driver",
+            status.driver_current,
+        ),
+        ("precilaser_amplifier_pd_value", "pd", status.pd_value),
+        (
+            "precilaser_amplifier_pd_fault",
+            "pd",
+            [pd_status.fault for pd_status in status.pd_status],
+        ),
+        ("precilaser_amplifier_temperature_celsius", "sensor", status.temperatures),
+    ]
+    for metric, label, values in indexed:
+        samples.extend(
+            (metric, ((label, str(index)),), value)
+            for index, value in enumerate(values)
+        )
+    return samples
+
+
+def _seed_samples(status: SeedStatus) -> list[_Sample]:
+    return [
+        ("precilaser_seed_temperature_setpoint_celsius", (), status.temperature_set),
+        ("precilaser_seed_temperature_celsius", (), status.temperature_act),
+        ("precilaser_seed_diode_temperature_celsius", (), status.temperature_diode),
+        ("precilaser_seed_current_setpoint_milliamperes", (), status.current_set),
+        ("precilaser_seed_current_milliamperes", (), status.current_act),
+        ("precilaser_seed_wavelength_nanometers", (), status.wavelength),
+        ("precilaser_seed_piezo_voltage_volts", (), status.piezo_voltage),
+        ("precilaser_seed_emission", (), status.emission),
+        ("precilaser_seed_power", (), status.power),
+        ("precilaser_seed_run_hours", (), status.run_hours + status.run_minutes / 60),
+    ]
+
+
+def _tec_samples(temperatures: Tuple[float, float]) -> list[_Sample]:
+    return [
+        ("precilaser_shg_tec_temperature_celsius", (("tec", str(index)),), value)
+        for index, value in enumerate(temperatures)
+    ]
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class PrometheusExporter:
+    def __init__(
+        self,
+        devices: Mapping[str, AbstractPrecilaserDevice],
+        port: int,
+        host: str = "127.0.0.1",
+        seed_interval: Optional[float] = 1.0,
+        start_readers: bool = True,
+    ):
+        """
+        Prometheus exporter publishing the latest amplifier status, SHG TEC
+        temperatures and seed status over HTTP at /metrics. The exposition text is
+        rendered when a message is received, so a scrape returns cached bytes and
+        never touches the serial port. The amplifier status and TEC temperatures are
+        received by the background reader; seeds don't send periodic messages, so a
+        status request is written every seed_interval and the reply is received by
+        the reader as well.
+
+        Args:
+            devices (Mapping[str, AbstractPrecilaserDevice]): devices by name, the
+                                        name is the device label of the metrics
+            port (int): port to listen on, 0 for any free port; there is no default
+                                        to avoid colliding with other exporters
+            host (str, optional): address to listen on. Defaults to "127.0.0.1".
+            seed_interval (Optional[float], optional): seed status polling interval
+                                        [s], None to not poll. Defaults to 1 s.
+            start_readers (bool, optional): start the background reader of the
+                                        devices if it isn't running. Defaults to
+                                        True.
+        """
+        self.devices = dict(devices)
+        self.host = host
+        self.seed_interval = seed_interval
+        self.start_readers = start_readers
+        self.errors = 0
+
+        self._lock = threading.Lock()
+        # samples per device name and kind of message
+        self._samples: dict[Tuple[str, str], list[_Sample]] = {}
+        self._body = b""
+        self._subscriptions: list[
+            Tuple[
+                AbstractPrecilaserDevice,
+                PrecilaserReturn,
+                Callable[[PrecilaserFrame], None],
+            ]
+        ] = []
+        self._started_readers: list[AbstractPrecilaserDevice] = []
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._server_thread: Optional[threading.Thread] = None
+        self._render()
+
+    @property
+    def port(self) -> int:
+        """Port the exporter listens on"""
+        return self._server.server_address[1]
+
+    @property
+    def metrics(self) -> bytes:
+        """Latest exposition text"""
+        return self._body
+
+    def _handler(self) -> type:
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = exporter._body
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _update(self, name: str, kind: str, samples: Sequence[_Sample]) -> None:
+        timestamp = (
+            "precilaser_message_timestamp_seconds",
+            (("type", kind),),
+            time.time(),
+        )
+        with self._lock:
+            self._samples[(name, kind)] = [*samples, timestamp]
+            self._render()
+
+    def _render(self) -> None:
+        """Render the exposition text; must be called with the lock held."""
+        families: dict[str, list[str]] = {name: [] for name in METRICS}
+        for (name, _), samples in self._samples.items():
+            address = str(self.devices[name].address)
+            for metric, labels, value in samples:
+                label_text = ",".join(
+                    f'{key}="{label}"'
+                    for key, label in (("device", name), ("address", address), *labels)
+                )
+                families[metric].append(
+                    f"{metric}{{{label_text}}} {_format_value(value)}"
+                )
+        families["precilaser_exporter_errors_total"].append(
+            f"precilaser_exporter_errors_total {self.errors}"
+        )
+        lines = []
+        for metric, family in families.items():
+            if len(family) == 0:
+                continue
+            metric_type, help_text = METRICS[metric]
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            lines.extend(family)
+        self._body = ("\n".join(lines) + "\n").encode()
+
+    def _subscribe(
+        self,
+        name: str,
+        device: AbstractPrecilaserDevice,
+        return_command: PrecilaserReturn,
+        kind: str,
+        samples: Callable[[PrecilaserFrame], list[_Sample]],
+    ) -> None:
+        def callback(message: PrecilaserFrame) -> None:
+            try:
+                self._update(name, kind, samples(message))
+            except Exception:
+                # the callback runs in the device reader thread, which an exception
+                # would stop
+                logger.exception("updating the %s metrics of %s failed", kind, name)
+                self._error()
+
+        device.subscribe(return_command, callback)
+        self._subscriptions.append((device, return_command, callback))
+
+    def start(self) -> None:
+        """Subscribe to the devices, start the readers and the HTTP server."""
+        for name, device in self.devices.items():
+            if isinstance(device, Amplifier):
+                self._subscribe(
+                    name,
+                    device,
+                    PrecilaserReturn.AMP_STATUS,
+                    "status",
+                    lambda message: _amplifier_samples(
+                        amplifier_status_handler(message)
+                    ),
+                )
+                if device._status is not None:
+                    self._update(name, "status", _amplifier_samples(device._status))
+            if isinstance(device, SHGAmplifier):
+                self._subscribe(
+                    name,
+                    device,
+                    PrecilaserReturn.AMP_TEC_TEMPERATURE,
+                    "tec",
+                    lambda message: _tec_samples(temperature_handler(message)),
+                )
+            if isinstance(device, Seed):
+                self._subscribe(
+                    name,
+                    device,
+                    PrecilaserReturn.SEED_STATUS,
+                    "status",
+                    lambda message: _seed_samples(seed_status_handler(message)),
+                )
+            if self.start_readers and not device.reader_running:
+                device.start_reader()
+                self._started_readers.append(device)
+        if self.seed_interval is not None and any(
+            isinstance(device, Seed) for device in self.devices.values()
+        ):
+            self._stop.clear()
+            self._poller = threading.Thread(target=self._poll_seeds, daemon=True)
+            self._poller.start()
+        self._server_thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._server_thread.start()
+
+    def _error(self) -> None:
+        with self._lock:
+            self.errors += 1
+            self._render()
+
+    def _poll_seeds(self) -> None:
+        assert self.seed_interval is not None
+        while not self._stop.is_set():
+            for name, device in self.devices.items():
+                if isinstance(device, Seed):
+                    try:
+                        # only the request is written; the reply is received by the
+                        # reader and published by the SEED_STATUS subscription
+                        device._write(
+                            device._generate_message(PrecilaserCommand.SEED_STATUS)
+                        )
+                    except OSError:
+                        logger.exception("seed status request to %s failed", name)
+                        self._error()
+            self._stop.wait(self.seed_interval)
+
+    def close(self) -> None:
+        """Stop the HTTP server, the seed polling and the readers started."""
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+        if self._server_thread is not None:
+            self._server.shutdown()
+            self._server_thread.join()
+            self._server_thread = None
+        self._server.server_close()
+        for device, return_command, callback in self._subscriptions:
+            device.unsubscribe(return_command, callback)
+        self._subscriptions = []
+        for device in self._started_readers:
+            device.stop_reader()
+        self._started_readers = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,165 @@
+from typing import Iterator, Optional
+
+from .check import checksum, xor_check
+from .enums import Endian
+
+
+class PrecilaserFramer:
+    def __init__(
+        self,
+        address: Optional[int],
+        header: bytes,
+        terminator: bytes,
+        endian: Endian,
+        validate: bool = True,
+    ):
+        """
+        Buffered framer for the Precilaser serial protocol. Received bytes are
+        appended to a reusable buffer and complete frames are sliced out of it,
+        instead of reading the serial port byte-by-byte to find the next header.
+
+        A frame is structured as:
+        header | 0x00 | address | command | param length | payload | checksum | xor |
+        terminator
+
+        With validate, the terminator, checksum and xor check of each frame are
+        verified in the buffer before the frame is sliced out. A corrupted frame, e.g.
+        a partial frame followed by the next frame, only discards its header byte;
+        the framer then resynchronizes on the next header inside the buffered bytes,
+        so valid frames following it aren't lost.
+
+        Args:
+            address (Optional[int]): device address to accept frames for, or None to
+                                    accept frames for any address
+            header (bytes): message header
+            terminator (bytes): message terminator
+            endian (str): endian of message payload
+            validate (bool, optional): only yield frames with a valid terminator,
+                                        checksum and xor check. Defaults to True.
+        """
+        self.address = address
+        self.header = header
+        self.terminator = terminator
+        self.endian = endian
+        self.validate = validate
+        # number of discarded bytes that weren't part of a yielded frame
+        self.dropped_bytes = 0
+        # number of frame candidates that failed validation
+        self.corrupted_frames = 0
+
+        self._sync = header + b"\x00"
+        if address is not None:
+            self._sync += address.to_bytes(1, endian)
+        # index of the param length byte relative to the start of a frame
+        self._length_index = len(header) + 3
+        # number of bytes in a frame excluding the payload
+        self._overhead = len(header) + 2 + 2 + 2 + len(terminator)
+        self._buffer = bytearray()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def feed(self, data: bytes) -> None:
+        """
+        Append received bytes to the framer buffer
+
+        Args:
+            data (bytes): received bytes
+        """
+        self._buffer += data
+
+    def clear(self) -> None:
+        """Discard all buffered bytes."""
+        self._buffer.clear()
+
+    def _valid(self, end: int) -> bool:
+        """
+        Verify the terminator, checksum and xor check of the frame at the start of the
+        buffer without copying it
+
+        Args:
+            end (int): end index of the frame
+
+        Returns:
+            bool: True if the frame is valid
+        """
+        check_index = end - len(self.terminator) - 2
+        with memoryview(self._buffer) as view:
+            if view[check_index + 2 : end] != self.terminator:
+                return False
+            # the first header byte is not part of the checks
+            body = view[1:check_index]
+            return (
+                checksum(body) == view[check_index]
+                and xor_check(body) == view[check_index + 1]
+            )
+
+    def _frame_end(self) -> int:
+        """
+        Discard bytes preceding the first valid frame (garbage, corrupted frames or
+        frames for other addresses) and return the end index of the first frame in the
+        buffer.
+
+        Returns:
+            int: end index of the first frame, or -1 if no complete frame is buffered
+        """
+        buffer = self._buffer
+        while True:
+            start = buffer.find(self._sync)
+            if start < 0:
+                # keep a possible partial header at the end of the buffer
+                keep = len(self._sync) - 1
+                if len(buffer) > keep:
+                    self.dropped_bytes += len(buffer) - keep
+                    del buffer[: len(buffer) - keep]
+                return -1
+            if start > 0:
+                self.dropped_bytes += start
+                del buffer[:start]
+            if len(buffer) <= self._length_index:
+                return -1
+            end = self._overhead + buffer[self._length_index]
+            if len(buffer) < end:
+                return -1
+            if not self.validate or self._valid(end):
+                return end
+            # rewind to the next header candidate after this header
+            self.corrupted_frames += 1
+            self.dropped_bytes += 1
+            del buffer[:1]
+
+    def has_frame(self) -> bool:
+        """
+        Check if a complete frame is buffered
+
+        Returns:
+            bool: True if a complete frame is buffered
+        """
+        return self._frame_end() >= 0
+
+    def next_frame(self) -> Optional[bytes]:
+        """
+        Slice the next complete frame from the buffer.
+
+        Returns:
+            Optional[bytes]: complete frame, or None if no complete frame is buffered
+        """
+        end = self._frame_end()
+        if end < 0:
+            return None
+        frame = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return frame
+
+    def frames(self) -> Iterator[bytes]:
+        """
+        Yield all complete frames currently in the buffer
+
+        Yields:
+            bytes: complete frame
+        """
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                return
+            yield frame
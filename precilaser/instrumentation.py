@@ -0,0 +1,137 @@
+import bisect
+import threading
+from typing import Any, Union
+
+from .enums import PrecilaserCommand, PrecilaserReturn
+from .framer import PrecilaserFramer
+
+# upper bounds [s] of the round trip latency histogram buckets; the last bucket counts
+# all larger latencies
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+
+class Instrumentation:
+    def __init__(self) -> None:
+        """
+        Counters of the serial I/O and message handling of one or more devices, for
+        finding where time goes. Assign it to the instrumentation attribute of a device
+        or PrecilaserBus; without it the hot paths only check for None. Subclass it
+        and extend the on_* hooks to receive callbacks.
+
+        Counted are the bytes read and written, frames per return code, bytes skipped
+        to resynchronize and frames failing the checksum or xor check (from the
+        framers of the instrumented devices), round trip latency histograms per
+        command and the time spent in the message handlers, e.g. status_handler.
+        """
+        self._lock = threading.Lock()
+        self._framers: list[PrecilaserFramer] = []
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.frames: dict[str, int] = {}
+        # per command: bucket counts, total latency [s]
+        self.latency: dict[str, tuple[list[int], float]] = {}
+        # per return code: number of decodes, total decode time [s]
+        self.decode: dict[str, tuple[int, float]] = {}
+
+    def watch_framer(self, framer: PrecilaserFramer) -> None:
+        """
+        Include the resynchronization and checksum failure counters of a framer
+
+        Args:
+            framer (PrecilaserFramer): framer
+        """
+        with self._lock:
+            if all(watched is not framer for watched in self._framers):
+                self._framers.append(framer)
+
+    def on_read(self, nbytes: int) -> None:
+        """Called with the number of bytes read from the serial port"""
+        with self._lock:
+            self.bytes_read += nbytes
+
+    def on_write(self, nbytes: int) -> None:
+        """Called with the number of bytes written to the serial port"""
+        with self._lock:
+            self.bytes_written += nbytes
+
+    def on_frame(self, return_command: PrecilaserReturn) -> None:
+        """Called for every received frame"""
+        with self._lock:
+            self.frames[return_command.name] = (
+                self.frames.get(return_command.name, 0) + 1
+            )
+
+    def on_round_trip(
+        self, command: Union[PrecilaserCommand, PrecilaserReturn], latency: float
+    ) -> None:
+        """Called with the time [s] from writing a command to receiving its reply"""
+        index = bisect.bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            buckets, total = self.latency.get(
+                command.name, ([0] * (len(LATENCY_BUCKETS) + 1), 0.0)
+            )
+            buckets[index] += 1
+            self.latency[command.name] = (buckets, total + latency)
+
+    def on_decode(self, return_command: PrecilaserReturn, duration: float) -> None:
+        """Called with the time [s] spent in the message handler of a frame"""
+        with self._lock:
+            count, total = self.decode.get(return_command.name, (0, 0.0))
+            self.decode[return_command.name] = (count + 1, total + duration)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Copy of the counters
+
+        Returns:
+            dict[str, Any]: counters; latency holds the bucket upper bounds [s], the
+                            counts per bucket (the last for larger latencies), the
+                            number of round trips and their mean [s] per command
+        """
+        with self._lock:
+            latency = {}
+            for name, (buckets, total) in self.latency.items():
+                count = sum(buckets)
+                latency[name] = {
+                    "buckets": LATENCY_BUCKETS,
+                    "counts": list(buckets),
+                    "count": count,
+                    "mean": total / count,
+                }
+            return {
+                "bytes_read": self.bytes_read,
+                "bytes_written": self.bytes_written,
+                "frames": dict(self.frames),
+                "resync_bytes": sum(f.dropped_bytes for f in self._framers),
+                "checksum_failures": sum(f.corrupted_frames for f in self._framers),
+                "latency": latency,
+                "decode": {
+                    name: {"count": count, "mean": total / count}
+                    for name, (count, total) in self.decode.items()
+                },
+            }
+
+    def reset(self) -> None:
+        """Reset the counters, including those of the watched framers"""
+        with self._lock:
+            self.bytes_read = 0
+            self.bytes_written = 0
+            self.frames = {}
+            self.latency = {}
+            self.decode = {}
+            for framer in self._framers:
+                framer.dropped_bytes = 0
+                framer.corrupted_frames = 0
@@ -1,5 +1,6 @@
 from dataclasses import dataclass, field
-from typing import Optional, Union
+from functools import lru_cache
+from typing import Optional, Tuple, Union
 
 from .check import checksum, xor_check
 from .enums import Endian, PrecilaserCommand, PrecilaserMessageType, PrecilaserReturn
@@ -35,6 +36,90 @@ class PrecilaserReturnParamLength:
     SEED_SERIAL_WAV: int = 124
 
 
+class PrecilaserFrameTemplate:
+    __slots__ = ("prefix", "checksum", "xor_check", "terminator")
+
+    def __init__(
+        self,
+        command: Union[PrecilaserCommand, PrecilaserReturn],
+        address: int,
+        header: bytes,
+        terminator: bytes,
+        endian: Endian,
+        type: PrecilaserMessageType,
+    ):
+        """
+        Pre-built frame for a (device, command) combination. The frame prefix (header,
+        address, command and param length) is encoded once, with its contribution to
+        the checksum and xor check already folded in, so encoding a payload only
+        requires a check over the payload bytes.
+
+        Args:
+            command (Union[PrecilaserCommand, PrecilaserReturn]): command
+            address (int): device address
+            header (bytes): message header
+            terminator (bytes): message terminator
+            endian (str): endian of message payload
+            type (PrecilaserMessageType): command or return message
+        """
+        if type == PrecilaserMessageType.COMMAND:
+            param_byte_length = getattr(PrecilaserCommandParamLength, command.name)
+        else:
+            param_byte_length = getattr(PrecilaserReturnParamLength, command.name)
+
+        self.prefix = b"".join(
+            (
+                header,
+                b"\x00",
+                address.to_bytes(1, endian),
+                command.value,
+                param_byte_length.to_bytes(1, endian),
+            )
+        )
+        # the first header byte is not part of the checks
+        self.checksum = checksum(self.prefix[1:])
+        self.xor_check = xor_check(self.prefix[1:])
+        self.terminator = terminator
+
+    def encode(self, payload: Optional[bytes] = None) -> Tuple[bytes, int, int]:
+        """
+        Encode a frame with the supplied payload
+
+        Args:
+            payload (Optional[bytes], optional): message payload. Defaults to None.
+
+        Returns:
+            Tuple[bytes, int, int]: frame bytes, checksum and xor check
+        """
+        if payload is None:
+            sum, xor = self.checksum, self.xor_check
+            payload = b""
+        else:
+            sum = (self.checksum + checksum(payload)) & 0xFF
+            xor = self.xor_check ^ xor_check(payload)
+        frame = b"".join((self.prefix, payload, bytes((sum, xor)), self.terminator))
+        return frame, sum, xor
+
+
+@lru_cache(maxsize=256)
+def frame_template(
+    command: Union[PrecilaserCommand, PrecilaserReturn],
+    address: int,
+    header: bytes,
+    terminator: bytes,
+    endian: Endian,
+    type: PrecilaserMessageType,
+) -> PrecilaserFrameTemplate:
+    """
+    Cached PrecilaserFrameTemplate for a (device, command) combination, see
+    PrecilaserFrameTemplate for the arguments.
+
+    Returns:
+        PrecilaserFrameTemplate: frame template
+    """
+    return PrecilaserFrameTemplate(command, address, header, terminator, endian, type)
+
+
 @dataclass(frozen=True)
 class PrecilaserMessage:
     command: Union[PrecilaserCommand, PrecilaserReturn]
@@ -44,37 +129,155 @@ class PrecilaserMessage:
     terminator: bytes = field(default=b"\r\n", repr=False)
     endian: Endian = field(default="big", repr=False)
     type: PrecilaserMessageType = PrecilaserMessageType.COMMAND
-    command_bytes: bytearray = field(init=False)
+    command_bytes: bytes = field(init=False)
     checksum: int = field(init=False)
     xor_check: int = field(init=False)
 
     def __post_init__(self):
-        command_bytes = b""
-        command_bytes += self.header
-        command_bytes += b"\x00"
-        command_bytes += self.address.to_bytes(1, self.endian)
-        command_bytes += self.command.value
-
-        if self.type == PrecilaserMessageType.COMMAND:
-            param_byte_length = getattr(PrecilaserCommandParamLength, self.command.name)
-        else:
-            param_byte_length = getattr(PrecilaserReturnParamLength, self.command.name)
-
-        command_bytes += param_byte_length.to_bytes(1, self.endian)
-        if self.payload is not None:
-            command_bytes += self.payload
-
-        sum = checksum(command_bytes[1:])
-        xor = xor_check(command_bytes[1:])
-
-        command_bytes += sum.to_bytes(1, self.endian)
-        command_bytes += xor.to_bytes(1, self.endian)
-        command_bytes += self.terminator
+        template = frame_template(
+            self.command,
+            self.address,
+            self.header,
+            self.terminator,
+            self.endian,
+            self.type,
+        )
+        command_bytes, sum, xor = template.encode(self.payload)
         object.__setattr__(self, "command_bytes", command_bytes)
         object.__setattr__(self, "checksum", sum)
         object.__setattr__(self, "xor_check", xor)
 
 
+# lookup of the return code byte, avoids an Enum value lookup per received frame
+_RETURN_CODES = {ret.value[0]: ret for ret in PrecilaserReturn}
+
+
+class PrecilaserFrame:
+    __slots__ = (
+        "frame",
+        "command",
+        "address",
+        "payload",
+        "header",
+        "terminator",
+        "endian",
+        "checksum",
+        "xor_check",
+    )
+    type = PrecilaserMessageType.RETURN
+
+    def __init__(
+        self,
+        frame: memoryview,
+        command: PrecilaserReturn,
+        address: int,
+        payload: memoryview,
+        header: bytes,
+        terminator: bytes,
+        endian: Endian,
+        checksum: int,
+        xor_check: int,
+    ):
+        """
+        Received message, created by decode_message. Provides the same attributes as
+        PrecilaserMessage, but the payload is a view into the received frame instead
+        of a copy, and the frame is only copied to command_bytes when requested.
+
+        Args:
+            frame (memoryview): received frame
+            command (PrecilaserReturn): return code
+            address (int): device address
+            payload (memoryview): view of the payload in frame
+            header (bytes): message header
+            terminator (bytes): message terminator
+            endian (str): endian of message payload
+            checksum (int): checksum
+            xor_check (int): xor check
+        """
+        self.frame = frame
+        self.command = command
+        self.address = address
+        self.payload = payload
+        self.header = header
+        self.terminator = terminator
+        self.endian = endian
+        self.checksum = checksum
+        self.xor_check = xor_check
+
+    @property
+    def command_bytes(self) -> bytes:
+        return self.frame.tobytes()
+
+    def __repr__(self) -> str:
+        return (
+            f"PrecilaserFrame(command={self.command}, address={self.address},"
+            f" payload={self.payload.tobytes()!r})"
+        )
+
+
+def decode_message(
+    message: Union[bytes, memoryview],
+    address: int,
+    header: bytes,
+    terminator: bytes,
+    endian: Endian,
+    verify: bool = True,
+) -> PrecilaserFrame:
+    """
+    Decode a received frame, verifying the checksum and xor check directly on the
+    received bytes. The returned PrecilaserFrame references the received bytes, so
+    these should not be modified afterwards.
+
+    Args:
+        message (Union[bytes, memoryview]): received frame
+        address (int): device address
+        header (bytes): message header
+        terminator (bytes): message terminator
+        endian (str): endian of message payload
+        verify (bool, optional): verify the terminator, checksum and xor check; frames
+                                from a validating PrecilaserFramer are already
+                                verified. Defaults to True.
+
+    Raises:
+        ValueError: if the header, terminator, return code, checksum or xor check are
+                    invalid
+
+    Returns:
+        PrecilaserFrame: decoded message
+    """
+    frame = memoryview(message)
+    header_length = len(header)
+    check_index = len(frame) - len(terminator) - 2
+    if frame[:header_length] != header:
+        raise ValueError(f"invalid message header {bytes(frame[:header_length])!r}")
+    if verify and frame[check_index + 2 :] != terminator:
+        raise ValueError(
+            f"invalid message terminator {bytes(frame[check_index + 2 :])!r}"
+        )
+
+    ret = _RETURN_CODES.get(frame[header_length + 2])
+    if ret is None:
+        raise ValueError(f"invalid return code {frame[header_length + 2]}")
+    param_length = frame[header_length + 3]
+    payload = frame[header_length + 4 : header_length + 4 + param_length]
+
+    if not verify:
+        sum, xor = frame[check_index], frame[check_index + 1]
+        return PrecilaserFrame(
+            frame, ret, address, payload, header, terminator, endian, sum, xor
+        )
+    # the first header byte is not part of the checks
+    sum = checksum(frame[1:check_index])
+    xor = xor_check(frame[1:check_index])
+    if frame[check_index] != sum:
+        raise ValueError(f"invalid message checksum {frame[check_index]} != {sum}")
+    if frame[check_index + 1] != xor:
+        raise ValueError(f"invalid xor check {frame[check_index + 1]} != {xor}")
+    return PrecilaserFrame(
+        frame, ret, address, payload, header, terminator, endian, sum, xor
+    )
+
+
 def decompose_message(
     message: bytes,
     address: int,
@@ -82,27 +285,13 @@ def decompose_message(
     terminator: bytes,
     endian: Endian,
 ) -> PrecilaserMessage:
-    if message[: len(header)] != header:
-        raise ValueError(f"invalid message header {message[: len(header)]!r}")
-    if message[-len(terminator) :] != terminator:
-        raise ValueError(f"invalid message terminator {message[-len(terminator) :]!r}")
-
-    ret = PrecilaserReturn(message[3].to_bytes(1, endian))
-    param_length = message[4]
-    payload = message[5 : 5 + param_length]
-    checksum = message[-4]
-    xor_check = message[-3]
-    pm = PrecilaserMessage(
-        command=ret,
+    frame = decode_message(message, address, header, terminator, endian)
+    return PrecilaserMessage(
+        command=frame.command,
         address=address,
-        payload=payload,
+        payload=frame.payload.tobytes(),
         header=header,
         terminator=terminator,
         endian=endian,
         type=PrecilaserMessageType.RETURN,
     )
-    if pm.checksum != checksum:
-        raise ValueError(f"invalid message checksum {checksum} != {pm.checksum}")
-    if pm.xor_check != xor_check:
-        raise ValueError(f"invalid xor check {xor_check} != {pm.xor_check}")
-    return pm
@@ -0,0 +1,353 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Union
+
+from .check import verify_frames
+from .enums import Endian, PrecilaserReturn
+from .message import _RETURN_CODES, PrecilaserFrame, PrecilaserReturnParamLength
+from .status import decode_amplifier_status_batch, decode_seed_status_batch
+
+# Telemetry files are append-only binary files, one per return type, holding
+# fixed-size records of a timestamp followed by the raw frame. The fixed record size
+# allows the files to be memory-mapped and sliced without parsing them.
+#
+# file header, little endian:
+#   magic (4s) | version (B) | header length (B) | terminator length (B) |
+#   return code (B) | frame size (H) | record size (H) | padding (4x)
+# record:
+#   timestamp, time.time() (<f8) | frame, zero padded to the frame size
+
+_MAGIC = b"PLTR"
+_VERSION = 1
+_FILE_HEADER = struct.Struct("<4sBBBBHH4x")
+_TIMESTAMP = struct.Struct("<d")
+
+
+def _frame_size(
+    return_command: PrecilaserReturn, header_length: int, terminator_length: int
+) -> int:
+    param_length = getattr(PrecilaserReturnParamLength, return_command.name)
+    return header_length + 4 + param_length + 2 + terminator_length
+
+
+class TelemetryRecorder:
+    def __init__(self, directory: Union[str, os.PathLike]):
+        """
+        Records received frames to append-only binary files in directory, one file
+        per return type named after the return type, e.g. AMP_STATUS.bin. Assign a
+        recorder to the recorder attribute of a device to record every frame the
+        device receives.
+
+        Args:
+            directory (Union[str, os.PathLike]): directory to write the files to
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # number of frames not recorded because they exceed the record size
+        self.dropped = 0
+        self._files: dict[PrecilaserReturn, tuple[BinaryIO, int]] = {}
+        # frames may be recorded from a background reader thread
+        self._lock = threading.Lock()
+
+    def _open(self, message: PrecilaserFrame) -> tuple[BinaryIO, int]:
+        path = self.directory / f"{message.command.name}.bin"
+        file: BinaryIO
+        if path.exists() and path.stat().st_size >= _FILE_HEADER.size:
+            file = open(path, "r+b")
+            magic, version, _, _, _, frame_size, record_size = _FILE_HEADER.unpack(
+                file.read(_FILE_HEADER.size)
+            )
+            if magic != _MAGIC or version != _VERSION:
+                file.close()
+                raise ValueError(f"{path} is not a telemetry file")
+            # drop a partial record, e.g. from a crash while writing, so appended
+            # records stay aligned
+            records = (file.seek(0, os.SEEK_END) - _FILE_HEADER.size) // record_size
+            file.truncate(_FILE_HEADER.size + records * record_size)
+            file.seek(0, os.SEEK_END)
+        else:
+            frame_size = max(
+                len(message.frame),
+                _frame_size(
+                    message.command, len(message.header), len(message.terminator)
+                ),
+            )
+            file = open(path, "wb")
+            file.write(
+                _FILE_HEADER.pack(
+                    _MAGIC,
+                    _VERSION,
+                    len(message.header),
+                    len(message.terminator),
+                    message.command.value[0],
+                    frame_size,
+                    _TIMESTAMP.size + frame_size,
+                )
+            )
+        self._files[message.command] = (file, frame_size)
+        return file, frame_size
+
+    def record(self, message: PrecilaserFrame, timestamp: Optional[float] = None):
+        """
+        Append a received frame to the file of its return type
+
+        Args:
+            message (PrecilaserFrame): received message
+            timestamp (Optional[float], optional): receive time [s] since the epoch.
+                                                Defaults to None, which uses the
+                                                current time.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            file, frame_size = self._files.get(message.command) or self._open(message)
+            frame = message.frame
+            if len(frame) > frame_size:
+                self.dropped += 1
+                return
+            file.write(_TIMESTAMP.pack(timestamp))
+            file.write(frame)
+            if len(frame) < frame_size:
+                file.write(bytes(frame_size - len(frame)))
+
+    def flush(self) -> None:
+        """Flush all recorded frames to disk."""
+        with self._lock:
+            for file, _ in self._files.values():
+                file.flush()
+
+    def close(self) -> None:
+        """Close all telemetry files."""
+        with self._lock:
+            for file, _ in self._files.values():
+                file.close()
+            self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TelemetryFile:
+    def __init__(self, path: Union[str, os.PathLike], endian: Endian = "big"):
+        """
+        Memory-mapped view of a telemetry file written by TelemetryRecorder. Only the
+        accessed records are read from disk. Requires NumPy.
+
+        Args:
+            path (Union[str, os.PathLike]): telemetry file
+            endian (str): endian of the message payloads. Defaults to "big".
+        """
+        self.path = Path(path)
+        self.endian = endian
+        with open(self.path, "rb") as file:
+            (
+                magic,
+                version,
+                self.header_length,
+                self.terminator_length,
+                return_code,
+                self.frame_size,
+                self.record_size,
+            ) = _FILE_HEADER.unpack(file.read(_FILE_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{self.path} is not a telemetry file")
+        self.return_command = _RETURN_CODES[return_code]
+        self.param_length = getattr(
+            PrecilaserReturnParamLength, self.return_command.name
+        )
+        self._mmap: Optional[mmap.mmap] = None
+        self._records: Any = None
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Re-map the file to include records appended since it was opened."""
+        import numpy as np
+
+        self._release()
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        nrecords = (len(self._mmap) - _FILE_HEADER.size) // self.record_size
+        dtype = np.dtype(
+            [("timestamp", "<f8"), ("frame", np.uint8, (self.frame_size,))]
+        )
+        self._records = np.frombuffer(
+            self._mmap, dtype=dtype, count=nrecords, offset=_FILE_HEADER.size
+        )
+
+    def _release(self) -> None:
+        if self._mmap is not None:
+            self._records = None
+            try:
+                self._mmap.close()
+            except BufferError:
+                # views into the file are still referenced; the mapping is released
+                # once they are garbage collected
+                pass
+            self._mmap = None
+
+    def close(self) -> None:
+        """Release the memory map."""
+        self._release()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def timestamps(self) -> Any:
+        """
+        Receive times [s] since the epoch
+
+        Returns:
+            numpy.ndarray: receive times
+        """
+        return self._records["timestamp"]
+
+    @property
+    def frames(self) -> Any:
+        """
+        Raw frames, zero padded to the frame size
+
+        Returns:
+            numpy.ndarray: uint8 array of shape (records, frame size)
+        """
+        return self._records["frame"]
+
+    @property
+    def payloads(self) -> Any:
+        """
+        Message payloads
+
+        Returns:
+            numpy.ndarray: uint8 array of shape (records, payload length)
+        """
+        start = self.header_length + 4
+        return self.frames[:, start : start + self.param_length]
+
+    def time_slice(
+        self, start: Optional[float] = None, stop: Optional[float] = None
+    ) -> slice:
+        """
+        Record indices received within [start, stop)
+
+        Args:
+            start (Optional[float], optional): start time [s] since the epoch.
+                                                Defaults to None, the first record.
+            stop (Optional[float], optional): stop time [s] since the epoch. Defaults
+                                                to None, the last record.
+
+        Returns:
+            slice: record indices
+        """
+        import numpy as np
+
+        timestamps = self.timestamps
+        istart = 0 if start is None else int(np.searchsorted(timestamps, start))
+        istop = (
+            len(timestamps)
+            if stop is None
+            else int(np.searchsorted(timestamps, stop, side="left"))
+        )
+        return slice(istart, istop)
+
+    def columns(
+        self, start: Optional[float] = None, stop: Optional[float] = None
+    ) -> dict[str, Any]:
+        """
+        Decode the records received within [start, stop) into columns. Status
+        records are decoded with decode_amplifier_status_batch and
+        decode_seed_status_batch, TEC temperature records into a temperatures
+        column; other return types only provide the payload column.
+
+        Args:
+            start (Optional[float], optional): start time [s] since the epoch.
+                                                Defaults to None, the first record.
+            stop (Optional[float], optional): stop time [s] since the epoch. Defaults
+                                                to None, the last record.
+
+        Returns:
+            dict[str, numpy.ndarray]: columns including the timestamp column
+        """
+        import numpy as np
+
+        selection = self.time_slice(start, stop)
+        payloads = self.payloads[selection]
+        columns: dict[str, Any]
+        if self.return_command == PrecilaserReturn.AMP_STATUS:
+            columns = decode_amplifier_status_batch(payloads, self.endian)
+        elif self.return_command == PrecilaserReturn.SEED_STATUS:
+            columns = decode_seed_status_batch(payloads, self.endian)
+        elif self.return_command == PrecilaserReturn.AMP_TEC_TEMPERATURE:
+            dtype = ">u2" if self.endian == "big" else "<u2"
+            temperatures = np.ascontiguousarray(payloads[:, 1:5]).view(dtype)
+            columns = {"temperatures": temperatures / 100}
+        else:
+            columns = {"payload": payloads}
+        columns["timestamp"] = self.timestamps[selection]
+        return columns
+
+    def verify(self, start: Optional[float] = None, stop: Optional[float] = None):
+        """
+        Verify the checksum and xor check of the records received within
+        [start, stop)
+
+        Returns:
+            list[bool]: True for each record with a valid frame
+        """
+        frame_length = self.header_length + 4 + self.param_length + 2
+        frame_length += self.terminator_length
+        frames = self.frames[self.time_slice(start, stop), :frame_length]
+        return verify_frames(
+            [frame.tobytes() for frame in frames], self.terminator_length
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TelemetryReader:
+    def __init__(self, directory: Union[str, os.PathLike], endian: Endian = "big"):
+        """
+        Reader for a directory of telemetry files written by TelemetryRecorder.
+        Requires NumPy.
+
+        Args:
+            directory (Union[str, os.PathLike]): directory with the telemetry files
+            endian (str): endian of the message payloads. Defaults to "big".
+        """
+        self.directory = Path(directory)
+        self.files: dict[PrecilaserReturn, TelemetryFile] = {}
+        for path in sorted(self.directory.glob("*.bin")):
+            telemetry_file = TelemetryFile(path, endian)
+            self.files[telemetry_file.return_command] = telemetry_file
+
+    def __getitem__(self, return_command: PrecilaserReturn) -> TelemetryFile:
+        return self.files[return_command]
+
+    def __contains__(self, return_command: PrecilaserReturn) -> bool:
+        return return_command in self.files
+
+    def refresh(self) -> None:
+        """Re-map all files to include records appended since they were opened."""
+        for telemetry_file in self.files.values():
+            telemetry_file.refresh()
+
+    def close(self) -> None:
+        """Release all memory maps."""
+        for telemetry_file in self.files.values():
+            telemetry_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,632 @@
+import bisect
+import csv
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Mapping, Optional, Sequence, Union
+
+from .amplifier import SHGAmplifier, temperature_handler
+from .device import AbstractPrecilaserDevice
+from .enums import PrecilaserReturn
+from .message import PrecilaserFrame
+
+SCAN_ORDERS = ("grid", "serpentine", "adaptive")
+
+
+def _shg_settle(
+    amplifier: SHGAmplifier, early_stop: bool = False
+) -> Callable[[float], None]:
+    """Settle function waiting for the SHG temperature to stabilize"""
+    # imported here as utils depends on rich
+    from .utils import wait_until_shg_temperatures_stable
+
+    def settle(value: float) -> None:
+        wait_until_shg_temperatures_stable(amplifier, value, early_stop=early_stop)
+
+    return settle
+
+
+@dataclass
+class ScanPoint:
+    index: int
+    setpoint: float
+    timestamp: float  # time.time() after settling
+    measurements: dict[str, float] = field(default_factory=dict)
+
+
+class Scan:
+    def __init__(
+        self,
+        device: AbstractPrecilaserDevice,
+        parameter: str,
+        values: Sequence[float],
+        measurements: Optional[Mapping[str, Callable[[], float]]] = None,
+        order: str = "grid",
+        passes: int = 1,
+        settle: Optional[Callable[[float], None]] = None,
+        dwell: float = 0.0,
+        output: Optional[Union[str, os.PathLike]] = None,
+        refine_on: Optional[str] = None,
+        refine_points: int = 0,
+        callback: Optional[Callable[[ScanPoint], None]] = None,
+    ):
+        """
+        Scan of a settable device property, e.g. SHGAmplifier.shg_temperature,
+        Seed.piezo_voltage, Seed.temperature_setpoint or Amplifier.current. At each
+        point the property is set, the scan waits for it to settle and calls the
+        measurement functions.
+
+        Orders:
+            grid: the values in the supplied order, every pass.
+            serpentine: alternates direction every pass, so consecutive setpoints are
+                        neighbours and settling is short.
+            adaptive: the values, then refine_points midpoints inserted where the
+                        refine_on measurement changes most between neighbouring
+                        points, preferring the nearest on ties.
+
+        Args:
+            device (AbstractPrecilaserDevice): device
+            parameter (str): name of the settable property to scan
+            values (Sequence[float]): setpoints
+            measurements (Optional[Mapping[str, Callable[[], float]]], optional):
+                                        measurement functions by name. Defaults to
+                                        None.
+            order (str, optional): scan order, see above. Defaults to "grid".
+            passes (int, optional): number of passes over the values for the grid and
+                                        serpentine orders. Defaults to 1.
+            settle (Optional[Callable[[float], None]], optional): function waiting
+                                        until the device settled at a setpoint.
+                                        Defaults to None, which waits for the SHG
+                                        temperature to stabilize when scanning
+                                        shg_temperature.
+            dwell (float, optional): additional wait [s] after settling. Defaults to
+                                        0 s.
+            output (Optional[Union[str, os.PathLike]], optional): CSV file to stream
+                                        the points to. Defaults to None.
+            refine_on (Optional[str], optional): measurement used to select the
+                                        adaptive refinement points. Defaults to None,
+                                        which uses the first measurement.
+            refine_points (int, optional): number of adaptive refinement points.
+                                        Defaults to 0.
+            callback (Optional[Callable[[ScanPoint], None]], optional): called with
+                                        every measured point. Defaults to None.
+
+        Raises:
+            ValueError: if parameter isn't a settable property of the device or order
+                        isn't a valid scan order
+        """
+        prop = getattr(type(device), parameter, None)
+        if not isinstance(prop, property) or prop.fset is None:
+            raise ValueError(
+                f"{parameter} is not a settable property of {type(device).__name__}"
+            )
+        if order not in SCAN_ORDERS:
+            raise ValueError(f"invalid scan order {order}, use one of {SCAN_ORDERS}")
+        self.device = device
+        self.parameter = parameter
+        self.values = list(values)
+        self.measurements = dict(measurements) if measurements is not None else {}
+        self.order = order
+        self.passes = passes
+        self.settle = settle if settle is not None else self._default_settle()
+        self.dwell = dwell
+        self.output = output
+        if refine_on is None and len(self.measurements) > 0:
+            refine_on = next(iter(self.measurements))
+        if order == "adaptive" and refine_on not in self.measurements:
+            raise ValueError("adaptive scans require a measurement to refine on")
+        self.refine_on = refine_on
+        self.refine_points = refine_points
+        self.callback = callback
+        self.points: list[ScanPoint] = []
+
+    def _default_settle(self) -> Optional[Callable[[float], None]]:
+        if self.parameter != "shg_temperature":
+            return None
+        return _shg_settle(self.device)  # type: ignore
+
+    def _setpoints(self) -> Iterator[float]:
+        """Yield the setpoints in scan order; adaptive points depend on the results."""
+        if self.order == "serpentine":
+            for scan_pass in range(self.passes):
+                yield from self.values if scan_pass % 2 == 0 else self.values[::-1]
+        elif self.order == "grid":
+            for _ in range(self.passes):
+                yield from self.values
+        else:
+            yield from self.values
+            for _ in range(self.refine_points):
+                value = self._refinement()
+                if value is None:
+                    return
+                yield value
+
+    def _refinement(self) -> Optional[float]:
+        """
+        Midpoint of the neighbouring points with the largest change in the refine_on
+        measurement, preferring the interval nearest to the current setpoint on ties.
+        """
+        assert self.refine_on is not None
+        measured: dict[float, float] = {}
+        for point in self.points:
+            measured[point.setpoint] = point.measurements[self.refine_on]
+        setpoints = sorted(measured)
+        current = self.points[-1].setpoint
+        best: Optional[tuple[float, float]] = None
+        best_value = None
+        for low, high in zip(setpoints, setpoints[1:]):
+            midpoint = (low + high) / 2
+            if midpoint in (low, high):
+                continue
+            change = abs(measured[high] - measured[low])
+            key = (change, -abs(midpoint - current))
+            if best is None or key > best:
+                best, best_value = key, midpoint
+        return best_value
+
+    def _measure(self, index: int, setpoint: float) -> ScanPoint:
+        setattr(self.device, self.parameter, setpoint)
+        if self.settle is not None:
+            self.settle(setpoint)
+        if self.dwell > 0:
+            time.sleep(self.dwell)
+        point = ScanPoint(index, setpoint, time.time())
+        for name, measure in self.measurements.items():
+            point.measurements[name] = measure()
+        return point
+
+    def __iter__(self) -> Iterator[ScanPoint]:
+        """
+        Run the scan, yielding every point once it is measured
+
+        Yields:
+            ScanPoint: measured point
+        """
+        csv_file: Any = None
+        writer: Any = None
+        if self.output is not None:
+            csv_file = open(self.output, "w", newline="")
+            writer = csv.writer(csv_file, delimiter=",")
+            writer.writerow(
+                ["index", self.parameter, "timestamp", *self.measurements.keys()]
+            )
+        try:
+            for index, setpoint in enumerate(self._setpoints()):
+                point = self._measure(index, setpoint)
+                self.points.append(point)
+                if writer is not None:
+                    writer.writerow(
+                        [
+                            point.index,
+                            point.setpoint,
+                            point.timestamp,
+                            *point.measurements.values(),
+                        ]
+                    )
+                    csv_file.flush()
+                if self.callback is not None:
+                    self.callback(point)
+                yield point
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+
+    def run(self) -> list[ScanPoint]:
+        """
+        Run the scan
+
+        Returns:
+            list[ScanPoint]: measured points, in scan order
+        """
+        for _ in self:
+            pass
+        return self.points
+
+
+def scan(
+    device: AbstractPrecilaserDevice,
+    parameter: str,
+    values: Sequence[float],
+    measurements: Optional[Mapping[str, Callable[[], float]]] = None,
+    **kwargs,
+) -> list[ScanPoint]:
+    """
+    Run a Scan, see Scan for the arguments
+
+    Returns:
+        list[ScanPoint]: measured points, in scan order
+    """
+    return Scan(device, parameter, values, measurements, **kwargs).run()
+
+
+@dataclass
+class PeakResult:
+    temperature: float  # SHG temperature setpoint of the peak [C]
+    value: float  # measurement at the peak
+    ramp: list[tuple[float, float, float]]  # (timestamp, temperature, value) of ramp
+    points: list[ScanPoint]  # stabilized refinement points
+
+
+def _wait_for_messages(device: AbstractPrecilaserDevice, deadline: float) -> None:
+    """
+    Handle received messages until deadline [s] of time.monotonic(), reading them from
+    the device if the background reader isn't running
+    """
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if device.reader_running:
+            time.sleep(remaining)
+            return
+        try:
+            device._read()
+        except TimeoutError:
+            pass
+        except ValueError:
+            # corrupted message; continue with the next message
+            pass
+
+
+def _brent_maximize(
+    function: Callable[[float], float],
+    a: float,
+    b: float,
+    x: float,
+    tolerance: float,
+    max_evaluations: int,
+) -> float:
+    """
+    Maximize function on [a, b] with Brent's method, combining golden-section steps
+    with parabolic interpolation, starting from x.
+
+    Args:
+        function (Callable[[float], float]): function to maximize
+        a (float): lower bound
+        b (float): upper bound
+        x (float): initial guess
+        tolerance (float): absolute tolerance of the maximum location
+        max_evaluations (int): maximum number of function evaluations
+
+    Returns:
+        float: location of the maximum
+    """
+    golden = (3 - math.sqrt(5)) / 2
+    # minimize the negated function
+    fx = -function(x)
+    w = v = x
+    fw = fv = fx
+    d = e = 0.0
+    tol = tolerance / 2
+    for _ in range(max_evaluations - 1):
+        m = (a + b) / 2
+        if abs(x - m) <= 2 * tol - (b - a) / 2:
+            break
+        golden_step = True
+        if abs(e) > tol:
+            r = (x - w) * (fx - fv)
+            q = (x - v) * (fx - fw)
+            p = (x - v) * q - (x - w) * r
+            q = 2 * (q - r)
+            if q > 0:
+                p = -p
+            q = abs(q)
+            if abs(p) < abs(q * e / 2) and q * (a - x) < p < q * (b - x):
+                e = d
+                d = p / q
+                golden_step = False
+                if (x + d) - a < 2 * tol or b - (x + d) < 2 * tol:
+                    d = math.copysign(tol, m - x)
+        if golden_step:
+            e = a - x if x >= m else b - x
+            d = golden * e
+        u = x + d if abs(d) >= tol else x + math.copysign(tol, d)
+        fu = -function(u)
+        if fu <= fx:
+            if u >= x:
+                a = x
+            else:
+                b = x
+            v, w, x = w, x, u
+            fv, fw, fx = fw, fx, fu
+        else:
+            if u < x:
+                a = u
+            else:
+                b = u
+            if fu <= fw or w == x:
+                v, w = w, u
+                fv, fw = fw, fu
+            elif fu <= fv or v == x or v == w:
+                v, fv = u, fu
+    return x
+
+
+# return types recorded while ramping a parameter, and whether the device has to be
+# polled for them because it doesn't send them periodically
+_RAMP_RECORD: dict[str, tuple[tuple[PrecilaserReturn, ...], bool]] = {
+    "shg_temperature": (
+        (PrecilaserReturn.AMP_TEC_TEMPERATURE, PrecilaserReturn.AMP_STATUS),
+        False,
+    ),
+    "piezo_voltage": ((PrecilaserReturn.SEED_STATUS,), True),
+}
+
+
+@dataclass
+class RampRecord:
+    parameter: str
+    setpoints: list[tuple[float, float]] = field(default_factory=list)
+    frames: list[tuple[float, PrecilaserFrame]] = field(default_factory=list)
+
+    def timestamps(self, command: PrecilaserReturn) -> list[float]:
+        """Receive times [s] of the recorded frames of a return type"""
+        return [t for t, frame in self.frames if frame.command == command]
+
+    def values(
+        self,
+        command: PrecilaserReturn,
+        transform: Callable[[PrecilaserFrame], Any],
+    ) -> list[Any]:
+        """Recorded frames of a return type, converted with transform"""
+        return [
+            transform(frame) for _, frame in self.frames if frame.command == command
+        ]
+
+
+def interpolate(
+    timestamps: Sequence[float], values: Sequence[float], at: Sequence[float]
+) -> list[float]:
+    """
+    Linearly interpolate a measurement stream onto other timestamps, e.g. power meter
+    samples onto the receive times of the frames of a RampRecord. Timestamps outside
+    the measured range take the first or last value.
+
+    Args:
+        timestamps (Sequence[float]): increasing timestamps [s] of the measurement
+        values (Sequence[float]): measured values
+        at (Sequence[float]): timestamps [s] to interpolate at
+
+    Returns:
+        list[float]: interpolated values
+
+    Raises:
+        ValueError: if timestamps and values differ in length or are empty
+    """
+    if len(timestamps) != len(values) or len(timestamps) == 0:
+        raise ValueError("timestamps and values must have the same, non-zero length")
+    interpolated = []
+    for t in at:
+        index = bisect.bisect_right(timestamps, t)
+        if index == 0:
+            interpolated.append(values[0])
+        elif index == len(timestamps):
+            interpolated.append(values[-1])
+        else:
+            t0, t1 = timestamps[index - 1], timestamps[index]
+            v0, v1 = values[index - 1], values[index]
+            interpolated.append(v0 + (v1 - v0) * (t - t0) / (t1 - t0))
+    return interpolated
+
+
+def ramp(
+    device: AbstractPrecilaserDevice,
+    parameter: str,
+    start: float,
+    stop: float,
+    rate: float,
+    step: float,
+    record: Optional[Sequence[PrecilaserReturn]] = None,
+    poll: Optional[bool] = None,
+    callback: Optional[Callable[[float, PrecilaserFrame], None]] = None,
+    hold_until: Optional[Callable[[], bool]] = None,
+    timeout: float = 600,
+) -> RampRecord:
+    """
+    Ramp a settable device property, e.g. SHGAmplifier.shg_temperature or
+    Seed.piezo_voltage, from start to stop in increments of at most step at a fixed
+    rate [1/s], without waiting for the device to settle. Every received frame of the
+    recorded return types is stored with its receive time (time.monotonic()), so
+    external measurements can be aligned with interpolate.
+
+    Args:
+        device (AbstractPrecilaserDevice): device
+        parameter (str): name of the settable property to ramp
+        start (float): first setpoint
+        stop (float): last setpoint
+        rate (float): ramp rate [1/s]
+        step (float): maximum setpoint increment
+        record (Optional[Sequence[PrecilaserReturn]], optional): return types to
+                                    record. Defaults to None, which records the TEC
+                                    temperature and status of SHG amplifiers and the
+                                    status of seeds.
+        poll (Optional[bool], optional): request a status after every increment, for
+                                    devices that don't send periodic status messages.
+                                    Defaults to None, which polls seeds.
+        callback (Optional[Callable[[float, PrecilaserFrame], None]], optional):
+                                    called with the receive time and frame of every
+                                    recorded frame, from the background reader thread
+                                    if it is running. Defaults to None.
+        hold_until (Optional[Callable[[], bool]], optional): keep recording after the
+                                    last setpoint until it returns True. Defaults to
+                                    None.
+        timeout (float, optional): timeout [s] of hold_until. Defaults to 600 s.
+
+    Returns:
+        RampRecord: setpoints and recorded frames with their timestamps
+
+    Raises:
+        ValueError: if rate or step isn't positive, parameter isn't a settable
+                    property of the device, or record isn't given for a parameter
+                    without default recorded return types
+    """
+    if rate <= 0:
+        raise ValueError(f"ramp rate must be positive, not {rate}")
+    if step <= 0:
+        raise ValueError(f"ramp step must be positive, not {step}")
+    prop = getattr(type(device), parameter, None)
+    if not isinstance(prop, property) or prop.fset is None:
+        raise ValueError(
+            f"{parameter} is not a settable property of {type(device).__name__}"
+        )
+    if record is None or poll is None:
+        if parameter not in _RAMP_RECORD:
+            raise ValueError(f"specify the return types to record for {parameter}")
+        default_record, default_poll = _RAMP_RECORD[parameter]
+        record = default_record if record is None else record
+        poll = default_poll if poll is None else poll
+
+    result = RampRecord(parameter)
+
+    def on_message(message: PrecilaserFrame) -> None:
+        timestamp = device._timestamps[message.command]
+        result.frames.append((timestamp, message))
+        if callback is not None:
+            callback(timestamp, message)
+
+    steps = max(math.ceil(abs(stop - start) / step), 1)
+    interval = abs(stop - start) / steps / rate
+    for command in record:
+        device.subscribe(command, on_message)
+    try:
+        tstart = time.monotonic()
+        for index in range(1, steps + 1):
+            setpoint = start + (stop - start) * index / steps
+            setattr(device, parameter, setpoint)
+            result.setpoints.append((time.monotonic(), setpoint))
+            deadline = tstart + index * interval
+            if poll:
+                device.status
+                time.sleep(max(deadline - time.monotonic(), 0))
+            else:
+                _wait_for_messages(device, deadline)
+        if hold_until is not None:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline and not hold_until():
+                if poll:
+                    device.status
+                    time.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+                else:
+                    _wait_for_messages(
+                        device, min(time.monotonic() + interval, deadline)
+                    )
+    finally:
+        for command in record:
+            device.unsubscribe(command, on_message)
+    return result
+
+
+def find_shg_peak(
+    amplifier: SHGAmplifier,
+    measure: Callable[[], float],
+    start: float,
+    stop: float,
+    ramp_rate: float = 0.05,
+    ramp_step: float = 0.02,
+    tolerance: float = 0.02,
+    max_points: int = 8,
+    settle: Optional[Callable[[float], None]] = None,
+    timeout: float = 600,
+) -> PeakResult:
+    """
+    Find the SHG temperature maximizing a measurement, e.g. the SHG output power.
+
+    The SHG temperature setpoint is ramped from start to stop at ramp_rate [C/s],
+    calling measure for every received TEC temperature message; the temperatures at
+    which the measurement exceeds half its maximum bracket the phase matching peak.
+    The peak is then refined with stabilized points, using golden-section steps and
+    parabolic interpolation (Brent's method), until the peak is located to within
+    tolerance [C] or max_points points were measured.
+
+    measure is called from the background reader thread if it is running.
+
+    Args:
+        amplifier (SHGAmplifier): precilaser shg amplifier interface
+        measure (Callable[[], float]): measurement to maximize
+        start (float): SHG temperature at the start of the ramp [C]
+        stop (float): SHG temperature at the end of the ramp [C]
+        ramp_rate (float, optional): ramp rate [C/s]. Defaults to 0.05 C/s.
+        ramp_step (float, optional): setpoint increment of the ramp [C]. Defaults to
+                                    0.02 C.
+        tolerance (float, optional): tolerance of the peak temperature [C]. Defaults
+                                    to 0.02 C.
+        max_points (int, optional): maximum number of stabilized points. Defaults to
+                                    8.
+        settle (Optional[Callable[[float], None]], optional): function waiting until
+                                    the SHG temperature settled at a setpoint.
+                                    Defaults to None, which uses
+                                    wait_until_shg_temperatures_stable with
+                                    early_stop.
+        timeout (float, optional): timeout [s] for the crystal temperature to reach
+                                    stop after the ramp. Defaults to 600 s.
+
+    Returns:
+        PeakResult: peak temperature and value, the ramp samples and the stabilized
+                    points
+
+    Raises:
+        TimeoutError: if no TEC temperature messages were received during the ramp
+    """
+    if settle is None:
+        settle = _shg_settle(amplifier, early_stop=True)
+
+    samples: list[tuple[float, float, float]] = []
+    lock = threading.Lock()
+
+    def on_frame(timestamp: float, message: PrecilaserFrame) -> None:
+        sample = (timestamp, temperature_handler(message)[1], measure())
+        with lock:
+            samples.append(sample)
+
+    def reached_stop() -> bool:
+        # the crystal temperature lags the setpoint
+        return len(samples) > 0 and abs(samples[-1][1] - stop) <= max(
+            ramp_step, tolerance
+        )
+
+    amplifier.shg_temperature = start
+    settle(start)
+    ramp(
+        amplifier,
+        "shg_temperature",
+        start,
+        stop,
+        ramp_rate,
+        ramp_step,
+        record=(PrecilaserReturn.AMP_TEC_TEMPERATURE,),
+        callback=on_frame,
+        hold_until=reached_stop,
+        timeout=timeout,
+    )
+    if len(samples) == 0:
+        raise TimeoutError("no TEC temperature messages received during the ramp")
+
+    _, peak_temperature, peak_value = max(samples, key=lambda sample: sample[2])
+    above = [
+        temperature for _, temperature, value in samples if value >= peak_value / 2
+    ]
+    low, high = min(start, stop), max(start, stop)
+    a = max(min(above) - tolerance, low)
+    b = min(max(above) + tolerance, high)
+
+    points: list[ScanPoint] = []
+
+    def evaluate(temperature: float) -> float:
+        temperature = round(temperature, 2)
+        for point in points:
+            if point.setpoint == temperature:
+                return point.measurements["value"]
+        amplifier.shg_temperature = temperature
+        settle(temperature)
+        point = ScanPoint(len(points), temperature, time.time())
+        point.measurements["value"] = measure()
+        points.append(point)
+        return point.measurements["value"]
+
+    _brent_maximize(
+        evaluate, a, b, min(max(peak_temperature, a), b), tolerance, max_points
+    )
+    best = max(points, key=lambda point: point.measurements["value"])
+    return PeakResult(best.setpoint, best.measurements["value"], samples, points)
@@ -1,14 +1,89 @@
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 
+from .bus import PrecilaserBus
+from .cache import WavelengthParamCache
 from .device import AbstractPrecilaserDevice
-from .enums import Endian, PrecilaserCommand, PrecilaserDeviceType
+from .enums import Endian, PrecilaserCommand, PrecilaserDeviceType, PrecilaserReturn
+from .message import PrecilaserFrame
 from .status import SeedStatus
+from .wavelength import WavelengthCalibration
 
+# maximum difference [nm] between the status wavelength and the wavelength calculated
+# from cached wavelength parameters
+WAVELENGTH_TOLERANCE = 1e-3
+
+
+def status_handler(message: PrecilaserFrame) -> SeedStatus:
+    """
+    Message handler for receiving the status message from the seed.
+
+    Args:
+        message (PrecilaserFrame): message with the status payload
+
+    Raises:
+        ValueError: Raise if the payload is empty
+
+    Returns:
+        SeedStatus: seed status dataclass
+    """
+    if message.payload is None:
+        raise ValueError("no status data bytes retrieved")
+    return SeedStatus(message.payload, message.endian)
+
+
+def serial_wavelength_handler(
+    message: PrecilaserFrame,
+) -> Tuple[bytes, Tuple[int, ...]]:
+    """
+    Message handler for the reply with the serial number and wavelength parameters
+
+    Args:
+        message (PrecilaserFrame): SEED_SERIAL_WAV reply
+
+    Returns:
+        Tuple[bytes, Tuple[int, ...]]: serial number and wavelength parameters
+    """
+    serial = message.payload[16:24].tobytes()
+    parameter_bytes = message.payload[25 : 25 + 64]
+    return serial, tuple(parameter_bytes[i] for i in range(6))
+
+
+def cached_wavelength_params(
+    cache: Optional[WavelengthParamCache], key: Optional[str], status: SeedStatus
+) -> Optional[Tuple[bytes, Tuple[int, ...]]]:
+    """
+    Retrieve the cached serial number and wavelength parameters of a seed. The cached
+    parameters are only returned if the wavelength they give for the grating
+    temperature matches the wavelength in the status, which catches a different seed
+    connected to the same port and address.
+
+    Args:
+        cache (Optional[WavelengthParamCache]): wavelength parameter cache
+        key (Optional[str]): port and address of the seed
+        status (SeedStatus): seed status
+
+    Returns:
+        Optional[Tuple[bytes, Tuple[int, ...]]]: serial number and wavelength
+                                                parameters, None if not cached
+    """
+    if cache is None or key is None:
+        return None
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    calibration = WavelengthCalibration.from_params(cached[1])
+    wavelength = calibration.wavelength(status.temperature_act)
+    if abs(wavelength - status.wavelength) > WAVELENGTH_TOLERANCE:
+        return None
+    return cached
+
+
+class Seed(AbstractPrecilaserDevice[SeedStatus]):
+    _status_return = PrecilaserReturn.SEED_STATUS
 
-class Seed(AbstractPrecilaserDevice):
     def __init__(
         self,
-        port: str,
+        port: Union[str, PrecilaserBus],
         address: int,
         header: bytes = b"P",
         terminator: bytes = b"\r\n",
@@ -21,32 +96,48 @@ class Seed(AbstractPrecilaserDevice):
         )
         self.serial: Optional[bytes] = None
         self.wavelength_params: Optional[Tuple[int, ...]] = None
+        # optional on-disk cache of the serial number and wavelength parameters
+        self.wavelength_cache: Optional[WavelengthParamCache] = None
+        # calibration computed from wavelength_params, with the parameters it was
+        # computed from
+        self._calibration: Optional[Tuple[Tuple[int, ...], WavelengthCalibration]] = (
+            None
+        )
+        # status replies are transformed to a SeedStatus and written to _status, which
+        # status returns while it is younger than max_age
+        self._message_handling[PrecilaserReturn.SEED_STATUS] = (
+            "_status",
+            status_handler,
+        )
+        self._status: Optional[SeedStatus] = None
 
     def _set_value(
         self,
         value: int,
         command: PrecilaserCommand,
+        return_command: PrecilaserReturn,
         nbytes: int = 2,
         save: bool = False,
-    ):
+    ) -> PrecilaserFrame:
         payload = value.to_bytes(nbytes, self.endian)
         if save:
             payload += b"1"
         else:
             payload += b"0"
         message = self._generate_message(command, payload)
-        self._write(message)
-        return
+        reply = self._query(message, return_command)
+        self.invalidate_status()
+        return reply
 
     @property
     def status(self) -> SeedStatus:
+        if self._status_fresh():
+            assert self._status is not None
+            return self._status
         message = self._generate_message(PrecilaserCommand.SEED_STATUS)
-        self._write(message)
-        message = self._read()
-        if message.payload is not None:
-            return SeedStatus(message.payload, self.endian)
-        else:
-            raise ValueError("no status data bytes retrieved")
+        self._query(message, PrecilaserReturn.SEED_STATUS)
+        assert self._status is not None
+        return self._status
 
     @property
     def temperature_setpoint(self) -> float:
@@ -55,8 +146,9 @@ class Seed(AbstractPrecilaserDevice):
     @temperature_setpoint.setter
     def temperature_setpoint(self, temperature: float):
         setpoint = int(temperature * 1_000)
-        self._set_value(setpoint, PrecilaserCommand.SEED_SET_TEMP)
-        message = self._read()
+        message = self._set_value(
+            setpoint, PrecilaserCommand.SEED_SET_TEMP, PrecilaserReturn.SEED_SET_TEMP
+        )
         if message.payload is not None:
             self._check_write_return(
                 message.payload[:2], setpoint, "temperature setpoint"
@@ -74,8 +166,11 @@ class Seed(AbstractPrecilaserDevice):
             "Piezo voltage cannot exceed 0V-74V range"
         )
         setpoint = int(voltage * 100)
-        self._set_value(setpoint, PrecilaserCommand.SEED_SET_VOLTAGE)
-        message = self._read()
+        message = self._set_value(
+            setpoint,
+            PrecilaserCommand.SEED_SET_VOLTAGE,
+            PrecilaserReturn.SEED_SET_VOLTAGE,
+        )
         if message.payload is not None:
             self._check_write_return(message.payload[:2], setpoint, "piezo voltage")
         else:
@@ -119,49 +214,78 @@ class Seed(AbstractPrecilaserDevice):
     #     # message = self._read()
     #     # self._check_write_return(message.payload, False, "disable laser")
 
+    def _cache_key(self) -> Optional[str]:
+        port = getattr(self.instrument, "port", None)
+        if port is None:
+            return None
+        return f"{port}:{self.address}"
+
     def _get_serial_wavelength_params(self):
         message = self._generate_message(PrecilaserCommand.SEED_SERIAL_WAV)
-        self._write(message)
-        message = self._read()
-        self.serial = message.payload[16:24]
-        parameter_bytes = message.payload[25 : 25 + 64]
-        self.wavelength_params = [parameter_bytes[i] for i in range(6)]
+        reply = self._query(message, PrecilaserReturn.SEED_SERIAL_WAV)
+        self.serial, self.wavelength_params = serial_wavelength_handler(reply)
+        key = self._cache_key()
+        if self.wavelength_cache is not None and key is not None:
+            self.wavelength_cache.set(key, self.serial, self.wavelength_params)
+
+    def _load_cached_wavelength_params(self, status: SeedStatus) -> bool:
+        """
+        Load the serial number and wavelength parameters from wavelength_cache. The
+        cached parameters are only used if the wavelength they give for the grating
+        temperature matches the wavelength in the status, which catches a different
+        seed connected to the same port and address.
+
+        Args:
+            status (SeedStatus): seed status
+
+        Returns:
+            bool: True if the cached parameters were loaded
+        """
+        cached = cached_wavelength_params(
+            self.wavelength_cache, self._cache_key(), status
+        )
+        if cached is None:
+            return False
+        self.serial, self.wavelength_params = cached
+        return True
+
+    def load_wavelength_params(self) -> None:
+        """
+        Load the serial number and wavelength parameters, from wavelength_cache if
+        they are cached and match the device, otherwise from the device
+        """
+        if not self._load_cached_wavelength_params(self.status):
+            self._get_serial_wavelength_params()
+
+    @property
+    def wavelength_calibration(self) -> WavelengthCalibration:
+        """
+        Calibration between grating temperature and wavelength, computed once from
+        wavelength_params; the parameters are loaded if required. Use it to convert
+        arrays of temperatures and wavelengths, see precilaser.wavelength.
+
+        Returns:
+            WavelengthCalibration: wavelength calibration
+        """
+        if self.wavelength_params is None:
+            self.load_wavelength_params()
+        assert self.wavelength_params is not None
+        parameters = tuple(self.wavelength_params)
+        if self._calibration is None or self._calibration[0] != parameters:
+            self._calibration = (
+                parameters,
+                WavelengthCalibration.from_params(parameters),
+            )
+        return self._calibration[1]
 
     @property
     def wavelength(self) -> float:
         status = self.status
-        temp_grating_act = status.temperature_act * 1_000
-        assert self.wavelength_params is not None, (
-            "Wavelength parameters not loaded from device"
-        )
-        parameter = self.wavelength_params
-        wavelength = (
-            (parameter[0] << 8) | parameter[1]
-        ) * temp_grating_act / 10_000 + (
-            parameter[2] << 24
-            | parameter[3] << 16
-            | ((parameter[4] << 8) | parameter[5])
-        )
-        # manual states / 1_000 but this yields an incorrect wavelength
-        return wavelength / 10_000
+        if self.wavelength_params is None:
+            if not self._load_cached_wavelength_params(status):
+                self._get_serial_wavelength_params()
+        return self.wavelength_calibration.wavelength(status.temperature_act)
 
     @wavelength.setter
     def wavelength(self, wavelength: float):
-        assert self.wavelength_params is not None, (
-            "Wavelength parameters not loaded from device"
-        )
-        parameter = self.wavelength_params
-        temp_grating_act = (
-            (
-                wavelength * 10_000
-                - (
-                    parameter[2] << 24
-                    | parameter[3] << 16
-                    | ((parameter[4] << 8) | parameter[5])
-                )
-            )
-            * 10_000
-            / ((parameter[0] << 8) | parameter[1])
-        )
-        temp_set = temp_grating_act / 1_000
-        self.temperature_setpoint = temp_set
+        self.temperature_setpoint = self.wavelength_calibration.temperature(wavelength)
@@ -0,0 +1,373 @@
+import math
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+from .amplifier import Amplifier, SHGAmplifier, temperature_handler
+from .enums import Endian, PrecilaserReturn
+from .message import PrecilaserFrame, PrecilaserReturnParamLength
+from .status import AmplifierStatus
+
+# The shared memory block holds the latest amplifier status and TEC temperatures and
+# a ring of the most recent frames, written by a single publisher and read by any
+# number of processes. Consistency is guaranteed by a seqlock: the publisher
+# increments the sequence before and after each update, so it is odd during an update,
+# and readers retry until they copied the state between two reads of the same, even,
+# sequence. Readers never block the publisher.
+#
+# layout, little endian:
+#   header: magic (4s) | version (B) | SHG amplifier (B) | address (B) |
+#           little endian status payload (B) | ring length (H) | frame size (H) |
+#           padding (4x)
+#   sequence (<Q)
+#   state: frames published (Q) | status timestamp (d) | TEC temperature timestamp (d)
+#          | TEC temperatures (2d) | status payload
+#   ring of ring length records: timestamp (d) | frame length (H) | frame, zero padded
+#          to the frame size
+# Timestamps are time.monotonic() receive times, NaN if nothing was received yet.
+
+_MAGIC = b"PLSM"
+_VERSION = 2
+_HEADER = struct.Struct("<4sBBBBHH4x")
+_SEQUENCE = struct.Struct("<Q")
+_STATE = struct.Struct("<Qdddd")
+_RECORD = struct.Struct("<dH")
+
+_SEQUENCE_OFFSET = _HEADER.size
+_STATE_OFFSET = _SEQUENCE_OFFSET + _SEQUENCE.size
+_STATUS_OFFSET = _STATE_OFFSET + _STATE.size
+_STATUS_SIZE = PrecilaserReturnParamLength.AMP_STATUS
+_RING_OFFSET = _STATUS_OFFSET + _STATUS_SIZE
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    # before Python 3.13 attaching registers the block with the resource tracker of
+    # this process, which unlinks it when the process exits even though the
+    # publisher owns it; undo the registration
+    shm = shared_memory.SharedMemory(name)
+    resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    return shm
+
+
+class SharedMemoryPublisher:
+    def __init__(
+        self,
+        amplifier: Amplifier,
+        name: Optional[str] = None,
+        ring_length: int = 64,
+        start_reader: bool = True,
+    ):
+        """
+        Publishes the latest status, TEC temperatures (for an SHGAmplifier) and a ring
+        of the most recent frames of an amplifier to a shared memory block, so several
+        processes can read the amplifier telemetry while only this one owns the
+        serial port. Read the block from other processes with SharedMemoryAmplifier.
+
+        Args:
+            amplifier (Amplifier): amplifier to publish
+            name (Optional[str], optional): shared memory block name. Defaults to
+                                        None, which generates a unique name.
+            ring_length (int, optional): number of recent frames kept. Defaults to
+                                        64.
+            start_reader (bool, optional): start the background reader of the
+                                        amplifier on start() if it isn't running.
+                                        Defaults to True.
+        """
+        if ring_length < 1:
+            raise ValueError("ring_length must be at least 1")
+        self.amplifier = amplifier
+        self.ring_length = ring_length
+        self.start_reader = start_reader
+        header_length = len(amplifier.header)
+        terminator_length = len(amplifier.terminator)
+        param_length = max(
+            getattr(PrecilaserReturnParamLength, ret.name) for ret in PrecilaserReturn
+        )
+        self.frame_size = header_length + 4 + param_length + 2 + terminator_length
+        self._record_size = _RECORD.size + self.frame_size
+        self._shm = shared_memory.SharedMemory(
+            name, create=True, size=_RING_OFFSET + ring_length * self._record_size
+        )
+        assert self._shm.buf is not None
+        self._buf: memoryview = self._shm.buf
+        _HEADER.pack_into(
+            self._buf,
+            0,
+            _MAGIC,
+            _VERSION,
+            isinstance(amplifier, SHGAmplifier),
+            amplifier.address,
+            amplifier.endian == "little",
+            ring_length,
+            self.frame_size,
+        )
+        self._sequence = 0
+        self._frames = 0
+        self._status_timestamp = math.nan
+        self._tec_timestamp = math.nan
+        self._temperatures = (math.nan, math.nan)
+        _SEQUENCE.pack_into(self._buf, _SEQUENCE_OFFSET, self._sequence)
+        self._pack_state()
+        # callbacks may run in the reader thread and in threads reading synchronously
+        self._lock = threading.Lock()
+        self._subscribed: list[PrecilaserReturn] = []
+        self._started_reader = False
+        self._closed = False
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block"""
+        return self._shm.name
+
+    def _pack_state(self) -> None:
+        _STATE.pack_into(
+            self._buf,
+            _STATE_OFFSET,
+            self._frames,
+            self._status_timestamp,
+            self._tec_timestamp,
+            *self._temperatures,
+        )
+
+    def _publish(self, message: PrecilaserFrame) -> None:
+        timestamp = self.amplifier._timestamps.get(message.command, time.monotonic())
+        frame = message.frame
+        with self._lock:
+            self._sequence += 1
+            _SEQUENCE.pack_into(self._buf, _SEQUENCE_OFFSET, self._sequence)
+            if message.command == PrecilaserReturn.AMP_STATUS:
+                self._buf[_STATUS_OFFSET:_RING_OFFSET] = message.payload
+                self._status_timestamp = timestamp
+            elif message.command == PrecilaserReturn.AMP_TEC_TEMPERATURE:
+                self._temperatures = temperature_handler(message)
+                self._tec_timestamp = timestamp
+            if len(frame) <= self.frame_size:
+                offset = _RING_OFFSET + (
+                    self._frames % self.ring_length * self._record_size
+                )
+                _RECORD.pack_into(self._buf, offset, timestamp, len(frame))
+                start = offset + _RECORD.size
+                self._buf[start : start + len(frame)] = frame
+                self._frames += 1
+            self._pack_state()
+            self._sequence += 1
+            _SEQUENCE.pack_into(self._buf, _SEQUENCE_OFFSET, self._sequence)
+
+    def start(self) -> None:
+        """Subscribe to all frames of the amplifier and start its reader."""
+        for return_command in PrecilaserReturn:
+            self.amplifier.subscribe(return_command, self._publish)
+            self._subscribed.append(return_command)
+        if self.start_reader and not self.amplifier.reader_running:
+            self.amplifier.start_reader()
+            self._started_reader = True
+
+    def close(self) -> None:
+        """Stop publishing and remove the shared memory block."""
+        for return_command in self._subscribed:
+            self.amplifier.unsubscribe(return_command, self._publish)
+        self._subscribed = []
+        if self._started_reader:
+            self.amplifier.stop_reader()
+            self._started_reader = False
+        if not self._closed:
+            self._closed = True
+            self._shm.close()
+            self._shm.unlink()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class SharedMemoryAmplifier:
+    def __init__(self, name: str, timeout: float = 1.0):
+        """
+        Read-only view of an amplifier published by a SharedMemoryPublisher in
+        another process, with the same status properties as Amplifier and
+        SHGAmplifier. Reads copy the state from shared memory without any IPC or
+        locking; the status is only decoded again after the publisher updated it.
+
+        Args:
+            name (str): shared memory block name, see SharedMemoryPublisher.name
+            timeout (float, optional): time [s] to wait for a first status or TEC
+                                        temperature message, and for an update of
+                                        the publisher to complete. Defaults to 1 s.
+
+        Raises:
+            ValueError: raises if the block isn't written by a SharedMemoryPublisher
+        """
+        self.timeout = timeout
+        self._shm = _attach(name)
+        self._closed = False
+        assert self._shm.buf is not None
+        self._buf: memoryview = self._shm.buf
+        magic, version, shg, address, little, ring_length, frame_size = (
+            _HEADER.unpack_from(self._buf, 0)
+        )
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"{name} is not a precilaser shared memory block")
+        self.shg = bool(shg)
+        self.address = address
+        self.endian: Endian = "little" if little else "big"
+        self.ring_length = ring_length
+        self.frame_size = frame_size
+        self._record_size = _RECORD.size + frame_size
+        self._sequence = -1
+        self._state: Tuple[int, float, float, float, float] = (0, *(math.nan,) * 4)
+        self._status_payload = b""
+        self._status: Optional[AmplifierStatus] = None
+
+    def _read(self, end: int) -> Tuple[int, bytes]:
+        """
+        Copy the shared memory from the state up to end once no update is in progress
+
+        Args:
+            end (int): end offset of the copy
+
+        Raises:
+            TimeoutError: raises if an update doesn't complete within the timeout,
+                            e.g. because the publisher died while writing
+
+        Returns:
+            Tuple[int, bytes]: sequence and copied bytes
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            (sequence,) = _SEQUENCE.unpack_from(self._buf, _SEQUENCE_OFFSET)
+            if sequence % 2 == 0:
+                data = bytes(self._buf[_STATE_OFFSET:end])
+                if _SEQUENCE.unpack_from(self._buf, _SEQUENCE_OFFSET)[0] == sequence:
+                    return sequence, data
+            if time.monotonic() > deadline:
+                raise TimeoutError("shared memory update not completed by publisher")
+            # the publisher is writing; let it finish
+            time.sleep(0)
+
+    def _update(self) -> None:
+        (sequence,) = _SEQUENCE.unpack_from(self._buf, _SEQUENCE_OFFSET)
+        if sequence == self._sequence:
+            return
+        self._sequence, data = self._read(_RING_OFFSET)
+        self._state = _STATE.unpack_from(data)
+        status_payload = data[_STATE.size :]
+        if status_payload != self._status_payload:
+            self._status_payload = status_payload
+            self._status = None
+
+    def _wait(self, index: int, what: str) -> None:
+        deadline = time.monotonic() + self.timeout
+        self._update()
+        while math.isnan(self._state[index]):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"no {what} published")
+            time.sleep(0.001)
+            self._update()
+
+    @property
+    def status(self) -> AmplifierStatus:
+        """
+        Latest published status, waiting for the first status up to the timeout
+
+        Returns:
+            AmplifierStatus: amplifier status
+        """
+        self._wait(1, "status")
+        if self._status is None:
+            self._status = AmplifierStatus(self._status_payload, self.endian)
+        return self._status
+
+    @property
+    def status_timestamp(self) -> Optional[float]:
+        """
+        Time at which the latest status message was received, in seconds of
+        time.monotonic()
+
+        Returns:
+            Optional[float]: receive time [s], None if no status was received yet
+        """
+        self._update()
+        timestamp = self._state[1]
+        return None if math.isnan(timestamp) else timestamp
+
+    @property
+    def fault(self) -> bool:
+        status = self.status
+        fault = sum([pds.fault for pds in status.pd_status]) != 0
+        fault |= status.system_status.fault
+        return fault
+
+    @property
+    def current(self) -> Tuple[float, ...]:
+        """
+        Amplifier current [A] of all stages
+
+        Returns:
+            Tuple[float, ...]: amplifier current [A] of all stages
+        """
+        return self.status.driver_current
+
+    @property
+    def shg_temperature(self) -> float:
+        """
+        Temperature [C] of the SHG crystal
+
+        Returns:
+            float: crystal temperature [C]
+        """
+        if not self.shg:
+            raise AttributeError("published amplifier is not an SHG amplifier")
+        self._wait(2, "TEC temperature")
+        return self._state[4]
+
+    @property
+    def shg_temperature_timestamp(self) -> Optional[float]:
+        """
+        Time at which the latest TEC temperature message was received, in seconds of
+        time.monotonic()
+
+        Returns:
+            Optional[float]: receive time [s], None if no temperatures were received yet
+        """
+        self._update()
+        timestamp = self._state[2]
+        return None if math.isnan(timestamp) else timestamp
+
+    def frames(self) -> list[Tuple[float, bytes]]:
+        """
+        Most recent frames, oldest first; decode them with message.decode_message
+
+        Returns:
+            list[Tuple[float, bytes]]: receive time [s] of time.monotonic() and frame
+        """
+        _, data = self._read(_RING_OFFSET + self.ring_length * self._record_size)
+        count = _STATE.unpack_from(data)[0]
+        frames = []
+        ring_start = _RING_OFFSET - _STATE_OFFSET
+        for index in range(max(count - self.ring_length, 0), count):
+            offset = ring_start + index % self.ring_length * self._record_size
+            timestamp, length = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            frames.append((timestamp, data[start : start + length]))
+        return frames
+
+    def close(self) -> None:
+        """Detach from the shared memory block."""
+        if not self._closed:
+            self._closed = True
+            self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,628 @@
+import heapq
+import math
+import random
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence, Tuple
+
+from .enums import Endian, PrecilaserCommand, PrecilaserMessageType, PrecilaserReturn
+from .framer import PrecilaserFramer
+from .message import PrecilaserReturnParamLength, frame_template
+
+# replies and periodic messages of a simulated device: return code and payload
+_Messages = list[Tuple[PrecilaserReturn, bytes]]
+
+
+class VirtualClock:
+    def __init__(self, start: float = 0.0, epoch: float = 1_700_000_000.0):
+        """
+        Clock that only advances when slept on, so simulated scans and stability
+        waits run as fast as the code driving them. Provides the time, monotonic,
+        perf_counter and sleep functions of the time module; patch() substitutes the
+        clock for the time module of the precilaser modules.
+
+        Args:
+            start (float): initial monotonic time [s]. Defaults to 0.
+            epoch (float): wall-clock time [s] since the epoch at the initial
+                            monotonic time. Defaults to 1_700_000_000.
+        """
+        self._now = start
+        self._epoch = epoch - start
+        self._lock = threading.Lock()
+
+    def monotonic(self) -> float:
+        return self._now
+
+    perf_counter = monotonic
+
+    def time(self) -> float:
+        return self._epoch + self._now
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Advance the clock
+
+        Args:
+            seconds (float): time to advance [s]
+        """
+        if seconds < 0:
+            raise ValueError("sleep length must be non-negative")
+        with self._lock:
+            self._now += seconds
+
+    @contextmanager
+    def patch(self, *modules: Any) -> Iterator["VirtualClock"]:
+        """
+        Substitute the clock for the time module in modules that use `import time`,
+        restoring the time module on exit.
+
+        Args:
+            *modules: modules to patch. Defaults to all imported precilaser modules.
+
+        Yields:
+            VirtualClock: the clock
+        """
+        if len(modules) == 0:
+            modules = tuple(
+                module
+                for name, module in list(sys.modules.items())
+                if name.split(".")[0] == "precilaser"
+                and getattr(module, "time", None) is sys.modules["time"]
+            )
+        originals = [(module, module.time) for module in modules]
+        for module in modules:
+            module.time = self
+        try:
+            yield self
+        finally:
+            for module, original in originals:
+                module.time = original
+
+
+class SimulatedDevice:
+    # interval [s] of the periodic messages, None if the device sends none
+    period: Optional[float] = None
+
+    def __init__(self, address: int, endian: Endian = "big", seed: int = 0):
+        """
+        Simulated Precilaser device; subclasses implement the replies to commands and
+        the periodic messages.
+
+        Args:
+            address (int): device address
+            endian (str): endian of message payload. Defaults to "big".
+            seed (int): seed of the noise generator. Defaults to 0.
+        """
+        self.address = address
+        self.endian = endian
+        self.rng = random.Random(seed)
+        self.now = 0.0
+
+    def advance(self, now: float) -> None:
+        """
+        Advance the device state to time now
+
+        Args:
+            now (float): monotonic time [s]
+        """
+        self.now = now
+
+    def handle(self, command: PrecilaserCommand, payload: bytes) -> _Messages:
+        """
+        Handle a command
+
+        Args:
+            command (PrecilaserCommand): command
+            payload (bytes): command payload
+
+        Returns:
+            list[Tuple[PrecilaserReturn, bytes]]: reply messages
+        """
+        return []
+
+    def periodic(self) -> _Messages:
+        """
+        Messages sent every period
+
+        Returns:
+            list[Tuple[PrecilaserReturn, bytes]]: periodic messages
+        """
+        return []
+
+    def _uint(self, value: float, nbytes: int = 2) -> bytes:
+        value = min(max(int(round(value)), 0), (1 << (8 * nbytes)) - 1)
+        return value.to_bytes(nbytes, self.endian)
+
+
+def _payload(return_command: PrecilaserReturn, data: bytes = b"") -> bytes:
+    """Pad data with zeros to the payload length of return_command."""
+    length = getattr(PrecilaserReturnParamLength, return_command.name)
+    return data[:length].ljust(length, b"\x00")
+
+
+def _first_order(value: float, setpoint: float, dt: float, tau: float) -> float:
+    return setpoint + (value - setpoint) * math.exp(-dt / tau)
+
+
+class SimulatedSeed(SimulatedDevice):
+    def __init__(
+        self,
+        address: int = 100,
+        endian: Endian = "big",
+        seed: int = 0,
+        temperature: float = 25.0,
+        time_constant: float = 2.0,
+        temperature_noise: float = 0.0,
+        serial: bytes = b"SIM00001",
+        wavelength_params: Tuple[int, ...] = (0x03, 0xE8, 0x00, 0xA5, 0xAC, 0x1C),
+    ):
+        """
+        Simulated fiber DFB seed with a first-order grating temperature response
+
+        Args:
+            address (int): device address. Defaults to 100.
+            endian (str): endian of message payload. Defaults to "big".
+            seed (int): seed of the noise generator. Defaults to 0.
+            temperature (float): initial grating temperature and setpoint [C].
+                                Defaults to 25 C.
+            time_constant (float): grating temperature time constant [s]. Defaults to
+                                    2 s.
+            temperature_noise (float): standard deviation of the reported grating
+                                        temperature [C]. Defaults to 0.
+            serial (bytes): 8 byte serial number. Defaults to b"SIM00001".
+            wavelength_params (Tuple[int, ...]): wavelength parameter bytes. Defaults
+                                                to 1086 nm at 25 C and 0.01 nm/C.
+        """
+        super().__init__(address, endian, seed)
+        self.temperature_set = temperature
+        self.temperature = temperature
+        self.time_constant = time_constant
+        self.temperature_noise = temperature_noise
+        self.piezo_voltage = 0.0
+        self.current_set = 100
+        self.emission = True
+        self.serial = serial
+        self.wavelength_params = wavelength_params
+
+    def advance(self, now: float) -> None:
+        self.temperature = _first_order(
+            self.temperature, self.temperature_set, now - self.now, self.time_constant
+        )
+        super().advance(now)
+
+    @property
+    def wavelength(self) -> float:
+        """wavelength [nm] at the current grating temperature"""
+        p = self.wavelength_params
+        wavelength = ((p[0] << 8) | p[1]) * self.temperature * 1_000 / 10_000 + (
+            p[2] << 24 | p[3] << 16 | ((p[4] << 8) | p[5])
+        )
+        return wavelength / 10_000
+
+    def status_payload(self) -> bytes:
+        """SEED_STATUS payload of the current state"""
+        temperature = self.temperature + self.rng.gauss(0, self.temperature_noise)
+        payload = bytearray(_payload(PrecilaserReturn.SEED_STATUS))
+        payload[2:4] = self._uint(self.temperature_set * 1_000)
+        payload[4:6] = self._uint(self.current_set)
+        payload[13] = int(self.emission)
+        payload[15:17] = self._uint(25_000)
+        payload[18:20] = self._uint(temperature * 1_000)
+        payload[23:25] = self._uint(self.current_set if self.emission else 0)
+        payload[27:29] = self._uint(self.now // 3600)
+        payload[29] = int(self.now // 60 % 60)
+        payload[30:34] = self._uint(self.wavelength * 10_000, 4)
+        payload[34:36] = self._uint(self.piezo_voltage * 100)
+        payload[36:38] = self._uint(100 if self.emission else 0)
+        return bytes(payload)
+
+    def handle(self, command: PrecilaserCommand, payload: bytes) -> _Messages:
+        if command == PrecilaserCommand.SEED_STATUS:
+            return [(PrecilaserReturn.SEED_STATUS, self.status_payload())]
+        elif command == PrecilaserCommand.SEED_SET_TEMP:
+            self.temperature_set = int.from_bytes(payload[:2], self.endian) / 1_000
+            return [
+                (
+                    PrecilaserReturn.SEED_SET_TEMP,
+                    _payload(PrecilaserReturn.SEED_SET_TEMP, payload),
+                )
+            ]
+        elif command == PrecilaserCommand.SEED_SET_VOLTAGE:
+            self.piezo_voltage = int.from_bytes(payload[:2], self.endian) / 100
+            return [(PrecilaserReturn.SEED_SET_VOLTAGE, payload[:2])]
+        elif command == PrecilaserCommand.SEED_SERIAL_WAV:
+            data = bytes(16) + self.serial + b"\x00" + bytes(self.wavelength_params)
+            return [
+                (
+                    PrecilaserReturn.SEED_SERIAL_WAV,
+                    _payload(PrecilaserReturn.SEED_SERIAL_WAV, data),
+                )
+            ]
+        return []
+
+
+class SimulatedAmplifier(SimulatedDevice):
+    period = 0.3
+
+    def __init__(
+        self,
+        address: int = 0,
+        endian: Endian = "big",
+        seed: int = 0,
+        temperature_noise: float = 0.0,
+    ):
+        """
+        Simulated amplifier, sending a status message every 300 ms
+
+        Args:
+            address (int): device address. Defaults to 0.
+            endian (str): endian of message payload. Defaults to "big".
+            seed (int): seed of the noise generator. Defaults to 0.
+            temperature_noise (float): standard deviation of the reported
+                                        temperatures [C]. Defaults to 0.
+        """
+        super().__init__(address, endian, seed)
+        self.temperature_noise = temperature_noise
+        self.current = 0.0
+        self.enabled = False
+        self.power_stabilization = False
+
+    def status_payload(self) -> bytes:
+        """AMP_STATUS payload of the current state"""
+        payload = bytearray(_payload(PrecilaserReturn.AMP_STATUS))
+        payload[0] = int(self.power_stabilization)
+        # drivers enabled, interlock ok
+        payload[4] = (0b111111 if self.enabled else 0) | 1 << 6
+        current = self.current if self.enabled else 0.0
+        for offset in (7, 14, 21):
+            payload[offset : offset + 2] = self._uint(current * 100)
+        pd_value = self._uint(current * 1_000)
+        for offset in range(28, 36, 2):
+            payload[offset : offset + 2] = pd_value
+        payload[36:40] = b"\x01" * 4
+        for offset in range(42, 50, 2):
+            temperature = 25.0 + self.rng.gauss(0, self.temperature_noise)
+            payload[offset : offset + 2] = self._uint(temperature * 100)
+        return bytes(payload)
+
+    def handle(self, command: PrecilaserCommand, payload: bytes) -> _Messages:
+        if command == PrecilaserCommand.AMP_STATUS:
+            return [(PrecilaserReturn.AMP_STATUS, self.status_payload())]
+        elif command == PrecilaserCommand.AMP_ENABLE:
+            self.enabled = payload[0] != 0
+            return [(PrecilaserReturn.AMP_ENABLE, b"Enable set ok")]
+        elif command == PrecilaserCommand.AMP_SET_CURRENT:
+            self.current = int.from_bytes(payload[:2], self.endian) / 100
+            return [
+                (
+                    PrecilaserReturn.AMP_SET_CURRENT,
+                    _payload(PrecilaserReturn.AMP_SET_CURRENT, payload[:2]),
+                )
+            ]
+        elif command == PrecilaserCommand.AMP_POWER_STAB:
+            self.power_stabilization = payload[0] != 0
+            # the power stabilization command is answered with the enable return code
+            return [(PrecilaserReturn.AMP_ENABLE, b"Stable set ok")]
+        elif command == PrecilaserCommand.AMP_SAVE:
+            return [(PrecilaserReturn.AMP_SAVE, b"ROM saved")]
+        return []
+
+    def periodic(self) -> _Messages:
+        return [(PrecilaserReturn.AMP_STATUS, self.status_payload())]
+
+
+class SimulatedSHGAmplifier(SimulatedAmplifier):
+    def __init__(
+        self,
+        address: int = 0,
+        endian: Endian = "big",
+        seed: int = 0,
+        temperature_noise: float = 0.0,
+        shg_temperature: float = 40.0,
+        time_constant: float = 20.0,
+    ):
+        """
+        Simulated SHG amplifier, sending a status and a TEC temperature message every
+        300 ms. The SHG crystal temperature follows its setpoint with a first-order
+        response.
+
+        Args:
+            address (int): device address. Defaults to 0.
+            endian (str): endian of message payload. Defaults to "big".
+            seed (int): seed of the noise generator. Defaults to 0.
+            temperature_noise (float): standard deviation of the reported
+                                        temperatures [C]. Defaults to 0.
+            shg_temperature (float): initial SHG crystal temperature and setpoint [C].
+                                    Defaults to 40 C.
+            time_constant (float): SHG crystal temperature time constant [s].
+                                    Defaults to 20 s.
+        """
+        super().__init__(address, endian, seed, temperature_noise)
+        self.shg_temperature_set = shg_temperature
+        self.shg_temperature = shg_temperature
+        self.time_constant = time_constant
+
+    def advance(self, now: float) -> None:
+        self.shg_temperature = _first_order(
+            self.shg_temperature,
+            self.shg_temperature_set,
+            now - self.now,
+            self.time_constant,
+        )
+        super().advance(now)
+
+    def tec_payload(self) -> bytes:
+        """AMP_TEC_TEMPERATURE payload of the current state"""
+        temperature = self.shg_temperature + self.rng.gauss(0, self.temperature_noise)
+        data = b"\x00" + self._uint(25.0 * 100) + self._uint(temperature * 100)
+        return _payload(PrecilaserReturn.AMP_TEC_TEMPERATURE, data)
+
+    def handle(self, command: PrecilaserCommand, payload: bytes) -> _Messages:
+        if command == PrecilaserCommand.AMP_TEC_TEMPERATURE:
+            self.shg_temperature_set = int.from_bytes(payload[2:4], self.endian) / 100
+            return [(PrecilaserReturn.AMP_TEC_TEMPERATURE, self.tec_payload())]
+        return super().handle(command, payload)
+
+    def periodic(self) -> _Messages:
+        return super().periodic() + [
+            (PrecilaserReturn.AMP_TEC_TEMPERATURE, self.tec_payload())
+        ]
+
+
+class SimulatedSerial:
+    def __init__(
+        self,
+        devices: Sequence[SimulatedDevice],
+        clock: Any = None,
+        baudrate: int = 115200,
+        timeout: Optional[float] = 1.0,
+        latency: float = 0.005,
+        corruption_rate: float = 0.0,
+        partial_rate: float = 0.0,
+        seed: int = 0,
+        header: bytes = b"P",
+        terminator: bytes = b"\r\n",
+    ):
+        """
+        serial.Serial stand-in connected to simulated devices. Bytes arrive paced by
+        the baud rate, replies follow commands after a latency and devices with a
+        period send their periodic messages. Pass it to a PrecilaserBus to connect
+        Seed, Amplifier and SHGAmplifier instances to the simulated devices.
+
+        With a VirtualClock, waiting for data advances the clock instead of sleeping;
+        read synchronously (without a background reader) to keep runs deterministic.
+
+        Args:
+            devices (Sequence[SimulatedDevice]): simulated devices
+            clock: clock providing monotonic() and sleep(), e.g. a VirtualClock or
+                    the time module. Defaults to None, which creates a VirtualClock.
+            baudrate (int): baud rate used to pace the received bytes, 10 bits per
+                            byte. Defaults to 115200.
+            timeout (Optional[float]): read timeout [s]. Defaults to 1 s.
+            latency (float): delay [s] between a command and its reply. Defaults to
+                            5 ms.
+            corruption_rate (float): probability that a byte of a sent frame is
+                                    corrupted. Defaults to 0.
+            partial_rate (float): probability that a sent frame is cut short.
+                                    Defaults to 0.
+            seed (int): seed of the corruption generator. Defaults to 0.
+            header (bytes): message header. Defaults to b"P".
+            terminator (bytes): message terminator. Defaults to b"\\r\\n".
+        """
+        self.clock = VirtualClock() if clock is None else clock
+        self.devices = {device.address: device for device in devices}
+        # name of the port, as serial.Serial.port
+        self.port = "SIM"
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.latency = latency
+        self.corruption_rate = corruption_rate
+        self.partial_rate = partial_rate
+        self.header = header
+        self.terminator = terminator
+        self.is_open = True
+        self.written = bytearray()
+
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._framer = PrecilaserFramer(None, header, terminator, "big")
+        self._now = self.clock.monotonic()
+        for device in self.devices.values():
+            device.now = self._now
+        # pending messages, ordered by send time: (time, sequence, address, messages)
+        self._events: list[Tuple[float, int, int, _Messages]] = []
+        self._sequence = 0
+        # next periodic message time per address
+        self._periodic = {
+            address: self._now + device.period
+            for address, device in self.devices.items()
+            if device.period is not None
+        }
+        # frames on the line: (time the first byte arrives, frame); the line sends
+        # one byte per byte time, frames are sent back-to-back
+        self._line: deque[Tuple[float, bytes]] = deque()
+        self._line_offset = 0
+        self._line_free = self._now
+
+    @property
+    def byte_time(self) -> float:
+        """time [s] to transmit a byte, with 8 data bits, a start and a stop bit"""
+        return 10 / self.baudrate
+
+    def _schedule(self, time: float, address: int, messages: _Messages) -> None:
+        heapq.heappush(self._events, (time, self._sequence, address, messages))
+        self._sequence += 1
+
+    def _next_event(self) -> float:
+        times = list(self._periodic.values())
+        if self._events:
+            times.append(self._events[0][0])
+        return min(times, default=math.inf)
+
+    def _transmit(self, time: float, device: SimulatedDevice, messages: _Messages):
+        for return_command, payload in messages:
+            frame = frame_template(
+                return_command,
+                device.address,
+                self.header,
+                self.terminator,
+                device.endian,
+                PrecilaserMessageType.RETURN,
+            ).encode(payload)[0]
+            if self.partial_rate and self._rng.random() < self.partial_rate:
+                frame = frame[: self._rng.randrange(1, len(frame))]
+            if self.corruption_rate:
+                data = bytearray(frame)
+                for index in range(len(data)):
+                    if self._rng.random() < self.corruption_rate:
+                        data[index] = self._rng.randrange(256)
+                frame = bytes(data)
+            start = max(time, self._line_free)
+            self._line.append((start, frame))
+            self._line_free = start + len(frame) * self.byte_time
+
+    def _advance(self, now: float) -> None:
+        """Send all messages due up to time now."""
+        while True:
+            time = self._next_event()
+            if time > now:
+                break
+            if self._events and self._events[0][0] == time:
+                _, _, address, messages = heapq.heappop(self._events)
+                device = self.devices[address]
+                device.advance(time)
+            else:
+                address = min(self._periodic, key=self._periodic.__getitem__)
+                device = self.devices[address]
+                device.advance(time)
+                messages = device.periodic()
+                assert device.period is not None
+                self._periodic[address] = time + device.period
+            self._transmit(time, device, messages)
+        for device in self.devices.values():
+            device.advance(now)
+        self._now = now
+
+    def _available(self, now: float) -> int:
+        """number of received bytes at time now"""
+        available = 0
+        offset = self._line_offset
+        for start, frame in self._line:
+            count = min(int((now - start) / self.byte_time + 1e-9), len(frame))
+            if count <= offset:
+                break
+            available += count - offset
+            if count < len(frame):
+                break
+            offset = 0
+        return available
+
+    def _arrival(self, n: int, now: float) -> float:
+        """time at which n bytes will have been received"""
+        offset = self._line_offset
+        for start, frame in self._line:
+            if n <= len(frame) - offset:
+                return start + (offset + n) * self.byte_time
+            n -= len(frame) - offset
+            offset = 0
+        # more bytes are needed than are on the line; wait for the bytes still in
+        # transit or the next message, whichever comes first
+        in_transit = self._line_free if self._line_free > now else math.inf
+        return min(in_transit, self._next_event())
+
+    def _take(self, n: int) -> bytes:
+        chunks = []
+        while n > 0:
+            start, frame = self._line[0]
+            chunk = frame[self._line_offset : self._line_offset + n]
+            chunks.append(chunk)
+            n -= len(chunk)
+            self._line_offset += len(chunk)
+            if self._line_offset == len(frame):
+                self._line.popleft()
+                self._line_offset = 0
+        return b"".join(chunks)
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            now = self.clock.monotonic()
+            self._advance(now)
+            return self._available(now)
+
+    def read(self, n: int = 1) -> bytes:
+        """
+        Read n bytes, waiting until they are received or the timeout elapses
+
+        Args:
+            n (int): number of bytes
+
+        Returns:
+            bytes: received bytes, fewer than n if the timeout elapsed
+        """
+        start = self.clock.monotonic()
+        deadline = math.inf if self.timeout is None else start + self.timeout
+        while True:
+            with self._lock:
+                now = self.clock.monotonic()
+                self._advance(now)
+                available = self._available(now)
+                if available >= n or now >= deadline:
+                    return self._take(min(n, available))
+                arrival = self._arrival(n, now)
+            wake = min(arrival, deadline)
+            if math.isinf(wake):
+                # nothing will ever arrive
+                with self._lock:
+                    return self._take(available)
+            self.clock.sleep(max(wake - now, 0.0))
+
+    def write(self, data: bytes) -> int:
+        """
+        Write commands to the simulated devices
+
+        Args:
+            data (bytes): command frames
+
+        Returns:
+            int: number of bytes written
+        """
+        with self._lock:
+            now = self.clock.monotonic()
+            self._advance(now)
+            self.written += data
+            self._framer.feed(data)
+            # replies are sent after the command is transmitted plus the latency
+            reply_time = now + len(data) * self.byte_time + self.latency
+            header_length = len(self.header)
+            for frame in self._framer.frames():
+                device = self.devices.get(frame[header_length + 1])
+                try:
+                    command = PrecilaserCommand(
+                        frame[header_length + 2 : header_length + 3]
+                    )
+                except ValueError:
+                    continue
+                if device is None:
+                    continue
+                payload = frame[
+                    header_length + 4 : len(frame) - 2 - len(self.terminator)
+                ]
+                device.advance(now)
+                messages = device.handle(command, payload)
+                if messages:
+                    self._schedule(reply_time, device.address, messages)
+        return len(data)
+
+    def reset_input_buffer(self) -> None:
+        """Discard all received bytes."""
+        with self._lock:
+            now = self.clock.monotonic()
+            self._advance(now)
+            available = self._available(now)
+            self._take(available)
+
+    def close(self) -> None:
+        self.is_open = False
@@ -1,10 +1,12 @@
-from dataclasses import dataclass, field
-from typing import Tuple
+import struct
+from dataclasses import FrozenInstanceError, asdict, dataclass, field, is_dataclass
+from functools import lru_cache
+from typing import Any, Callable, Generic, Tuple, TypeVar, Union, overload
 
 from .enums import Endian
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SystemStatus:
     status: int = field(repr=False)
     pd_protection: Tuple[bool, ...] = field(init=False)
@@ -28,7 +30,7 @@ class SystemStatus:
         object.__setattr__(self, "fault", self.status != 0)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DriverUnlock:
     driver_unlock: int = field(repr=False)
     driver_enable_control: Tuple[bool, ...] = field(init=False)
@@ -48,7 +50,7 @@ class DriverUnlock:
         object.__setattr__(self, "interlock", interlock)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PDStatus:
     status: int = field(repr=False)
     sampling_enable: bool = field(init=False)
@@ -61,173 +63,436 @@ class PDStatus:
     fault: bool = field(init=False)
 
     def __post_init__(self):
-        for idf, f in enumerate(self.__dataclass_fields__):
-            if f in ["status", "fault"]:
-                continue
-            idf -= 1
-            object.__setattr__(self, f, bool(self.status >> idf & 1))
-
-        object.__setattr__(
-            self,
-            "fault",
-            self.hardware_protection_event
-            | self.upper_limit_event
-            | self.lower_limit_event,
+        status = self.status
+        object.__setattr__(self, "sampling_enable", bool(status & 1))
+        object.__setattr__(self, "hardware_protection", bool(status >> 1 & 1))
+        object.__setattr__(self, "upper_limit_enabled", bool(status >> 2 & 1))
+        object.__setattr__(self, "lower_limit_enabled", bool(status >> 3 & 1))
+        object.__setattr__(self, "hardware_protection_event", bool(status >> 4 & 1))
+        object.__setattr__(self, "upper_limit_event", bool(status >> 5 & 1))
+        object.__setattr__(self, "lower_limit_event", bool(status >> 6 & 1))
+        object.__setattr__(self, "fault", bool(status >> 4 & 0b111))
+
+
+# the register dataclasses are immutable, so instances are shared between statuses;
+# the 8 bit registers are decoded once for every possible value
+_PD_STATUS = tuple(PDStatus(value) for value in range(256))
+_DRIVER_UNLOCK = tuple(DriverUnlock(value) for value in range(256))
+_system_status = lru_cache(maxsize=64)(SystemStatus)
+
+# struct formats of the multi-value fields, per endian
+_ENDIAN_PREFIX = {"big": ">", "little": "<"}
+_DRIVER_CURRENT_FORMAT = {e: f"{p}H5xH5xH" for e, p in _ENDIAN_PREFIX.items()}
+_FOUR_UINT16_FORMAT = {e: f"{p}4H" for e, p in _ENDIAN_PREFIX.items()}
+
+
+T = TypeVar("T")
+
+
+class _decoded(Generic[T]):
+    def __init__(self, decode: Callable[[Any], T]):
+        """
+        Status field that is decoded from the status bytes on first access. The decoded
+        value is cached in the slot named after the field with a leading underscore.
+
+        Args:
+            decode (Callable): function decoding the field from the status
+        """
+        self.decode = decode
+        self.__doc__ = decode.__doc__
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        # slot descriptor holding the decoded value
+        self.slot = owner.__dict__[f"_{name}"]
+
+    @overload
+    def __get__(self, instance: None, owner: Any = None) -> "_decoded[T]": ...
+
+    @overload
+    def __get__(self, instance: object, owner: Any = None) -> T: ...
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return self.slot.__get__(instance, owner)
+        except AttributeError:
+            value = self.decode(instance)
+            self.slot.__set__(instance, value)
+            return value
+
+
+class _LazyStatus:
+    __slots__ = ("status_bytes", "endian")
+    status_bytes: Union[bytes, memoryview]
+    endian: Endian
+    # decoded fields, in the order shown by repr
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, status_bytes: Union[bytes, memoryview], endian: Endian = "big"):
+        """
+        Status decoded lazily from the raw status bytes; each field is decoded on first
+        access and cached, so only the fields that are used cost any decoding.
+        Instances are immutable.
+
+        Args:
+            status_bytes (Union[bytes, memoryview]): status message payload
+            endian (str): endian of the status bytes. Defaults to "big".
+        """
+        object.__setattr__(self, "status_bytes", status_bytes)
+        object.__setattr__(self, "endian", endian)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def _int(self, start: int, stop: int) -> int:
+        return int.from_bytes(self.status_bytes[start:stop], self.endian)
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        assert isinstance(other, _LazyStatus)
+        return self.status_bytes == other.status_bytes and self.endian == other.endian
+
+    def __hash__(self) -> int:
+        return hash((bytes(self.status_bytes), self.endian))
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self._fields)
+        return f"{self.__class__.__name__}({fields})"
+
+    def __reduce__(self):
+        return (self.__class__, (bytes(self.status_bytes), self.endian))
+
+    def asdict(self) -> dict[str, Any]:
+        """
+        Decoded fields as a dict, with the register dataclasses (e.g. SystemStatus)
+        converted to dicts as well. Unlike dataclasses.asdict the status bytes and
+        endian are left out.
+
+        Returns:
+            dict[str, Any]: field values by field name
+        """
+        return {name: _asdict_value(getattr(self, name)) for name in self._fields}
+
+
+def _asdict_value(value: Any) -> Any:
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    if isinstance(value, tuple):
+        return tuple(_asdict_value(item) for item in value)
+    return value
+
+
+S = TypeVar("S", bound=_LazyStatus)
+
+
+def _dataclass_fields(cls: type[S]) -> type[S]:
+    """
+    Register the status bytes, endian and decoded fields of a status class as
+    dataclass fields, so dataclasses.fields(), replace() and asdict() work as they
+    did when the status was decoded eagerly in __post_init__. The decoded fields keep
+    their descriptors and aren't init arguments; equality, hashing and repr are
+    those of _LazyStatus.
+    """
+    annotations: dict[str, Any] = {
+        "status_bytes": Union[bytes, memoryview],
+        "endian": Endian,
+    }
+    for name in cls._fields:
+        decoded = cls.__dict__[name]
+        annotations[name] = decoded.decode.__annotations__.get("return", Any)
+        setattr(cls, name, field(default=decoded, init=False))
+    cls.__annotations__ = annotations
+    return dataclass(frozen=True, init=False, repr=False, eq=False)(cls)
+
+
+@_dataclass_fields
+class AmplifierStatus(_LazyStatus):
+    __slots__ = (
+        "_stable",
+        "_system_status",
+        "_driver_unlock",
+        "_driver_current",
+        "_pd_value",
+        "_pd_status",
+        "_temperatures",
+    )
+    _fields = tuple(name[1:] for name in __slots__)
+
+    @_decoded
+    def stable(self) -> bool:
+        return bool(self.status_bytes[0])
+
+    @_decoded
+    def system_status(self) -> SystemStatus:
+        return _system_status(self._int(2, 4))
+
+    @_decoded
+    def driver_unlock(self) -> DriverUnlock:
+        return _DRIVER_UNLOCK[self.status_bytes[4]]
+
+    @_decoded
+    def driver_current(self) -> Tuple[float, ...]:
+        """currents [A] of the three drivers"""
+        values = struct.unpack_from(
+            _DRIVER_CURRENT_FORMAT[self.endian], self.status_bytes, 7
         )
+        return tuple([value / 100 for value in values])
 
-
-@dataclass(frozen=True)
-class AmplifierStatus:
-    status_bytes: bytes = field(repr=False)
-    endian: Endian = field(default="big", repr=False)
-    stable: bool = field(init=False)
-    system_status: SystemStatus = field(init=False)
-    driver_unlock: DriverUnlock = field(init=False)
-    driver_current: Tuple[float, ...] = field(init=False)
-    pd_value: Tuple[int, ...] = field(init=False)
-    pd_status: Tuple[PDStatus, ...] = field(init=False)
-    temperatures: Tuple[float, ...] = field(init=False)
-
-    def __post_init__(self):
-        byte_index = 0
-        status_bytes = self.status_bytes
-
-        # get the stable bit
-        object.__setattr__(self, "stable", bool(status_bytes[byte_index]))
-
-        # get the system status
-        byte_index = 2
-        system_status_int = int.from_bytes(
-            status_bytes[byte_index : byte_index + 2], self.endian
-        )
-        system_status = SystemStatus(system_status_int)
-        object.__setattr__(self, "system_status", system_status)
-
-        # get the driver unlock register
-        object.__setattr__(self, "driver_unlock", DriverUnlock(status_bytes[4]))
-
-        # get currents in A
-        byte_index = 7
-        driver_current = tuple(
-            int.from_bytes(status_bytes[bi : bi + 2], self.endian) / 100
-            for bi in range(byte_index, byte_index + 3 * 7, 7)
-        )
-        object.__setattr__(self, "driver_current", driver_current)
-
-        # get the pd readout
-        byte_index = 28
-        pd_value = tuple(
-            int.from_bytes(status_bytes[bi : bi + 2], self.endian)
-            for bi in range(byte_index, byte_index + 4 * 2, 2)
-        )
-        object.__setattr__(self, "pd_value", pd_value)
-
-        # get the pd status
-        byte_index = 36
-        pd_status = tuple(
-            PDStatus(status_bytes[bi]) for bi in range(byte_index, byte_index + 4)
-        )
-        object.__setattr__(self, "pd_status", pd_status)
-
-        # get the temperatures in C
-        byte_index = 42
-        temperatures = tuple(
-            int.from_bytes(status_bytes[bi : bi + 2], self.endian) / 100
-            for bi in range(byte_index, byte_index + 4 * 2, 2)
-        )
-        object.__setattr__(self, "temperatures", temperatures)
-
-
-@dataclass(frozen=True)
-class SeedStatus:
-    status_bytes: bytes = field(repr=False)
-    endian: Endian = field(repr=False)
-    temperature_set: float = field(init=False)
-    temperature_act: float = field(init=False)
-    temperature_diode: float = field(init=False)
-    current_set: int = field(init=False)
-    current_act: int = field(init=False)
-    wavelength: float = field(init=False)
-    piezo_voltage: float = field(init=False)
-    emission: bool = field(init=False)
-    power: int = field(init=False)
-    run_hours: int = field(init=False)
-    run_minutes: int = field(init=False)
-
-    def __post_init__(self):
-        byte_index = 0
-        status_bytes = self.status_bytes
-
-        byte_index = 2
-        object.__setattr__(
-            self,
-            "temperature_set",
-            int.from_bytes(status_bytes[byte_index : byte_index + 2], self.endian)
-            / 1_000,
-        )
-
-        byte_index = 4
-        object.__setattr__(
-            self,
-            "current_set",
-            int.from_bytes(status_bytes[byte_index : byte_index + 2], self.endian),
+    @_decoded
+    def pd_value(self) -> Tuple[int, ...]:
+        """pd readout [arb. units]"""
+        return struct.unpack_from(
+            _FOUR_UINT16_FORMAT[self.endian], self.status_bytes, 28
         )
 
-        byte_index = 13
-        object.__setattr__(self, "emission", bool(status_bytes[byte_index]))
+    @_decoded
+    def pd_status(self) -> Tuple[PDStatus, ...]:
+        return tuple([_PD_STATUS[value] for value in self.status_bytes[36:40]])
 
-        byte_index = 15
-        object.__setattr__(
-            self,
-            "temperature_diode",
-            int.from_bytes(status_bytes[byte_index : byte_index + 2], self.endian)
-            / 1_000,
+    @_decoded
+    def temperatures(self) -> Tuple[float, ...]:
+        """temperatures [C]"""
+        values = struct.unpack_from(
+            _FOUR_UINT16_FORMAT[self.endian], self.status_bytes, 42
         )
-
-        byte_index = 18
-        object.__setattr__(
-            self,
-            "temperature_act",
-            int.from_bytes(status_bytes[byte_index : byte_index + 2], self.endian)
-            / 1_000,
-        )
-
-        byte_index = 23
-        object.__setattr__(
-            self,
-            "current_act",
-            int.from_bytes(status_bytes[byte_index : byte_index + 2], self.endian),
+        return tuple([value / 100 for value in values])
+
+
+@_dataclass_fields
+class SeedStatus(_LazyStatus):
+    __slots__ = (
+        "_temperature_set",
+        "_temperature_act",
+        "_temperature_diode",
+        "_current_set",
+        "_current_act",
+        "_wavelength",
+        "_piezo_voltage",
+        "_emission",
+        "_power",
+        "_run_hours",
+        "_run_minutes",
+    )
+    _fields = tuple(name[1:] for name in __slots__)
+
+    def __init__(self, status_bytes: Union[bytes, memoryview], endian: Endian):
+        super().__init__(status_bytes, endian)
+
+    @_decoded
+    def temperature_set(self) -> float:
+        """grating temperature setpoint [C]"""
+        return self._int(2, 4) / 1_000
+
+    @_decoded
+    def temperature_act(self) -> float:
+        """grating temperature [C]"""
+        return self._int(18, 20) / 1_000
+
+    @_decoded
+    def temperature_diode(self) -> float:
+        """diode temperature [C]"""
+        return self._int(15, 17) / 1_000
+
+    @_decoded
+    def current_set(self) -> int:
+        """current setpoint [mA]"""
+        return self._int(4, 6)
+
+    @_decoded
+    def current_act(self) -> int:
+        """current [mA]"""
+        return self._int(23, 25)
+
+    @_decoded
+    def wavelength(self) -> float:
+        """wavelength [nm]"""
+        return self._int(30, 34) / 10_000
+
+    @_decoded
+    def piezo_voltage(self) -> float:
+        """piezo voltage [V]"""
+        return self._int(34, 36) / 100
+
+    @_decoded
+    def emission(self) -> bool:
+        return bool(self.status_bytes[13])
+
+    @_decoded
+    def power(self) -> int:
+        return self._int(36, 38)
+
+    @_decoded
+    def run_hours(self) -> int:
+        return self._int(27, 29)
+
+    @_decoded
+    def run_minutes(self) -> int:
+        return self.status_bytes[29]
+
+
+def _status_records(frames: Any, itemsize: int, dtype: Any) -> Any:
+    """
+    View status payloads as a NumPy structured array, without copying if the payloads
+    are supplied as one contiguous buffer
+
+    Args:
+        frames: sequence of payloads or a contiguous buffer of payloads
+        itemsize (int): payload length
+        dtype (numpy.dtype): structured dtype of a payload
+
+    Raises:
+        ValueError: raises if the buffer length isn't a multiple of the payload length
+
+    Returns:
+        numpy.ndarray: structured array with one record per payload
+    """
+    import numpy as np
+
+    if isinstance(frames, np.ndarray):
+        data = np.ascontiguousarray(frames, dtype=np.uint8).reshape(-1)
+    elif isinstance(frames, (bytes, bytearray, memoryview)):
+        data = np.frombuffer(frames, dtype=np.uint8)
+    else:
+        data = np.frombuffer(b"".join(frames), dtype=np.uint8)
+    if data.size % itemsize != 0:
+        raise ValueError(
+            f"buffer length {data.size} is not a multiple of the payload length"
+            f" {itemsize}"
         )
-
-        byte_index = 27
-        object.__setattr__(
-            self,
-            "run_hours",
-            int.from_bytes(status_bytes[byte_index : byte_index + 2], self.endian),
-        )
-
-        byte_index = 29
-        object.__setattr__(self, "run_minutes", status_bytes[byte_index])
-
-        byte_index = 30
-        object.__setattr__(
-            self,
-            "wavelength",
-            int.from_bytes(status_bytes[byte_index : byte_index + 4], self.endian)
-            / 10_000,
-        )
-
-        byte_index = 34
-        object.__setattr__(
-            self,
-            "piezo_voltage",
-            int.from_bytes(status_bytes[byte_index : byte_index + 2], self.endian)
-            / 100,
-        )
-
-        byte_index = 36
-        object.__setattr__(
-            self,
-            "power",
-            int.from_bytes(status_bytes[byte_index : byte_index + 2], self.endian),
+    return data.view(dtype)
+
+
+def _bits(values: Any, bits: range) -> Any:
+    import numpy as np
+
+    return (values[:, None] >> np.array(bits, dtype=values.dtype) & 1).astype(bool)
+
+
+def decode_amplifier_status_batch(
+    frames: Any, endian: Endian = "big"
+) -> dict[str, Any]:
+    """
+    Decode many amplifier status payloads at once into columns. Requires NumPy.
+
+    Args:
+        frames: sequence of 64 byte status payloads, or one contiguous buffer
+                (bytes, memoryview or uint8 array) of payloads
+        endian (str): endian of the status bytes. Defaults to "big".
+
+    Returns:
+        dict[str, numpy.ndarray]: columns, one row per payload. Register bits are
+                                  decoded to boolean columns named as the
+                                  corresponding SystemStatus, DriverUnlock and
+                                  PDStatus fields, the latter prefixed with pd_.
+    """
+    import numpy as np
+
+    p = _ENDIAN_PREFIX[endian]
+    dtype = np.dtype(
+        {
+            "names": [
+                "stable",
+                "system_status",
+                "driver_unlock",
+                "driver_current_0",
+                "driver_current_1",
+                "driver_current_2",
+                "pd_value",
+                "pd_status",
+                "temperatures",
+            ],
+            "formats": ["u1", f"{p}u2", "u1", f"{p}u2", f"{p}u2", f"{p}u2"]
+            + [(f"{p}u2", 4), ("u1", 4), (f"{p}u2", 4)],
+            "offsets": [0, 2, 4, 7, 14, 21, 28, 36, 42],
+            "itemsize": 64,
+        }
+    )
+    records = _status_records(frames, 64, dtype)
+
+    system_status = records["system_status"]
+    driver_unlock = records["driver_unlock"]
+    pd_status = records["pd_status"]
+    columns = {
+        "stable": records["stable"].astype(bool),
+        "system_status": system_status,
+        "pd_protection": _bits(system_status, range(4, 8)),
+        "temperature_protection": _bits(system_status, range(8, 13)),
+        "system_fault": system_status != 0,
+        "driver_unlock": driver_unlock,
+        "driver_enable_control": _bits(driver_unlock, range(0, 3)),
+        "driver_enable_flag": _bits(driver_unlock, range(3, 6)),
+        "interlock": (driver_unlock >> 6 & 1).astype(bool),
+        "driver_current": np.stack(
+            [records[f"driver_current_{i}"] for i in range(3)], axis=1
         )
+        / 100,
+        "pd_value": records["pd_value"],
+        "pd_status": pd_status,
+        "temperatures": records["temperatures"] / 100,
+    }
+    pd_fields = [
+        "sampling_enable",
+        "hardware_protection",
+        "upper_limit_enabled",
+        "lower_limit_enabled",
+        "hardware_protection_event",
+        "upper_limit_event",
+        "lower_limit_event",
+    ]
+    for bit, pd_field in enumerate(pd_fields):
+        columns[f"pd_{pd_field}"] = (pd_status >> bit & 1).astype(bool)
+    columns["pd_fault"] = (pd_status >> 4 & 0b111) != 0
+    return columns
+
+
+def decode_seed_status_batch(frames: Any, endian: Endian = "big") -> dict[str, Any]:
+    """
+    Decode many seed status payloads at once into columns. Requires NumPy.
+
+    Args:
+        frames: sequence of 40 byte status payloads, or one contiguous buffer
+                (bytes, memoryview or uint8 array) of payloads
+        endian (str): endian of the status bytes. Defaults to "big".
+
+    Returns:
+        dict[str, numpy.ndarray]: columns named as the SeedStatus fields, one row per
+                                  payload
+    """
+    import numpy as np
+
+    p = _ENDIAN_PREFIX[endian]
+    fields = {
+        # name: (format, offset)
+        "temperature_set": (f"{p}u2", 2),
+        "current_set": (f"{p}u2", 4),
+        "emission": ("u1", 13),
+        "temperature_diode": (f"{p}u2", 15),
+        "temperature_act": (f"{p}u2", 18),
+        "current_act": (f"{p}u2", 23),
+        "run_hours": (f"{p}u2", 27),
+        "run_minutes": ("u1", 29),
+        "wavelength": (f"{p}u4", 30),
+        "piezo_voltage": (f"{p}u2", 34),
+        "power": (f"{p}u2", 36),
+    }
+    dtype = np.dtype(
+        {
+            "names": list(fields),
+            "formats": [f for f, _ in fields.values()],
+            "offsets": [o for _, o in fields.values()],
+            "itemsize": 40,
+        }
+    )
+    records = _status_records(frames, 40, dtype)
+    columns = {name: records[name] for name in fields}
+    columns["emission"] = columns["emission"].astype(bool)
+    for name in ["temperature_set", "temperature_diode", "temperature_act"]:
+        columns[name] = columns[name] / 1_000
+    columns["wavelength"] = columns["wavelength"] / 10_000
+    columns["piezo_voltage"] = columns["piezo_voltage"] / 100
+    return columns
@@ -1,8 +1,14 @@
+import math
+import threading
 import time
+from collections import deque
+from typing import Optional, Sequence, Union
 
 from rich.console import Console
 
-from .amplifier import SHGAmplifier
+from .amplifier import SHGAmplifier, temperature_handler
+from .enums import PrecilaserReturn
+from .message import PrecilaserFrame
 
 
 def wait_until_shg_temperature_stable(
@@ -74,3 +80,401 @@ def wait_until_shg_temperature_stable(
                     f" preset limit of {timeout} seconds"
                 )
             time.sleep(0.3)
+
+
+class StabilityWindow:
+    def __init__(
+        self,
+        setpoint: float,
+        max_deviation: float,
+        duration: float,
+        max_slope: Optional[float] = None,
+    ):
+        """
+        Rolling window over a stream of samples, which is stable once it spans at least
+        duration [s], all samples are within max_deviation of the setpoint and the
+        fitted slope is at most max_slope.
+
+        Args:
+            setpoint (float): setpoint
+            max_deviation (float): maximum deviation from the setpoint
+            duration (float): window duration [s]
+            max_slope (Optional[float], optional): maximum slope [1/s] of a linear fit
+                                                to the window. Defaults to None, which
+                                                uses max_deviation / duration.
+        """
+        self.setpoint = setpoint
+        self.max_deviation = max_deviation
+        self.duration = duration
+        self.max_slope = max_deviation / duration if max_slope is None else max_slope
+        self.samples: deque[tuple[float, float]] = deque()
+
+    def add(self, t: float, value: float) -> bool:
+        """
+        Add a sample and check stability
+
+        Args:
+            t (float): sample time [s]
+            value (float): sample value
+
+        Returns:
+            bool: True if the window is stable
+        """
+        samples = self.samples
+        samples.append((t, value))
+        # keep a single sample at or before the start of the window
+        while len(samples) > 1 and samples[1][0] <= t - self.duration:
+            samples.popleft()
+        return self.stable
+
+    @property
+    def slope(self) -> float:
+        """slope [1/s] of a least squares linear fit to the window"""
+        n = len(self.samples)
+        if n < 2:
+            return 0.0
+        t_mean = sum(t for t, _ in self.samples) / n
+        v_mean = sum(v for _, v in self.samples) / n
+        stt = sum((t - t_mean) ** 2 for t, _ in self.samples)
+        if stt == 0:
+            return 0.0
+        stv = sum((t - t_mean) * (v - v_mean) for t, v in self.samples)
+        return stv / stt
+
+    @property
+    def stable(self) -> bool:
+        samples = self.samples
+        if len(samples) < 2 or samples[-1][0] - samples[0][0] < self.duration:
+            return False
+        if any(abs(v - self.setpoint) >= self.max_deviation for _, v in samples):
+            return False
+        return abs(self.slope) <= self.max_slope
+
+
+class SettlingEstimator:
+    # number of time constants in the initial grid search, and golden-section
+    # refinement iterations
+    _GRID_POINTS = 32
+    _REFINE_ITERATIONS = 24
+
+    def __init__(
+        self,
+        setpoint: float,
+        tolerance: float,
+        residual_tolerance: Optional[float] = None,
+        min_samples: int = 10,
+        max_samples: int = 400,
+    ):
+        """
+        Predicts when a temperature step settles by fitting a first-order response,
+        value(t) = final + amplitude * exp(-(t - t0) / tau), to the samples received
+        after the setpoint change.
+
+        Args:
+            setpoint (float): setpoint
+            tolerance (float): settled once the fitted response is within tolerance of
+                                the setpoint
+            residual_tolerance (Optional[float], optional): maximum rms residual of a
+                                            fit used to predict settling. Defaults to
+                                            None, which uses tolerance / 2.
+            min_samples (int, optional): minimum number of samples to fit. Defaults to
+                                            10.
+            max_samples (int, optional): maximum number of samples to fit, the oldest
+                                            samples beyond it are discarded. Defaults
+                                            to 400.
+        """
+        self.setpoint = setpoint
+        self.tolerance = tolerance
+        self.residual_tolerance = (
+            tolerance / 2 if residual_tolerance is None else residual_tolerance
+        )
+        self.min_samples = min_samples
+        self.samples: deque[tuple[float, float]] = deque(maxlen=max_samples)
+        self._fit: Optional[tuple[float, float, float, float]] = None
+        self._fitted = False
+
+    def add(self, t: float, value: float) -> None:
+        """
+        Add a sample
+
+        Args:
+            t (float): sample time [s]
+            value (float): sample value
+        """
+        self.samples.append((t, value))
+        self._fitted = False
+
+    def _linear_fit(self, tau: float) -> tuple[float, float, float]:
+        """least squares final value and amplitude for a fixed tau, and the rms"""
+        t0 = self.samples[0][0]
+        xs = [math.exp(-(t - t0) / tau) for t, _ in self.samples]
+        vs = [v for _, v in self.samples]
+        n = len(xs)
+        x_mean = sum(xs) / n
+        v_mean = sum(vs) / n
+        sxx = sum((x - x_mean) ** 2 for x in xs)
+        if sxx == 0:
+            amplitude = 0.0
+        else:
+            amplitude = sum((x - x_mean) * (v - v_mean) for x, v in zip(xs, vs)) / sxx
+        final = v_mean - amplitude * x_mean
+        ss = sum((final + amplitude * x - v) ** 2 for x, v in zip(xs, vs))
+        return final, amplitude, math.sqrt(ss / n)
+
+    def fit(self) -> Optional[tuple[float, float, float, float]]:
+        """
+        Fit the first-order response to the samples
+
+        Returns:
+            Optional[tuple[float, float, float, float]]: final value, amplitude, time
+                                            constant tau [s] and rms residual, or None
+                                            if there are fewer than min_samples
+        """
+        if self._fitted:
+            return self._fit
+        self._fitted = True
+        self._fit = None
+        if len(self.samples) < max(self.min_samples, 3):
+            return None
+        span = self.samples[-1][0] - self.samples[0][0]
+        if span <= 0:
+            return None
+        # grid search over log-spaced time constants, then refine the best one with a
+        # golden-section search between its neighbours
+        taus = [
+            span * 10 ** (-2 + 3 * i / (self._GRID_POINTS - 1))
+            for i in range(self._GRID_POINTS)
+        ]
+        rms = [self._linear_fit(tau)[2] for tau in taus]
+        best = rms.index(min(rms))
+        lower = math.log(taus[max(best - 1, 0)])
+        upper = math.log(taus[min(best + 1, len(taus) - 1)])
+        ratio = (math.sqrt(5) - 1) / 2
+        for _ in range(self._REFINE_ITERATIONS):
+            a = upper - ratio * (upper - lower)
+            b = lower + ratio * (upper - lower)
+            if self._linear_fit(math.exp(a))[2] < self._linear_fit(math.exp(b))[2]:
+                upper = b
+            else:
+                lower = a
+        tau = math.exp((lower + upper) / 2)
+        final, amplitude, residual = self._linear_fit(tau)
+        self._fit = (final, amplitude, tau, residual)
+        return self._fit
+
+    @property
+    def settle_time(self) -> Optional[float]:
+        """
+        Predicted time [s] at which the fitted response settles to within tolerance of
+        the setpoint; inf if it settles outside the tolerance, None if there are too
+        few samples to fit
+        """
+        fit = self.fit()
+        if fit is None:
+            return None
+        final, amplitude, tau, _ = fit
+        margin = self.tolerance - abs(final - self.setpoint)
+        if margin <= 0:
+            return math.inf
+        t0 = self.samples[0][0]
+        if abs(amplitude) <= margin:
+            return t0
+        return t0 + tau * math.log(abs(amplitude) / margin)
+
+    @property
+    def settled(self) -> bool:
+        """
+        True if the response fits the samples to within residual_tolerance, the latest
+        sample is within tolerance and the predicted settle time has passed
+        """
+        settle_time = self.settle_time
+        if settle_time is None:
+            return False
+        assert self._fit is not None
+        t, value = self.samples[-1]
+        return (
+            self._fit[3] <= self.residual_tolerance
+            and abs(value - self.setpoint) < self.tolerance
+            and t >= settle_time
+        )
+
+
+class SHGTemperatureWaiter:
+    def __init__(
+        self,
+        amplifier: SHGAmplifier,
+        temperature_setpoint: float,
+        temp_stable: float = 0.02,
+        time_stable: float = 10,
+        max_slope: Optional[float] = None,
+        early_stop: bool = False,
+    ):
+        """
+        Waits for the SHG temperature to stabilize, evaluating every received TEC
+        temperature message as it is handled instead of polling. Several waiters,
+        for the same or different amplifiers, can wait concurrently without additional
+        serial traffic. Create the waiter right after changing the setpoint for
+        early_stop, which fits the temperature response from the setpoint change.
+
+        Args:
+            amplifier (SHGAmplifier): precilaser shg amplifier interface
+            temperature_setpoint (float): temperature setpoint [C]
+            temp_stable (float, optional): temperature stability range [C].
+                                            Defaults to 0.02 C.
+            time_stable (float, optional): time [s] to stay within temperature
+                                            stability range. Defaults to 10 s.
+            max_slope (Optional[float], optional): maximum temperature slope [C/s].
+                                            Defaults to None, which uses
+                                            temp_stable / time_stable.
+            early_stop (bool, optional): also consider the temperature stable once a
+                                            SettlingEstimator fit predicts it has
+                                            settled, without waiting time_stable.
+                                            Defaults to False.
+        """
+        self.amplifier = amplifier
+        self.window = StabilityWindow(
+            temperature_setpoint, temp_stable, time_stable, max_slope
+        )
+        self.estimator = SettlingEstimator(temperature_setpoint, temp_stable)
+        self.early_stop = early_stop
+        self.temperature: Optional[float] = None
+        self._stable = threading.Event()
+        amplifier.subscribe(PrecilaserReturn.AMP_TEC_TEMPERATURE, self._on_message)
+
+    def _on_message(self, message: PrecilaserFrame) -> None:
+        self.temperature = temperature_handler(message)[1]
+        t = time.monotonic()
+        self.estimator.add(t, self.temperature)
+        if self.window.add(t, self.temperature):
+            self._stable.set()
+        elif self.early_stop and self.estimator.settled:
+            self._stable.set()
+
+    @property
+    def settle_time(self) -> Optional[float]:
+        """
+        Predicted time at which the SHG temperature settles, in seconds of
+        time.monotonic(); None if too few temperatures were received to predict it
+        """
+        return self.estimator.settle_time
+
+    @property
+    def stable(self) -> bool:
+        """True once the SHG temperature is stable"""
+        return self._stable.is_set()
+
+    def _step(self, timeout: float) -> None:
+        """
+        Wait for the next TEC temperature message, reading it from the device if the
+        background reader isn't running
+        """
+        if self.amplifier.reader_running:
+            self._stable.wait(timeout)
+            return
+        try:
+            self.amplifier._read()
+        except TimeoutError:
+            pass
+        except ValueError:
+            # corrupted message; continue with the next message
+            pass
+
+    def wait(self, timeout: float = 200) -> None:
+        """
+        Wait until the SHG temperature is stable
+
+        Args:
+            timeout (float, optional): timeout [s]. Defaults to 200 s.
+
+        Raises:
+            TimeoutError: raises a TimeoutError if the wait time exceeds timeout
+        """
+        _wait_until_stable([self], timeout)
+
+    def close(self) -> None:
+        """Stop receiving TEC temperature messages."""
+        self.amplifier.unsubscribe(
+            PrecilaserReturn.AMP_TEC_TEMPERATURE, self._on_message
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _wait_until_stable(waiters: Sequence[SHGTemperatureWaiter], timeout: float) -> None:
+    """
+    Wait until all waiters are stable
+
+    Args:
+        waiters (Sequence[SHGTemperatureWaiter]): waiters
+        timeout (float): timeout [s]
+
+    Raises:
+        TimeoutError: raises a TimeoutError if the wait time exceeds timeout
+    """
+    deadline = time.monotonic() + timeout
+    while not all(waiter.stable for waiter in waiters):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(
+                "SHG crystal temperature stabilization wait time exceeded the"
+                f" preset limit of {timeout} seconds"
+            )
+        for waiter in waiters:
+            if not waiter.stable:
+                waiter._step(remaining)
+
+
+def wait_until_shg_temperatures_stable(
+    amplifiers: Union[SHGAmplifier, Sequence[SHGAmplifier]],
+    temperature_setpoints: Union[float, Sequence[float]],
+    temp_stable: float = 0.02,
+    time_stable: float = 10,
+    max_slope: Optional[float] = None,
+    timeout: float = 200,
+    early_stop: bool = False,
+) -> None:
+    """
+    Event-driven variant of wait_until_shg_temperature_stable for one or more
+    amplifiers; stability is evaluated on every received TEC temperature message, so
+    the wait ends as soon as the SHG temperatures are within temp_stable [C] of their
+    setpoints for time_stable [s], with a fitted slope of at most max_slope [C/s].
+
+    Args:
+        amplifiers (Union[SHGAmplifier, Sequence[SHGAmplifier]]): precilaser shg
+                                                            amplifier interfaces
+        temperature_setpoints (Union[float, Sequence[float]]): temperature setpoint
+                                                            [C] of each amplifier
+        temp_stable (float, optional): temperature stability range [C].
+                                        Defaults to 0.02 C.
+        time_stable (float, optional): time [s] to stay within temperature stability
+                                        range. Defaults to 10 s.
+        max_slope (Optional[float], optional): maximum temperature slope [C/s].
+                                        Defaults to None, which uses
+                                        temp_stable / time_stable.
+        timeout (float, optional): timeout [s]. Defaults to 200 s.
+        early_stop (bool, optional): stop waiting once a fit of the temperature
+                                    response predicts the temperature has settled, see
+                                    SettlingEstimator. Defaults to False.
+
+    Raises:
+        TimeoutError: raises a TimeoutError if the wait time exceeds timeout
+    """
+    if isinstance(amplifiers, SHGAmplifier):
+        amplifiers = [amplifiers]
+    if isinstance(temperature_setpoints, (float, int)):
+        temperature_setpoints = [temperature_setpoints] * len(amplifiers)
+    waiters = [
+        SHGTemperatureWaiter(
+            amplifier, setpoint, temp_stable, time_stable, max_slope, early_stop
+        )
+        for amplifier, setpoint in zip(amplifiers, temperature_setpoints)
+    ]
+    try:
+        _wait_until_stable(waiters, timeout)
+    finally:
+        for waiter in waiters:
+            waiter.close()
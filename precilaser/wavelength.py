@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+from typing import Any, Sequence, Union
+
+
+@dataclass(frozen=True)
+class WavelengthCalibration:
+    slope: float  # wavelength change per grating temperature [nm/C]
+    offset: float  # wavelength at a grating temperature of 0 C [nm]
+
+    @classmethod
+    def from_params(cls, wavelength_params: Sequence[int]) -> "WavelengthCalibration":
+        """
+        Calibration from the wavelength parameter bytes retrieved from the seed (see
+        Seed._get_serial_wavelength_params); the first two bytes are the slope in
+        1e-5 nm/C and the last four the offset in 1e-4 nm.
+
+        Args:
+            wavelength_params (Sequence[int]): wavelength parameters
+
+        Returns:
+            WavelengthCalibration: calibration
+        """
+        p = wavelength_params
+        slope = ((p[0] << 8) | p[1]) / 100_000
+        # manual states an offset in pm but this yields an incorrect wavelength
+        offset = (p[2] << 24 | p[3] << 16 | p[4] << 8 | p[5]) / 10_000
+        return cls(slope, offset)
+
+    def wavelength(self, temperature: Any) -> Any:
+        """
+        Wavelength [nm] at grating temperatures [C]
+
+        Args:
+            temperature (Any): grating temperature [C], a float or an array
+
+        Returns:
+            Any: wavelength [nm], a float or a NumPy array
+        """
+        if isinstance(temperature, (int, float)):
+            return self.slope * temperature + self.offset
+        import numpy as np
+
+        return self.slope * np.asarray(temperature, dtype=np.float64) + self.offset
+
+    def temperature(self, wavelength: Any) -> Any:
+        """
+        Grating temperature [C] of wavelengths [nm]
+
+        Args:
+            wavelength (Any): wavelength [nm], a float or an array
+
+        Returns:
+            Any: grating temperature [C], a float or a NumPy array
+        """
+        if isinstance(wavelength, (int, float)):
+            return (wavelength - self.offset) / self.slope
+        import numpy as np
+
+        return (np.asarray(wavelength, dtype=np.float64) - self.offset) / self.slope
+
+
+def temperature_to_wavelength(
+    temperature: Any,
+    wavelength_params: Union[Sequence[int], WavelengthCalibration],
+) -> Any:
+    """
+    Convert grating temperatures [C] to wavelengths [nm]
+
+    Args:
+        temperature (Any): grating temperature [C], a float or an array
+        wavelength_params (Union[Sequence[int], WavelengthCalibration]): wavelength
+                                                    parameters or their calibration
+
+    Returns:
+        Any: wavelength [nm], a float or a NumPy array
+    """
+    if not isinstance(wavelength_params, WavelengthCalibration):
+        wavelength_params = WavelengthCalibration.from_params(wavelength_params)
+    return wavelength_params.wavelength(temperature)
+
+
+def wavelength_to_temperature(
+    wavelength: Any,
+    wavelength_params: Union[Sequence[int], WavelengthCalibration],
+) -> Any:
+    """
+    Convert wavelengths [nm] to grating temperatures [C]
+
+    Args:
+        wavelength (Any): wavelength [nm], a float or an array
+        wavelength_params (Union[Sequence[int], WavelengthCalibration]): wavelength
+                                                    parameters or their calibration
+
+    Returns:
+        Any: grating temperature [C], a float or a NumPy array
+    """
+    if not isinstance(wavelength_params, WavelengthCalibration):
+        wavelength_params = WavelengthCalibration.from_params(wavelength_params)
+    return wavelength_params.temperature(wavelength)
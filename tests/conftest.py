@@ -0,0 +1,35 @@
+from precilaser.enums import PrecilaserMessageType, PrecilaserReturn
+from precilaser.message import PrecilaserMessage, PrecilaserReturnParamLength
+
+# frame and payload builders shared by the test modules
+
+
+def _frame(command: PrecilaserReturn, payload: bytes, address: int = 0) -> bytes:
+    """A valid return frame (header P, terminator \\r\\n, big endian)."""
+    message = PrecilaserMessage(
+        command=command,
+        address=address,
+        payload=payload,
+        header=b"P",
+        terminator=b"\r\n",
+        endian="big",
+        type=PrecilaserMessageType.RETURN,
+    )
+    return bytes(message.command_bytes)
+
+
+def _return_frame(payload: bytes = b"\x01\xf4", address: int = 100) -> bytes:
+    """A valid SEED_SET_VOLTAGE return frame, by default for 5 V at address 100."""
+    return _frame(PrecilaserReturn.SEED_SET_VOLTAGE, payload, address)
+
+
+def _status_payload(current: float) -> bytes:
+    """AMP_STATUS payload with the first driver current [A] set, all else zero."""
+    payload = bytearray(PrecilaserReturnParamLength.AMP_STATUS)
+    payload[7:9] = int(current * 100).to_bytes(2, "big")
+    return bytes(payload)
+
+
+def _status_frame(current: float, address: int = 0) -> bytes:
+    """AMP_STATUS return frame with the first driver current [A] set."""
+    return _frame(PrecilaserReturn.AMP_STATUS, _status_payload(current), address)
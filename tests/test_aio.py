@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from precilaser.aio import AsyncSeed, AsyncSHGAmplifier, LoopbackTransport
+from precilaser.enums import PrecilaserCommand, PrecilaserReturn
+from precilaser.sim import SimulatedSeed
+
+from .conftest import _frame, _status_payload
+
+
+def _amplifier_responder(data: bytes):
+    command = PrecilaserCommand(data[3:4])
+    if command == PrecilaserCommand.AMP_ENABLE:
+        return _frame(PrecilaserReturn.AMP_ENABLE, b"Enable set ok")
+    elif command == PrecilaserCommand.AMP_SAVE:
+        return _frame(PrecilaserReturn.AMP_SAVE, b"ROM saved")
+    elif command == PrecilaserCommand.AMP_SET_CURRENT:
+        return _frame(PrecilaserReturn.AMP_SET_CURRENT, bytes(46))
+    elif command == PrecilaserCommand.AMP_TEC_TEMPERATURE:
+        return _frame(PrecilaserReturn.AMP_TEC_TEMPERATURE, b"\x00" + data[7:9] * 8)
+    return None
+
+
+def test_async_amplifier_status_and_commands():
+    async def main():
+        transport = LoopbackTransport(_amplifier_responder)
+        async with AsyncSHGAmplifier(transport, address=0) as amp:
+            transport.feed(_frame(PrecilaserReturn.AMP_STATUS, _status_payload(2.5)))
+            assert (await amp.current())[0] == 2.5
+            assert amp.status_timestamp is not None
+            assert await amp.fault() is False
+
+            await amp.enable()
+            await amp.set_current(1.0)
+            await amp.set_shg_temperature(45.67)
+            assert await amp.shg_temperature() == 45.67
+            await amp.save()
+            # the written frames are the same as those of the blocking interface
+            assert transport.written.startswith(
+                amp._generate_message(
+                    PrecilaserCommand.AMP_ENABLE, b"\x07"
+                ).command_bytes
+            )
+
+    asyncio.run(main())
+
+
+def test_async_devices_share_event_loop():
+    async def main():
+        transports = [LoopbackTransport(_amplifier_responder) for _ in range(5)]
+        amplifiers = [AsyncSHGAmplifier(t, address=0) for t in transports]
+        await asyncio.gather(*(amp.enable() for amp in amplifiers))
+        for amp in amplifiers:
+            await amp.close()
+
+    asyncio.run(main())
+
+
+def test_async_reply_timeout():
+    async def main():
+        amp = AsyncSHGAmplifier(LoopbackTransport(), address=0, timeout=0.05)
+        with pytest.raises(TimeoutError, match="no AMP_SAVE reply"):
+            await amp.save()
+        await amp.close()
+
+    asyncio.run(main())
+
+
+def test_async_seed_setters():
+    def responder(data: bytes):
+        command = PrecilaserCommand(data[3:4])
+        if command == PrecilaserCommand.SEED_SET_VOLTAGE:
+            return _frame(PrecilaserReturn.SEED_SET_VOLTAGE, data[5:7], address=100)
+        elif command == PrecilaserCommand.SEED_SET_TEMP:
+            return _frame(PrecilaserReturn.SEED_SET_TEMP, bytes(4), address=100)
+        return None
+
+    async def main():
+        async with AsyncSeed(LoopbackTransport(responder), address=100) as seed:
+            await seed.set_piezo_voltage(5)
+            with pytest.raises(ValueError, match="temperature setpoint"):
+                await seed.set_temperature_setpoint(25)
+
+    asyncio.run(main())
+
+
+def test_async_seed_wavelength():
+    simulated = SimulatedSeed()
+
+    def responder(data: bytes):
+        command = PrecilaserCommand(data[3:4])
+        replies = simulated.handle(command, data[5 : 5 + data[4]])
+        return b"".join(_frame(ret, payload, address=100) for ret, payload in replies)
+
+    async def main():
+        transport = LoopbackTransport(responder)
+        async with AsyncSeed(transport, address=100) as seed:
+            assert await seed.wavelength() == pytest.approx(simulated.wavelength)
+            assert seed.serial == simulated.serial
+            assert seed.wavelength_params == simulated.wavelength_params
+            calibration = await seed.wavelength_calibration()
+            await seed.set_wavelength(calibration.wavelength(30.0))
+            assert simulated.temperature_set == pytest.approx(30.0, abs=2e-3)
+
+    asyncio.run(main())
@@ -1,15 +1,70 @@
+import threading
+import time
+
 import pytest
 
-from precilaser.amplifier import status_handler, temperature_handler
-from precilaser.enums import PrecilaserMessageType, PrecilaserReturn
+import precilaser.device
+from precilaser import PrecilaserBus
+from precilaser.amplifier import SHGAmplifier, status_handler, temperature_handler
+from precilaser.enums import PrecilaserCommand, PrecilaserMessageType, PrecilaserReturn
 from precilaser.message import PrecilaserMessage, PrecilaserReturnParamLength
+from precilaser.sim import SimulatedSerial, SimulatedSHGAmplifier, VirtualClock
 from precilaser.status import AmplifierStatus
 
+from .conftest import _frame, _status_payload
+
+
+class StreamingSerial:
+    """
+    serial.Serial stand-in whose read blocks until data arrives or the timeout
+    elapses; written commands are answered with the frame registered in replies.
+    """
+
+    def __init__(self, replies=None, timeout: float = 0.05, **kwargs):
+        self._rx = bytearray()
+        self._cond = threading.Condition()
+        self.replies = replies if replies is not None else {}
+        self.timeout = timeout
+        self.written = bytearray()
+        self.writes = 0
+        self.is_open = True
+
+    def feed(self, data: bytes) -> None:
+        with self._cond:
+            self._rx += data
+            self._cond.notify_all()
+
+    def read(self, n: int = 1) -> bytes:
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._rx) > 0, self.timeout)
+            chunk = bytes(self._rx[:n])
+            del self._rx[:n]
+            return chunk
+
+    def write(self, data: bytes) -> int:
+        self.written += data
+        self.writes += 1
+        # several commands can be written at once; answer each of them
+        start = 0
+        while start < len(data):
+            reply = self.replies.get(PrecilaserCommand(data[start + 3 : start + 4]))
+            if reply is not None:
+                self.feed(reply)
+            start += 9 + data[start + 4]
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def close(self) -> None:
+        self.is_open = False
+
 
-def _return_message(command, payload):
+def _return_message(command, payload, address=100):
     return PrecilaserMessage(
         command=command,
-        address=100,
+        address=address,
         payload=payload,
         header=b"P",
         terminator=b"\r\n",
@@ -50,3 +105,193 @@ def test_temperature_handler_raises_on_empty_payload():
     message = _return_message(PrecilaserReturn.AMP_TEC_TEMPERATURE, None)
     with pytest.raises(ValueError, match="No TEC temperature bytes retrieved"):
         temperature_handler(message)
+
+
+def _make_shg_amplifier(monkeypatch, replies=None) -> tuple:
+    fake = StreamingSerial(replies)
+    monkeypatch.setattr(precilaser.device.serial, "Serial", lambda **kw: fake)
+    amp = SHGAmplifier(port="COMTEST", address=0, timeout=1.0)
+    return amp, fake
+
+
+def test_background_reader_caches_status(monkeypatch):
+    amp, fake = _make_shg_amplifier(monkeypatch)
+    amp.start_reader()
+    try:
+        assert amp.reader_running
+        fake.feed(_frame(PrecilaserReturn.AMP_STATUS, _status_payload(1.5)))
+        # the first access waits for a status message
+        assert amp.status.driver_current[0] == 1.5
+        received = amp.status_timestamp
+        assert received is not None and received <= time.monotonic()
+
+        temperatures = (
+            b"\x00" + (1234).to_bytes(2, "big") + (4567).to_bytes(2, "big") + bytes(12)
+        )
+        fake.feed(_frame(PrecilaserReturn.AMP_TEC_TEMPERATURE, temperatures))
+        fake.feed(_frame(PrecilaserReturn.AMP_STATUS, _status_payload(2.5)))
+        deadline = time.monotonic() + 1
+        while amp.status.driver_current[0] != 2.5 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        # cached values are returned without touching the serial port
+        assert amp.status.driver_current[0] == 2.5
+        assert amp.shg_temperature == 45.67
+        assert amp.shg_temperature_timestamp is not None
+    finally:
+        amp.close()
+    assert not amp.reader_running
+
+
+def test_background_reader_delivers_replies(monkeypatch):
+    replies = {
+        PrecilaserCommand.AMP_ENABLE: _frame(
+            PrecilaserReturn.AMP_ENABLE, b"Enable set ok"
+        ),
+        PrecilaserCommand.AMP_SAVE: _frame(PrecilaserReturn.AMP_SAVE, b"ROM saved"),
+    }
+    amp, fake = _make_shg_amplifier(monkeypatch, replies)
+    amp.start_reader()
+    try:
+        # interleave periodic status messages with the replies
+        fake.feed(_frame(PrecilaserReturn.AMP_STATUS, _status_payload(0)))
+        amp.enable()
+        amp.save()
+    finally:
+        amp.close()
+
+
+def test_background_reader_survives_failing_subscriber(monkeypatch, caplog):
+    replies = {
+        PrecilaserCommand.AMP_SAVE: _frame(PrecilaserReturn.AMP_SAVE, b"ROM saved"),
+    }
+    amp, fake = _make_shg_amplifier(monkeypatch, replies)
+    received: list = []
+
+    def fail(message):
+        raise RuntimeError("subscriber failed")
+
+    amp.subscribe(PrecilaserReturn.AMP_STATUS, fail)
+    amp.subscribe(PrecilaserReturn.AMP_STATUS, received.append)
+    amp.start_reader()
+    try:
+        fake.feed(_frame(PrecilaserReturn.AMP_STATUS, _status_payload(1.5)))
+        amp.save()
+        assert amp.reader_running
+        assert len(received) == 1
+        assert "AMP_STATUS subscriber" in caplog.text
+    finally:
+        amp.close()
+
+
+def test_background_reader_reply_timeout(monkeypatch):
+    amp, _ = _make_shg_amplifier(monkeypatch)
+    amp.timeout = 0.1
+    amp.start_reader()
+    try:
+        with pytest.raises(TimeoutError, match="no AMP_SAVE reply"):
+            amp.save()
+        assert len(amp._replies[PrecilaserReturn.AMP_SAVE]) == 0
+    finally:
+        amp.close()
+
+
+def _configure_replies() -> dict:
+    return {
+        PrecilaserCommand.AMP_SET_CURRENT: _frame(
+            PrecilaserReturn.AMP_SET_CURRENT,
+            bytes(PrecilaserReturnParamLength.AMP_SET_CURRENT),
+        ),
+        PrecilaserCommand.AMP_TEC_TEMPERATURE: _frame(
+            PrecilaserReturn.AMP_TEC_TEMPERATURE,
+            b"\x00\x1c\x87\x1c\x87"
+            + bytes(PrecilaserReturnParamLength.AMP_TEC_TEMPERATURE - 5),
+        ),
+        PrecilaserCommand.AMP_POWER_STAB: _frame(
+            PrecilaserReturn.AMP_ENABLE,
+            b"Stable set ok"
+            + bytes(PrecilaserReturnParamLength.AMP_ENABLE - len("Stable set ok")),
+        ),
+    }
+
+
+@pytest.mark.parametrize("reader", [False, True])
+def test_configure_pipelines_commands(monkeypatch, reader):
+    amp, fake = _make_shg_amplifier(monkeypatch, _configure_replies())
+    if reader:
+        amp.start_reader()
+    try:
+        amp.configure(current=2.0, shg_temperature=73.0, power_stabilization=True)
+    finally:
+        amp.close()
+    # all commands are written at once
+    assert fake.writes == 1
+    assert amp._temperatures == (73.03, 73.03)
+
+
+def test_configure_checks_replies(monkeypatch):
+    replies = _configure_replies()
+    replies[PrecilaserCommand.AMP_POWER_STAB] = _frame(
+        PrecilaserReturn.AMP_ENABLE, bytes(PrecilaserReturnParamLength.AMP_ENABLE)
+    )
+    amp, _ = _make_shg_amplifier(monkeypatch, replies)
+    with pytest.raises(ValueError, match="Power stabilization not disabled"):
+        amp.configure(current=2.0, power_stabilization=False)
+
+
+def test_status_cache_max_age():
+    clock = VirtualClock()
+    sim = SimulatedSerial([SimulatedSHGAmplifier()], clock=clock)
+    amp = PrecilaserBus(sim).shg_amplifier(0)
+    amp.max_age = 1.0
+    with clock.patch():
+        amp.status
+        received = amp.status_timestamp
+        # the periodic status is only awaited if the cached one is too old
+        assert amp.fault is False
+        assert amp.status_timestamp == received
+        amp.enable()
+        amp.current = 2.0
+        assert amp.status.driver_current == (2.0, 2.0, 2.0)
+        assert amp.status_timestamp > received
+        received = amp.status_timestamp
+        amp.shg_temperature = 40.0
+        amp.status
+        assert amp.status_timestamp > received
+        received = amp.status_timestamp
+        clock.sleep(1.0)
+        amp.status
+        assert amp.status_timestamp > received
+
+
+def test_drain_decodes_latest_message_only(monkeypatch):
+    amp, fake = _make_shg_amplifier(monkeypatch)
+    decoded = []
+
+    def handler(message):
+        decoded.append(message)
+        return status_handler(message)
+
+    amp._message_handling[PrecilaserReturn.AMP_STATUS] = ("_status", handler)
+    temperatures: list = []
+    amp.subscribe(PrecilaserReturn.AMP_TEC_TEMPERATURE, temperatures.append)
+    tec = b"\x00" + (1234).to_bytes(2, "big") + (4567).to_bytes(2, "big") + bytes(12)
+    for current in range(1, 31):
+        fake.feed(_frame(PrecilaserReturn.AMP_STATUS, _status_payload(current / 10)))
+        fake.feed(_frame(PrecilaserReturn.AMP_TEC_TEMPERATURE, tec))
+    # a partial frame is left for the next read instead of waiting for the rest
+    fake.feed(_frame(PrecilaserReturn.AMP_STATUS, _status_payload(9))[:10])
+    amp._read_until_buffer_empty()
+    assert len(decoded) == 1
+    assert amp._status.driver_current[0] == 3.0
+    # subscribed return types are still handled individually
+    assert len(temperatures) == 30
+    assert len(amp._framer) == 10
+
+
+def test_drain_budget(monkeypatch):
+    amp, fake = _make_shg_amplifier(monkeypatch)
+    frame = _frame(PrecilaserReturn.AMP_STATUS, _status_payload(1.0))
+    fake.feed(frame * 20)
+    amp._read_until_buffer_empty(max_bytes=5 * len(frame))
+    assert amp._status is not None
+    assert amp._data_pending()
@@ -0,0 +1,200 @@
+import threading
+import time
+
+import pytest
+
+from precilaser import PrecilaserBus
+from precilaser.enums import PrecilaserCommand, PrecilaserReturn
+from precilaser.message import PrecilaserReturnParamLength
+
+from .conftest import _frame, _return_frame, _status_frame
+
+
+class BusSerial:
+    """
+    serial.Serial stand-in shared by several devices; read blocks until data arrives
+    or the timeout elapses and written commands are answered with the frame
+    registered in replies for the (address, command) pair.
+    """
+
+    def __init__(self, replies=None, timeout: float = 0.05):
+        self._rx = bytearray()
+        self._cond = threading.Condition()
+        self.replies = replies if replies is not None else {}
+        self.timeout = timeout
+        self.written = bytearray()
+        self.is_open = True
+
+    def feed(self, data: bytes) -> None:
+        with self._cond:
+            self._rx += data
+            self._cond.notify_all()
+
+    def read(self, n: int = 1) -> bytes:
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._rx) > 0, self.timeout)
+            chunk = bytes(self._rx[:n])
+            del self._rx[:n]
+            return chunk
+
+    def write(self, data: bytes) -> int:
+        self.written += data
+        reply = self.replies.get((data[2], PrecilaserCommand(data[3:4])))
+        if reply is not None:
+            self.feed(reply)
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx)
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+def test_bus_demultiplexes_frames_by_address():
+    fake = BusSerial()
+    bus = PrecilaserBus(fake)
+    seed = bus.seed(100)
+    amp = bus.amplifier(0)
+
+    # the seed reply is preceded by amplifier status frames and a frame for an
+    # address without a device
+    status = _status_frame(1.5)
+    fake.replies[(100, PrecilaserCommand.SEED_SET_VOLTAGE)] = (
+        status + _status_frame(9.0, address=7) + status + _return_frame()
+    )
+    seed.piezo_voltage = 5.0
+    assert bus.dropped == 1
+
+    # the amplifier status frames were queued for the amplifier, not discarded
+    amp._read_until_buffer_empty()
+    assert amp._status is not None
+    assert amp._status.driver_current[0] == pytest.approx(1.5)
+    bus.close()
+    assert not fake.is_open
+
+
+def test_bus_queue_is_bounded(caplog):
+    fake = BusSerial()
+    bus = PrecilaserBus(fake, queue_length=4)
+    seed = bus.seed(100)
+    amp = bus.amplifier(0)
+    # the amplifier streams status frames but is never read
+    fake.replies[(100, PrecilaserCommand.SEED_SET_VOLTAGE)] = (
+        b"".join(_status_frame(current) for current in range(10)) + _return_frame()
+    )
+    seed.piezo_voltage = 5.0
+    assert bus.discarded == 6
+    assert len(bus._queues[amp.address]) == 4
+    # the overflow is logged once until the queue is emptied
+    assert caplog.text.count("frame queue of address 0 is full") == 1
+    # the newest frames are kept
+    amp._read_until_buffer_empty()
+    assert amp._status is not None
+    assert amp._status.driver_current[0] == pytest.approx(9.0)
+
+
+def test_bus_detach_while_waiting():
+    bus = PrecilaserBus(BusSerial())
+    amp = bus.amplifier(0)
+    # another thread holds the read token, so next_frame waits for a queued frame
+    bus._reading = True
+    errors: list = []
+
+    def wait() -> None:
+        try:
+            bus.next_frame(0, timeout=5)
+        except ValueError as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    time.sleep(0.05)
+    bus.detach(amp)
+    thread.join(1)
+    assert not thread.is_alive()
+    assert "no device bound to address 0" in str(errors[0])
+    with pytest.raises(ValueError, match="no device bound"):
+        bus.data_pending(0)
+
+
+def test_bus_reader_survives_failing_device(monkeypatch, caplog):
+    fake = BusSerial()
+    fake.replies[(100, PrecilaserCommand.SEED_SET_VOLTAGE)] = _return_frame()
+    with PrecilaserBus(fake) as bus:
+        seed = bus.seed(100)
+        amp = bus.amplifier(0)
+
+        def fail(frame):
+            raise RuntimeError("handling failed")
+
+        monkeypatch.setattr(amp, "_receive_frame", fail)
+        bus.start_reader()
+        fake.feed(_status_frame(2.5))
+        deadline = time.monotonic() + 1.0
+        while "handling a frame" not in caplog.text and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert "handling a frame for address 0 failed" in caplog.text
+        # the reader keeps delivering replies
+        seed.piezo_voltage = 5.0
+        assert bus.reader_running
+
+
+def test_bus_concurrent_synchronous_queries():
+    fake = BusSerial()
+    fake.replies[(100, PrecilaserCommand.SEED_SET_VOLTAGE)] = _return_frame()
+    fake.replies[(0, PrecilaserCommand.AMP_SET_CURRENT)] = _frame(
+        PrecilaserReturn.AMP_SET_CURRENT,
+        bytes(PrecilaserReturnParamLength.AMP_SET_CURRENT),
+        0,
+    )
+    with PrecilaserBus(fake) as bus:
+        seed = bus.seed(100)
+        amp = bus.amplifier(0)
+        errors = []
+
+        def set_voltage():
+            try:
+                for _ in range(20):
+                    seed.piezo_voltage = 5.0
+            except Exception as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=set_voltage)
+        thread.start()
+        for _ in range(20):
+            amp.current = 1.0
+        thread.join()
+        assert errors == []
+
+
+def test_bus_reader_serves_all_devices():
+    fake = BusSerial()
+    fake.replies[(100, PrecilaserCommand.SEED_SET_VOLTAGE)] = _return_frame()
+    with PrecilaserBus(fake) as bus:
+        seed = bus.seed(100)
+        amp = bus.shg_amplifier(0)
+        amp.start_reader()
+        assert bus.reader_running and seed.reader_running
+
+        fake.feed(_status_frame(2.5))
+        deadline = time.monotonic() + 1.0
+        while amp._status is None and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert amp.status.driver_current[0] == pytest.approx(2.5)
+
+        seed.piezo_voltage = 5.0
+        seed.stop_reader()
+        assert not amp.reader_running
+
+
+def test_bus_attach_validation():
+    bus = PrecilaserBus(BusSerial())
+    seed = bus.seed(100)
+    with pytest.raises(ValueError, match="already bound"):
+        bus.seed(100)
+    # closing a bound device unbinds it without closing the bus port
+    seed.close()
+    assert bus.instrument.is_open
+    bus.seed(100)
@@ -1,4 +1,10 @@
-from precilaser.check import checksum, xor_check
+import os
+
+import pytest
+
+from precilaser.check import checksum, verify_frames, xor_check
+from precilaser.enums import PrecilaserCommand
+from precilaser.message import PrecilaserMessage
 
 
 def test_checksum_sums_modulo_256():
@@ -15,3 +21,45 @@ def test_xor_check():
     # a value xored with itself cancels out
     assert xor_check(b"\xab\xab") == 0
     assert xor_check(b"\x01\x02\x04") == 0x07
+
+
+def test_xor_check_long_data():
+    # long inputs are folded as a single integer
+    for n in [95, 96, 97, 128, 1000, 4097]:
+        data = os.urandom(n)
+        expected = 0
+        for b in data:
+            expected ^= b
+        assert xor_check(data) == expected
+
+
+def _frames() -> list[bytes]:
+    frames = [
+        bytes(
+            PrecilaserMessage(
+                PrecilaserCommand.SEED_SET_TEMP, 100, os.urandom(3)
+            ).command_bytes
+        )
+        for _ in range(50)
+    ]
+    frames += [
+        bytes(PrecilaserMessage(PrecilaserCommand.SEED_STATUS, 100).command_bytes)
+        for _ in range(50)
+    ]
+    # corrupt a payload byte and an xor byte
+    frames[3] = frames[3][:6] + bytes([frames[3][6] ^ 0x01]) + frames[3][7:]
+    frames[70] = frames[70][:-3] + bytes([frames[70][-3] ^ 0x01]) + frames[70][-2:]
+    return frames
+
+
+def test_verify_frames():
+    valid = verify_frames(_frames(), use_numpy=False)
+    assert valid == [i not in (3, 70) for i in range(100)]
+
+
+def test_verify_frames_numpy():
+    pytest.importorskip("numpy")
+    frames = _frames()
+    assert verify_frames(frames, use_numpy=True) == verify_frames(
+        frames, use_numpy=False
+    )
@@ -1,14 +1,16 @@
+from collections import deque
+
 import pytest
 
 import precilaser.device
 from precilaser.enums import (
     PrecilaserCommand,
-    PrecilaserMessageType,
     PrecilaserReturn,
 )
-from precilaser.message import PrecilaserMessage
 from precilaser.seed import Seed
 
+from .conftest import _return_frame
+
 
 class FakeSerial:
     """Minimal stand-in for serial.Serial used to drive the device read/write code."""
@@ -38,20 +40,6 @@ class FakeSerial:
         self.is_open = False
 
 
-def _return_frame(payload: bytes = b"\x01\xf4") -> bytes:
-    """A valid SEED_SET_VOLTAGE return frame (header P, address 100, 2-byte payload)."""
-    msg = PrecilaserMessage(
-        command=PrecilaserReturn.SEED_SET_VOLTAGE,
-        address=100,
-        payload=payload,
-        header=b"P",
-        terminator=b"\r\n",
-        endian="big",
-        type=PrecilaserMessageType.RETURN,
-    )
-    return bytes(msg.command_bytes)
-
-
 def _make_seed(monkeypatch, rx: bytes = b"") -> tuple:
     fake = FakeSerial(rx)
     monkeypatch.setattr(precilaser.device.serial, "Serial", lambda **kw: fake)
@@ -75,23 +63,21 @@ def test_read_single_message_resyncs_past_garbage(monkeypatch):
     assert message.payload == b"\x01\xf4"
 
 
+def test_read_until_reply_keeps_frame_after_partial_frame(monkeypatch):
+    # a truncated frame must not swallow the start of the reply following it
+    frame = _return_frame(b"\x00\x05")
+    dev, _ = _make_seed(monkeypatch, frame[:6] + _return_frame())
+    message = dev._read_until_reply(PrecilaserReturn.SEED_SET_VOLTAGE)
+    assert message.payload == b"\x01\xf4"
+    assert dev._framer.corrupted_frames == 1
+
+
 def test_read_single_message_timeout_on_no_data(monkeypatch):
     dev, _ = _make_seed(monkeypatch, b"")
     with pytest.raises(TimeoutError, match="no data received"):
         dev._read_single_message()
 
 
-def test_read_exact_raises_on_short_read(monkeypatch):
-    dev, _ = _make_seed(monkeypatch, b"\x01\x02\x03")
-    with pytest.raises(TimeoutError, match="expected 5 bytes, received 3"):
-        dev._read_exact(5)
-
-
-def test_read_exact_returns_requested_bytes(monkeypatch):
-    dev, _ = _make_seed(monkeypatch, b"\x01\x02\x03\x04\x05")
-    assert dev._read_exact(3) == b"\x01\x02\x03"
-
-
 def test_write_sends_command_bytes(monkeypatch):
     dev, fake = _make_seed(monkeypatch)
     msg = dev._generate_message(PrecilaserCommand.SEED_STATUS)
@@ -124,3 +110,51 @@ def test_context_manager_closes_port(monkeypatch):
         assert dev.instrument is fake
         assert fake.closed is False
     assert fake.closed is True
+
+
+def test_read_single_message_reads_buffered_frames(monkeypatch):
+    # both frames are drained from the port in one read, and returned in order
+    rx = _return_frame(b"\x00\x01") + _return_frame(b"\x00\x02")
+    dev, fake = _make_seed(monkeypatch, rx)
+    assert dev._read_single_message().payload == b"\x00\x01"
+    assert fake.in_waiting == 0
+    assert dev._data_pending()
+    assert dev._read_single_message().payload == b"\x00\x02"
+    assert not dev._data_pending()
+
+
+def test_pipeline_matches_replies_in_order(monkeypatch):
+    rx = _return_frame(b"\x00\x01") + _return_frame(b"\x00\x02")
+    dev, fake = _make_seed(monkeypatch, rx)
+    commands = [
+        (
+            dev._generate_message(PrecilaserCommand.SEED_SET_VOLTAGE, b"\x00\x01"),
+            PrecilaserReturn.SEED_SET_VOLTAGE,
+        ),
+        (
+            dev._generate_message(PrecilaserCommand.SEED_SET_VOLTAGE, b"\x00\x02"),
+            PrecilaserReturn.SEED_SET_VOLTAGE,
+        ),
+        (
+            dev._generate_message(PrecilaserCommand.SEED_STATUS),
+            PrecilaserReturn.SEED_STATUS,
+        ),
+    ]
+    futures = dev.pipeline(commands)
+    assert fake.written == b"".join(bytes(m.command_bytes) for m, _ in commands)
+    assert futures[0].result().payload == b"\x00\x01"
+    assert futures[1].result().payload == b"\x00\x02"
+    # no status reply was received
+    with pytest.raises(TimeoutError, match="no SEED_STATUS reply"):
+        futures[2].result()
+    assert dev._replies[PrecilaserReturn.SEED_STATUS] == deque()
+
+
+def test_subscribe_calls_back_with_handled_messages(monkeypatch):
+    dev, _ = _make_seed(monkeypatch, _return_frame() + _return_frame(b"\x00\x02"))
+    received = []
+    dev.subscribe(PrecilaserReturn.SEED_SET_VOLTAGE, received.append)
+    dev._read()
+    dev.unsubscribe(PrecilaserReturn.SEED_SET_VOLTAGE, received.append)
+    dev._read()
+    assert [message.payload for message in received] == [b"\x01\xf4"]
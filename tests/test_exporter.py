@@ -0,0 +1,117 @@
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import precilaser.exporter
+from precilaser import PrecilaserBus
+from precilaser.enums import PrecilaserCommand, PrecilaserReturn
+from precilaser.exporter import CONTENT_TYPE, PrometheusExporter
+from precilaser.sim import (
+    SimulatedSeed,
+    SimulatedSerial,
+    SimulatedSHGAmplifier,
+    VirtualClock,
+)
+
+
+def _fetch(exporter: PrometheusExporter, path: str = "/metrics") -> tuple:
+    with urllib.request.urlopen(
+        f"http://127.0.0.1:{exporter.port}{path}", timeout=5
+    ) as response:
+        return response.headers["Content-Type"], response.read().decode()
+
+
+def test_exporter_serves_latest_status(monkeypatch):
+    clock = VirtualClock()
+    sim = SimulatedSerial([SimulatedSeed(), SimulatedSHGAmplifier()], clock=clock)
+    bus = PrecilaserBus(sim)
+    seed = bus.seed(100)
+    amp = bus.shg_amplifier(0)
+    exporter = PrometheusExporter(
+        {"seed": seed, "shg": amp}, port=0, seed_interval=None, start_readers=False
+    )
+    with clock.patch(), exporter:
+        _, text = _fetch(exporter)
+        assert "precilaser_amplifier" not in text
+        assert "precilaser_exporter_errors_total 0" in text
+
+        received: list = []
+        amp.subscribe(PrecilaserReturn.AMP_TEC_TEMPERATURE, received.append)
+        while len(received) == 0:
+            amp._read()
+        seed.refresh()
+
+        content_type, text = _fetch(exporter)
+        assert content_type == CONTENT_TYPE
+        assert "# TYPE precilaser_amplifier_driver_current_amperes gauge" in text
+        assert (
+            'precilaser_amplifier_driver_current_amperes{device="shg",address="0",'
+            'driver="0"} 0.0'
+        ) in text
+        assert 'precilaser_amplifier_fault{device="shg",address="0"} 0' in text
+        assert (
+            'precilaser_shg_tec_temperature_celsius{device="shg",address="0",tec="1"}'
+            in text
+        )
+        status = seed._status
+        assert (
+            'precilaser_seed_wavelength_nanometers{device="seed",address="100"} '
+            f"{status.wavelength!r}"
+        ) in text
+        assert (
+            'precilaser_message_timestamp_seconds{device="seed",address="100",'
+            'type="status"}'
+        ) in text
+
+        # scrapes are served from the rendered text without serial traffic
+        written = len(sim.written)
+        assert _fetch(exporter)[1] == exporter.metrics.decode()
+        assert len(sim.written) == written
+
+        with pytest.raises(urllib.error.HTTPError):
+            _fetch(exporter, "/other")
+
+        # a failing update is counted instead of stopping the reader thread
+        def fail(status):
+            raise RuntimeError("render failed")
+
+        monkeypatch.setattr(precilaser.exporter, "_amplifier_samples", fail)
+        amp._read_until_reply(PrecilaserReturn.AMP_STATUS)
+        assert exporter.errors == 1
+        assert "precilaser_exporter_errors_total 1" in _fetch(exporter)[1]
+
+    # subscriptions are removed on close
+    assert amp._subscribers[PrecilaserReturn.AMP_STATUS] == []
+    assert seed._subscribers[PrecilaserReturn.SEED_STATUS] == []
+
+
+def test_exporter_polls_seeds_through_the_reader(monkeypatch):
+    sim = SimulatedSerial([SimulatedSeed()], clock=time)
+    seed = PrecilaserBus(sim).seed(100)
+    exporter = PrometheusExporter({"seed": seed}, port=0, seed_interval=0.01)
+    with exporter:
+        assert seed.reader_running
+        deadline = time.monotonic() + 5
+        while "precilaser_seed_wavelength" not in exporter.metrics.decode():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        # the poller only writes status requests
+        request = bytes(
+            seed._generate_message(PrecilaserCommand.SEED_STATUS).command_bytes
+        )
+        assert len(sim.written) % len(request) == 0
+        assert bytes(sim.written) == request * (len(sim.written) // len(request))
+
+        # a disconnected port is counted and logged instead of stopping the poller
+        def disconnected(message):
+            raise OSError("port disconnected")
+
+        monkeypatch.setattr(seed, "_write", disconnected)
+        deadline = time.monotonic() + 5
+        while exporter.errors < 2:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert exporter._poller is not None and exporter._poller.is_alive()
+    assert not seed.reader_running
@@ -0,0 +1,80 @@
+from precilaser.framer import PrecilaserFramer
+
+from .conftest import _return_frame
+
+
+def _framer() -> PrecilaserFramer:
+    return PrecilaserFramer(address=100, header=b"P", terminator=b"\r\n", endian="big")
+
+
+def test_framer_yields_complete_frames():
+    framer = _framer()
+    framer.feed(_return_frame(payload=b"\x00\x01") + _return_frame(payload=b"\x00\x02"))
+    frames = list(framer.frames())
+    assert frames == [
+        _return_frame(payload=b"\x00\x01"),
+        _return_frame(payload=b"\x00\x02"),
+    ]
+    assert len(framer) == 0
+
+
+def test_framer_waits_for_partial_frame():
+    framer = _framer()
+    frame = _return_frame()
+    framer.feed(frame[:4])
+    assert framer.next_frame() is None
+    assert not framer.has_frame()
+    framer.feed(frame[4:])
+    assert framer.next_frame() == frame
+
+
+def test_framer_skips_garbage_and_other_addresses():
+    framer = _framer()
+    framer.feed(b"\xaa\xbbP" + _return_frame(address=3) + _return_frame())
+    assert list(framer.frames()) == [_return_frame()]
+
+
+def test_framer_keeps_partial_header():
+    framer = _framer()
+    frame = _return_frame()
+    framer.feed(b"\x00" * 10 + frame[:2])
+    assert framer.next_frame() is None
+    # only the possible start of a header is retained
+    assert len(framer) == 2
+    framer.feed(frame[2:])
+    assert framer.next_frame() == frame
+
+
+def test_framer_any_address():
+    framer = PrecilaserFramer(None, header=b"P", terminator=b"\r\n", endian="big")
+    framer.feed(b"\xaa" + _return_frame(address=3) + _return_frame())
+    assert list(framer.frames()) == [_return_frame(address=3), _return_frame()]
+
+
+def test_framer_resynchronizes_after_partial_frame():
+    framer = _framer()
+    frame = _return_frame()
+    # a partial frame directly followed by a complete one; the length byte of the
+    # partial frame makes its candidate include the start of the next frame
+    framer.feed(frame[:7] + frame + frame)
+    assert list(framer.frames()) == [frame, frame]
+    assert framer.corrupted_frames == 1
+    assert framer.dropped_bytes == 7
+
+
+def test_framer_skips_corrupted_frame():
+    framer = _framer()
+    corrupted = bytearray(_return_frame(payload=b"\x00\x01"))
+    corrupted[5] ^= 0xFF
+    framer.feed(bytes(corrupted) + _return_frame())
+    assert list(framer.frames()) == [_return_frame()]
+    assert framer.corrupted_frames == 1
+    assert framer.dropped_bytes == len(corrupted)
+
+
+def test_framer_without_validation():
+    framer = PrecilaserFramer(100, b"P", b"\r\n", "big", validate=False)
+    corrupted = bytearray(_return_frame())
+    corrupted[5] ^= 0xFF
+    framer.feed(bytes(corrupted))
+    assert framer.next_frame() == bytes(corrupted)
@@ -0,0 +1,63 @@
+from precilaser import PrecilaserBus
+from precilaser.enums import PrecilaserReturn
+from precilaser.instrumentation import LATENCY_BUCKETS, Instrumentation
+from precilaser.sim import SimulatedSerial, SimulatedSHGAmplifier, VirtualClock
+
+from .conftest import _frame, _return_frame, _status_payload
+from .test_amplifier import _make_shg_amplifier
+from .test_device import _make_seed
+
+
+def test_bus_device_instrumentation():
+    clock = VirtualClock()
+    sim = SimulatedSerial(
+        [SimulatedSHGAmplifier()], clock=clock, corruption_rate=0.001, seed=3
+    )
+    bus = PrecilaserBus(sim)
+    amp = bus.shg_amplifier(0)
+    instrumentation = Instrumentation()
+    bus.instrumentation = instrumentation
+    amp.instrumentation = instrumentation
+    with clock.patch():
+        amp.shg_temperature = 42.0
+        for _ in range(100):
+            amp._read()
+    snapshot = instrumentation.snapshot()
+    assert snapshot["bytes_written"] == len(sim.written)
+    assert snapshot["bytes_read"] > 0
+    assert snapshot["frames"]["AMP_STATUS"] > 40
+    assert snapshot["checksum_failures"] > 0
+    assert snapshot["resync_bytes"] > 0
+    latency = snapshot["latency"]["AMP_TEC_TEMPERATURE"]
+    assert latency["count"] == 1 and sum(latency["counts"]) == 1
+    assert len(latency["counts"]) == len(LATENCY_BUCKETS) + 1
+    assert latency["mean"] > 0
+    assert snapshot["decode"]["AMP_STATUS"]["count"] == snapshot["frames"]["AMP_STATUS"]
+
+    instrumentation.reset()
+    assert instrumentation.snapshot()["frames"] == {}
+    assert instrumentation.snapshot()["checksum_failures"] == 0
+
+
+def test_device_instrumentation(monkeypatch):
+    frame = _return_frame()
+    dev, _ = _make_seed(monkeypatch, b"\xaa\xbb" + frame[:6] + frame)
+    dev.instrumentation = Instrumentation()
+    dev._read_until_reply(PrecilaserReturn.SEED_SET_VOLTAGE)
+    snapshot = dev.instrumentation.snapshot()
+    assert snapshot["bytes_read"] == 8 + len(frame)
+    assert snapshot["frames"] == {"SEED_SET_VOLTAGE": 1}
+    assert snapshot["resync_bytes"] == 8
+    assert snapshot["checksum_failures"] == 1
+
+
+def test_drain_frame_counts(monkeypatch):
+    amp, fake = _make_shg_amplifier(monkeypatch)
+    amp.instrumentation = Instrumentation()
+    for current in range(5):
+        fake.feed(_frame(PrecilaserReturn.AMP_STATUS, _status_payload(current)))
+    amp._read_until_buffer_empty()
+    snapshot = amp.instrumentation.snapshot()
+    # every drained frame is counted once, whether it is decoded or skipped
+    assert snapshot["frames"] == {"AMP_STATUS": 5}
+    assert snapshot["decode"]["AMP_STATUS"]["count"] == 1
@@ -1,10 +1,13 @@
 import pytest
 
-from precilaser.enums import PrecilaserCommand, PrecilaserMessageType
+from precilaser.enums import PrecilaserCommand, PrecilaserMessageType, PrecilaserReturn
 from precilaser.message import (
     PrecilaserCommandParamLength,
+    PrecilaserFrame,
     PrecilaserMessage,
+    decode_message,
     decompose_message,
+    frame_template,
 )
 
 
@@ -106,3 +109,61 @@ def test_decompose_message_invalid_xor():
     frame[-3] ^= 0xFF
     with pytest.raises(ValueError, match="invalid xor check"):
         _decompose(bytes(frame))
+
+
+def test_frame_template_encode():
+    template = frame_template(
+        PrecilaserReturn.SEED_SET_TEMP,
+        100,
+        b"P",
+        b"\r\n",
+        "big",
+        PrecilaserMessageType.RETURN,
+    )
+    # templates are compiled once per (device, command)
+    assert template is frame_template(
+        PrecilaserReturn.SEED_SET_TEMP,
+        100,
+        b"P",
+        b"\r\n",
+        "big",
+        PrecilaserMessageType.RETURN,
+    )
+    frame, checksum, xor = template.encode(_valid_return_frame()[5:9])
+    assert frame == _valid_return_frame()
+    assert (checksum, xor) == (0x46, 0xBA)
+
+
+def test_PrecilaserMessage_without_payload():
+    message = PrecilaserMessage(PrecilaserCommand.SEED_STATUS, address=100)
+    assert message.command_bytes == b"P\x00d\xa9\x00\x0d\xcd\r\n"
+    assert message.checksum == 0x0D
+    assert message.xor_check == 0xCD
+
+
+def test_decode_message_references_received_bytes():
+    frame = _valid_return_frame()
+    message = decode_message(frame, 100, b"P", b"\r\n", "big")
+    assert isinstance(message, PrecilaserFrame)
+    assert message.command == PrecilaserReturn.SEED_SET_TEMP
+    assert message.type == PrecilaserMessageType.RETURN
+    assert (message.checksum, message.xor_check) == (70, 186)
+    # the payload is a view into the received frame, not a copy
+    assert isinstance(message.payload, memoryview)
+    assert message.payload.obj is frame
+    assert message.payload == frame[5:9]
+    assert message.command_bytes == frame
+
+
+def test_decode_message_invalid_checksum():
+    frame = bytearray(_valid_return_frame())
+    frame[-4] ^= 0xFF
+    with pytest.raises(ValueError, match="invalid message checksum"):
+        decode_message(bytes(frame), 100, b"P", b"\r\n", "big")
+
+
+def test_decode_message_invalid_return_code():
+    frame = bytearray(_valid_return_frame())
+    frame[3] = 0x00
+    with pytest.raises(ValueError, match="invalid return code"):
+        decode_message(bytes(frame), 100, b"P", b"\r\n", "big")
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+import precilaser.device
+from precilaser.enums import PrecilaserReturn
+from precilaser.message import (
+    PrecilaserReturnParamLength,
+    decode_message,
+)
+from precilaser.recorder import TelemetryReader, TelemetryRecorder
+from precilaser.seed import Seed
+from precilaser.status import AmplifierStatus
+
+from .conftest import _frame, _return_frame
+from .test_device import FakeSerial
+
+
+def test_recorder_roundtrip(tmp_path):
+    pytest.importorskip("numpy")
+    rng = random.Random(0)
+    payloads = [
+        rng.randbytes(PrecilaserReturnParamLength.AMP_STATUS) for _ in range(10)
+    ]
+    with TelemetryRecorder(tmp_path) as recorder:
+        for i, payload in enumerate(payloads):
+            frame = decode_message(
+                _frame(PrecilaserReturn.AMP_STATUS, payload), 0, b"P", b"\r\n", "big"
+            )
+            recorder.record(frame, timestamp=100.0 + i)
+
+    with TelemetryReader(tmp_path) as reader:
+        assert PrecilaserReturn.AMP_STATUS in reader
+        telemetry = reader[PrecilaserReturn.AMP_STATUS]
+        assert len(telemetry) == 10
+        assert telemetry.frames[3].tobytes() == _frame(
+            PrecilaserReturn.AMP_STATUS, payloads[3]
+        )
+        assert all(telemetry.verify())
+
+        assert telemetry.time_slice(102.0, 105.0) == slice(2, 5)
+        columns = telemetry.columns(102.0, 105.0)
+        assert columns["timestamp"].tolist() == [102.0, 103.0, 104.0]
+        for row, payload in enumerate(payloads[2:5]):
+            status = AmplifierStatus(payload)
+            assert columns["driver_current"][row].tolist() == list(
+                status.driver_current
+            )
+            assert columns["temperatures"][row].tolist() == list(status.temperatures)
+
+
+def test_recorder_appends_and_reader_refreshes(tmp_path):
+    pytest.importorskip("numpy")
+    frame = decode_message(_return_frame(), 100, b"P", b"\r\n", "big")
+    recorder = TelemetryRecorder(tmp_path)
+    recorder.record(frame, timestamp=1.0)
+    recorder.flush()
+
+    reader = TelemetryReader(tmp_path)
+    telemetry = reader[PrecilaserReturn.SEED_SET_VOLTAGE]
+    assert len(telemetry) == 1
+
+    recorder.record(frame, timestamp=2.0)
+    recorder.close()
+    # reopening an existing file appends to it
+    with TelemetryRecorder(tmp_path) as recorder:
+        recorder.record(frame, timestamp=3.0)
+
+    reader.refresh()
+    assert telemetry.timestamps.tolist() == [1.0, 2.0, 3.0]
+    assert telemetry.columns()["payload"][2].tobytes() == b"\x01\xf4"
+    reader.close()
+
+
+def test_recorder_drops_partial_record(tmp_path):
+    pytest.importorskip("numpy")
+    frame = decode_message(_return_frame(), 100, b"P", b"\r\n", "big")
+    with TelemetryRecorder(tmp_path) as recorder:
+        recorder.record(frame, timestamp=1.0)
+    # a crash while writing leaves a partial record
+    with open(tmp_path / "SEED_SET_VOLTAGE.bin", "ab") as file:
+        file.write(b"\x00" * 5)
+    with TelemetryRecorder(tmp_path) as recorder:
+        recorder.record(frame, timestamp=2.0)
+
+    with TelemetryReader(tmp_path) as reader:
+        telemetry = reader[PrecilaserReturn.SEED_SET_VOLTAGE]
+        assert telemetry.timestamps.tolist() == [1.0, 2.0]
+        assert all(telemetry.verify())
+
+
+def test_device_records_received_frames(monkeypatch, tmp_path):
+    pytest.importorskip("numpy")
+    fake = FakeSerial(_return_frame() + _return_frame(b"\x00\x10"))
+    monkeypatch.setattr(precilaser.device.serial, "Serial", lambda **kw: fake)
+    dev = Seed(port="COMTEST", address=100)
+    dev.recorder = TelemetryRecorder(tmp_path)
+    dev._read()
+    dev._read()
+    dev.recorder.close()
+
+    with TelemetryReader(tmp_path) as reader:
+        telemetry = reader[PrecilaserReturn.SEED_SET_VOLTAGE]
+        payloads = telemetry.payloads
+        assert [payload.tobytes() for payload in payloads] == [
+            b"\x01\xf4",
+            b"\x00\x10",
+        ]
+        del payloads
@@ -0,0 +1,154 @@
+import csv
+import math
+
+import pytest
+
+import precilaser.utils  # noqa: F401, imported for the clock to patch it
+from precilaser import PrecilaserBus
+from precilaser.amplifier import temperature_handler
+from precilaser.enums import PrecilaserReturn
+from precilaser.scan import Scan, find_shg_peak, interpolate, ramp, scan
+from precilaser.sim import (
+    SimulatedSeed,
+    SimulatedSerial,
+    SimulatedSHGAmplifier,
+    VirtualClock,
+)
+
+
+def _simulation() -> tuple:
+    clock = VirtualClock()
+    sim = SimulatedSerial(
+        [SimulatedSeed(), SimulatedSHGAmplifier(time_constant=5.0)], clock=clock
+    )
+    bus = PrecilaserBus(sim)
+    return clock, bus.seed(100), bus.shg_amplifier(0)
+
+
+def test_serpentine_scan_streams_csv(tmp_path):
+    clock, seed, _ = _simulation()
+    output = tmp_path / "scan.csv"
+    received = []
+    with clock.patch():
+        points = scan(
+            seed,
+            "piezo_voltage",
+            [1.0, 2.0, 3.0],
+            {"piezo": lambda: seed.status.piezo_voltage},
+            order="serpentine",
+            passes=2,
+            output=output,
+            callback=received.append,
+        )
+    assert [p.setpoint for p in points] == [1.0, 2.0, 3.0, 3.0, 2.0, 1.0]
+    assert [p.measurements["piezo"] for p in points] == [1.0, 2.0, 3.0, 3.0, 2.0, 1.0]
+    assert received == points
+    with open(output, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["index", "piezo_voltage", "timestamp", "piezo"]
+    assert [float(row[1]) for row in rows[1:]] == [1.0, 2.0, 3.0, 3.0, 2.0, 1.0]
+
+
+def test_shg_temperature_scan_waits_until_stable():
+    clock, _, amp = _simulation()
+    with clock.patch():
+        points = Scan(
+            amp,
+            "shg_temperature",
+            [41.0, 42.0],
+            {"temperature": lambda: amp.shg_temperature},
+        ).run()
+    for point in points:
+        assert point.measurements["temperature"] == pytest.approx(
+            point.setpoint, abs=0.02
+        )
+
+
+def test_adaptive_scan_refines_largest_change():
+    clock, seed, _ = _simulation()
+
+    def response() -> float:
+        # step between 2 V and 3 V
+        return 1.0 if seed.piezo_voltage > 2.2 else 0.0
+
+    with clock.patch():
+        points = scan(
+            seed,
+            "piezo_voltage",
+            [0.0, 1.0, 2.0, 3.0, 4.0],
+            {"response": response},
+            order="adaptive",
+            refine_points=3,
+        )
+    assert [p.setpoint for p in points[5:]] == [2.5, 2.25, 2.125]
+
+
+def test_invalid_scans():
+    _, seed, amp = _simulation()
+    with pytest.raises(ValueError):
+        Scan(seed, "status", [1.0])
+    with pytest.raises(ValueError):
+        Scan(seed, "piezo_voltage", [1.0], order="random")
+    with pytest.raises(ValueError):
+        Scan(seed, "piezo_voltage", [1.0], order="adaptive")
+
+
+def test_find_shg_peak():
+    clock = VirtualClock()
+    shg = SimulatedSHGAmplifier(shg_temperature=39.0, time_constant=5.0)
+    amp = PrecilaserBus(SimulatedSerial([shg], clock=clock)).shg_amplifier(0)
+
+    def power() -> float:
+        # sinc^2 phase matching curve around 41.37 C
+        x = 3 * (shg.shg_temperature - 41.37)
+        return 1.0 if x == 0 else (math.sin(x) / x) ** 2
+
+    with clock.patch():
+        result = find_shg_peak(amp, power, 39.0, 44.0, tolerance=0.02, max_points=8)
+    assert result.temperature == pytest.approx(41.37, abs=0.03)
+    assert len(result.points) <= 8
+    ramp_temperatures = [temperature for _, temperature, _ in result.ramp]
+    assert min(ramp_temperatures) < 39.1 and max(ramp_temperatures) > 43.9
+
+
+def test_shg_temperature_ramp():
+    clock, _, amp = _simulation()
+    with clock.patch():
+        record = ramp(amp, "shg_temperature", 40.0, 41.0, rate=0.1, step=0.05)
+    assert len(record.setpoints) == 20
+    assert record.setpoints[-1][1] == pytest.approx(41.0)
+    # ramp lasts 10 s, TEC and status messages every 300 ms plus the setpoint replies
+    tec = record.timestamps(PrecilaserReturn.AMP_TEC_TEMPERATURE)
+    assert len(tec) >= 50
+    assert tec == sorted(tec)
+    assert len(record.timestamps(PrecilaserReturn.AMP_STATUS)) >= 30
+    temperatures = record.values(
+        PrecilaserReturn.AMP_TEC_TEMPERATURE,
+        lambda frame: temperature_handler(frame)[1],
+    )
+    assert 40.0 < temperatures[-1] < 41.0
+
+
+def test_piezo_ramp_polls_status():
+    clock, seed, _ = _simulation()
+    with clock.patch():
+        record = ramp(seed, "piezo_voltage", 1.0, 2.0, rate=1.0, step=0.25)
+    assert [setpoint for _, setpoint in record.setpoints] == [1.25, 1.5, 1.75, 2.0]
+    assert len(record.timestamps(PrecilaserReturn.SEED_STATUS)) == 4
+
+
+def test_ramp_rejects_non_positive_rate_and_step():
+    _, seed, _ = _simulation()
+    for rate in (0.0, -1.0):
+        with pytest.raises(ValueError, match="rate must be positive"):
+            ramp(seed, "piezo_voltage", 1.0, 2.0, rate=rate, step=0.25)
+    with pytest.raises(ValueError, match="step must be positive"):
+        ramp(seed, "piezo_voltage", 1.0, 2.0, rate=1.0, step=0.0)
+    assert len(seed.bus.instrument.written) == 0
+
+
+def test_interpolate():
+    values = interpolate([0.0, 1.0, 3.0], [0.0, 2.0, 6.0], [-1.0, 0.5, 2.0, 4.0])
+    assert values == [0.0, 1.0, 4.0, 6.0]
+    with pytest.raises(ValueError):
+        interpolate([0.0], [], [0.0])
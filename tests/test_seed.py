@@ -0,0 +1,86 @@
+import pytest
+
+from precilaser import PrecilaserBus
+from precilaser.cache import WavelengthParamCache
+from precilaser.enums import PrecilaserReturn
+from precilaser.sim import SimulatedSeed, SimulatedSerial, VirtualClock
+
+
+def _seed() -> tuple:
+    clock = VirtualClock()
+    seed = PrecilaserBus(SimulatedSerial([SimulatedSeed()], clock=clock)).seed(100)
+    statuses: list = []
+    seed.subscribe(PrecilaserReturn.SEED_STATUS, statuses.append)
+    return clock, seed, statuses
+
+
+def test_status_retrieved_every_read_without_max_age():
+    clock, seed, statuses = _seed()
+    with clock.patch():
+        seed.temperature_setpoint
+        seed.piezo_voltage
+    assert len(statuses) == 2
+
+
+def test_status_cache_max_age():
+    clock, seed, statuses = _seed()
+    seed.max_age = 1.0
+    with clock.patch():
+        status = seed.status
+        assert seed.temperature_setpoint == status.temperature_set
+        assert seed.piezo_voltage == status.piezo_voltage
+        assert len(statuses) == 1
+        clock.sleep(1.5)
+        seed.status
+        assert len(statuses) == 2
+        seed.refresh()
+        assert len(statuses) == 3
+
+
+def test_setter_invalidates_status_cache():
+    clock, seed, statuses = _seed()
+    seed.max_age = 10.0
+    with clock.patch():
+        seed.status
+        seed.piezo_voltage = 12.5
+        assert seed.piezo_voltage == 12.5
+    assert len(statuses) == 2
+
+
+def test_wavelength_params_cache(tmp_path):
+    cache = WavelengthParamCache(tmp_path / "cache.json")
+    clock, seed, _ = _seed()
+    seed.wavelength_cache = cache
+    with clock.patch():
+        # parameters are retrieved on first use and stored in the cache
+        wavelength = seed.wavelength
+    assert seed.serial == b"SIM00001"
+    assert cache.get("SIM:100") == (b"SIM00001", seed.wavelength_params)
+
+    clock, seed, _ = _seed()
+    seed.wavelength_cache = cache
+    replies: list = []
+    seed.subscribe(PrecilaserReturn.SEED_SERIAL_WAV, replies.append)
+    with clock.patch():
+        assert seed.wavelength == wavelength
+    assert replies == []
+    assert seed.serial == b"SIM00001"
+
+
+def test_wavelength_params_cache_mismatch(tmp_path):
+    cache = WavelengthParamCache(tmp_path / "cache.json")
+    cache.set("SIM:100", b"OTHER001", (0x03, 0xE8, 0x00, 0xA6, 0x00, 0x00))
+    clock, seed, _ = _seed()
+    seed.wavelength_cache = cache
+    with clock.patch():
+        seed.load_wavelength_params()
+    assert seed.serial == b"SIM00001"
+    assert cache.get("SIM:100") == (b"SIM00001", seed.wavelength_params)
+
+
+def test_wavelength_setter_uses_calibration():
+    clock, seed, _ = _seed()
+    with clock.patch():
+        seed.wavelength = 1086.1
+        assert seed.temperature_setpoint == pytest.approx(35.0, abs=1e-3)
+    assert seed.wavelength_calibration.slope == pytest.approx(0.01)
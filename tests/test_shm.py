@@ -0,0 +1,134 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import pytest
+
+from precilaser import PrecilaserBus
+from precilaser.enums import Endian, PrecilaserReturn
+from precilaser.message import decode_message
+from precilaser.shm import (
+    _SEQUENCE,
+    _SEQUENCE_OFFSET,
+    SharedMemoryAmplifier,
+    SharedMemoryPublisher,
+)
+from precilaser.sim import SimulatedSerial, SimulatedSHGAmplifier, VirtualClock
+
+
+def _publish(ring_length: int = 64, endian: Endian = "big") -> tuple:
+    clock = VirtualClock()
+    amp = PrecilaserBus(
+        SimulatedSerial([SimulatedSHGAmplifier(endian=endian)], clock=clock)
+    ).shg_amplifier(0, endian=endian)
+    publisher = SharedMemoryPublisher(amp, ring_length=ring_length, start_reader=False)
+    return clock, amp, publisher
+
+
+def _read_until(amp, return_command) -> None:
+    while amp._read().command != return_command:
+        pass
+
+
+def test_client_reads_published_status():
+    clock, amp, publisher = _publish()
+    with clock.patch(), publisher, SharedMemoryAmplifier(publisher.name) as client:
+        assert client.address == 0 and client.shg
+        assert client.status_timestamp is None
+        client.timeout = 0.01
+        with pytest.raises(TimeoutError, match="no status published"):
+            client.status
+
+        amp.enable()
+        _read_until(amp, PrecilaserReturn.AMP_STATUS)
+        _read_until(amp, PrecilaserReturn.AMP_TEC_TEMPERATURE)
+        assert client.status == amp._status
+        assert client.status_timestamp == amp.status_timestamp
+        assert client.current == amp._status.driver_current
+        assert client.fault is False
+        assert client.shg_temperature == amp._temperatures[1]
+        assert client.shg_temperature_timestamp == amp.shg_temperature_timestamp
+
+        # the decoded status is reused until the publisher updates it
+        status = client.status
+        assert client.status is status
+        _read_until(amp, PrecilaserReturn.AMP_STATUS)
+        assert client.status_timestamp == amp.status_timestamp
+
+        frames = client.frames()
+        assert len(frames) > 2
+        assert [timestamp for timestamp, _ in frames] == sorted(
+            timestamp for timestamp, _ in frames
+        )
+        message = decode_message(frames[-1][1], 0, b"P", b"\r\n", "big")
+        assert message.command == PrecilaserReturn.AMP_STATUS
+    # the block is removed on close
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(publisher.name)
+
+
+def test_client_decodes_little_endian_status():
+    clock, amp, publisher = _publish(endian="little")
+    with clock.patch(), publisher, SharedMemoryAmplifier(publisher.name) as client:
+        assert client.endian == "little"
+        amp.enable()
+        amp.current = 2.0
+        _read_until(amp, PrecilaserReturn.AMP_STATUS)
+        assert client.status == amp._status
+        assert client.current == (2.0, 2.0, 2.0)
+
+
+def test_frame_ring_wraps():
+    clock, amp, publisher = _publish(ring_length=4)
+    received: list = []
+    with clock.patch(), publisher, SharedMemoryAmplifier(publisher.name) as client:
+        for _ in range(10):
+            received.append(amp._read().command_bytes)
+        frames = client.frames()
+    assert [frame for _, frame in frames] == received[-4:]
+
+
+def test_client_times_out_on_interrupted_update():
+    _, _, publisher = _publish()
+    with publisher, SharedMemoryAmplifier(publisher.name, timeout=0.05) as client:
+        # a publisher dying mid-update leaves the sequence odd
+        _SEQUENCE.pack_into(publisher._buf, _SEQUENCE_OFFSET, 1)
+        for read in (
+            lambda: client.status,
+            lambda: client.shg_temperature,
+            client.frames,
+        ):
+            with pytest.raises(TimeoutError, match="not completed"):
+                read()
+
+
+def test_client_rejects_foreign_block():
+    block = shared_memory.SharedMemory(create=True, size=1024)
+    try:
+        with pytest.raises(ValueError, match="not a precilaser shared memory block"):
+            SharedMemoryAmplifier(block.name)
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _read_status(name: str, queue) -> None:
+    with SharedMemoryAmplifier(name) as client:
+        queue.put((client.current, client.shg_temperature))
+
+
+def test_client_in_other_process():
+    clock, amp, publisher = _publish()
+    with clock.patch(), publisher:
+        amp.enable()
+        amp.current = 2.0
+        _read_until(amp, PrecilaserReturn.AMP_STATUS)
+        _read_until(amp, PrecilaserReturn.AMP_TEC_TEMPERATURE)
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(target=_read_status, args=(publisher.name, queue))
+        process.start()
+        current, temperature = queue.get(timeout=30)
+        process.join()
+        assert process.exitcode == 0
+        assert current == (2.0, 2.0, 2.0)
+        assert temperature == amp._temperatures[1]
@@ -0,0 +1,114 @@
+import math
+import time
+
+import pytest
+
+import precilaser.utils
+from precilaser import PrecilaserBus
+from precilaser.check import verify_frames
+from precilaser.framer import PrecilaserFramer
+from precilaser.sim import (
+    SimulatedSeed,
+    SimulatedSerial,
+    SimulatedSHGAmplifier,
+    VirtualClock,
+)
+from precilaser.utils import wait_until_shg_temperature_stable
+
+
+def _simulation(**kwargs) -> tuple:
+    clock = VirtualClock()
+    sim = SimulatedSerial(
+        [SimulatedSeed(), SimulatedSHGAmplifier(time_constant=20.0)],
+        clock=clock,
+        **kwargs,
+    )
+    bus = PrecilaserBus(sim)
+    return clock, sim, bus.seed(100), bus.shg_amplifier(0)
+
+
+def test_virtual_clock_patch():
+    clock = VirtualClock()
+    with clock.patch(precilaser.utils):
+        assert precilaser.utils.time is clock
+        precilaser.utils.time.sleep(3600)
+    assert precilaser.utils.time is time
+    assert clock.monotonic() == 3600
+
+
+def test_periodic_frames_paced_by_baudrate():
+    clock = VirtualClock()
+    sim = SimulatedSerial([SimulatedSHGAmplifier()], clock=clock, baudrate=9600)
+    assert sim.in_waiting == 0
+    # status (64 byte payload) and TEC (17 byte payload) frames every 300 ms
+    data = sim.read(73 + 26)
+    assert clock.monotonic() == pytest.approx(0.3 + 99 * 10 / 9600)
+    framer = PrecilaserFramer(None, b"P", b"\r\n", "big")
+    framer.feed(data)
+    assert verify_frames(list(framer.frames())) == [True, True]
+    # only the status frame of the next period has arrived
+    clock.sleep(0.6 + 73 * 10 / 9600 - clock.monotonic())
+    assert sim.in_waiting == 73
+
+
+def test_seed_commands():
+    clock, _, seed, _ = _simulation()
+    with clock.patch():
+        seed.temperature_setpoint = 30.0
+        seed.piezo_voltage = 12.5
+        seed._get_serial_wavelength_params()
+        assert seed.serial == b"SIM00001"
+        clock.sleep(20)
+        status = seed.status
+    assert status.temperature_set == 30.0
+    assert status.temperature_act == pytest.approx(30.0, abs=0.01)
+    assert status.piezo_voltage == 12.5
+    assert status.wavelength == pytest.approx(1086.05, abs=1e-3)
+
+
+def test_shg_temperature_first_order_response():
+    clock, _, _, amp = _simulation()
+    with clock.patch():
+        amp.shg_temperature = 45.0
+        clock.sleep(20.0)
+        temperature = amp.shg_temperature
+        amp.configure(current=2.5)
+        amp.enable()
+        current = amp.current
+    assert temperature == pytest.approx(45 - 5 / math.e, abs=0.05)
+    assert current == (2.5, 2.5, 2.5)
+
+
+def test_stability_wait_in_virtual_time():
+    clock, _, _, amp = _simulation()
+    wall = time.perf_counter()
+    with clock.patch():
+        amp.shg_temperature = 42.0
+        wait_until_shg_temperature_stable(amp, 42.0, time_stable=10)
+    # the wait takes minutes of simulated time
+    assert clock.monotonic() > 60
+    assert time.perf_counter() - wall < 10
+
+
+def test_corrupted_and_partial_frames_are_deterministic():
+    def received(seed: int) -> bytes:
+        clock = VirtualClock()
+        sim = SimulatedSerial(
+            [SimulatedSHGAmplifier(temperature_noise=0.01, seed=seed)],
+            clock=clock,
+            corruption_rate=0.002,
+            partial_rate=0.1,
+            seed=seed,
+        )
+        clock.sleep(60)
+        return sim.read(sim.in_waiting)
+
+    data = received(1)
+    assert data == received(1)
+    assert data != received(2)
+    framer = PrecilaserFramer(None, b"P", b"\r\n", "big")
+    framer.feed(data)
+    # the framer only yields valid frames and counts the corrupted ones
+    valid = verify_frames(list(framer.frames()))
+    assert len(valid) > 0 and all(valid)
+    assert framer.corrupted_frames > 0
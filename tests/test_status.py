@@ -1,6 +1,18 @@
+import dataclasses
+import pickle
+import random
+from dataclasses import FrozenInstanceError
+
+import pytest
+
 from precilaser.enums import PrecilaserMessageType, PrecilaserReturn
 from precilaser.message import PrecilaserMessage, PrecilaserReturnParamLength
-from precilaser.status import AmplifierStatus, SeedStatus
+from precilaser.status import (
+    AmplifierStatus,
+    SeedStatus,
+    decode_amplifier_status_batch,
+    decode_seed_status_batch,
+)
 
 
 def test_AmplifierStatus():
@@ -85,3 +97,128 @@ def test_SeedStatus():
     assert status.wavelength == 108406.0632
     assert status.power == 8225
     assert status.emission is True
+
+
+def test_status_fields_decoded_lazily():
+    payload = bytearray(PrecilaserReturnParamLength.AMP_STATUS)
+    payload[7:9] = (150).to_bytes(2, "big")
+    status = AmplifierStatus(bytes(payload))
+    # nothing is decoded until a field is accessed
+    assert not hasattr(status, "__dict__")
+    with pytest.raises(AttributeError):
+        status._driver_current
+    assert status.driver_current == (1.5, 0.0, 0.0)
+    assert status._driver_current is status.driver_current
+    with pytest.raises(AttributeError):
+        status._pd_status
+
+
+def test_status_immutable_and_comparable():
+    payload = bytes(range(PrecilaserReturnParamLength.AMP_STATUS))
+    status = AmplifierStatus(payload)
+    with pytest.raises(FrozenInstanceError):
+        status.stable = True  # type: ignore[misc]
+    assert status == AmplifierStatus(memoryview(payload))
+    assert hash(status) == hash(AmplifierStatus(payload))
+    assert status != AmplifierStatus(payload[::-1])
+
+    restored = pickle.loads(pickle.dumps(status))
+    assert restored == status
+    assert restored.temperatures == status.temperatures
+    assert repr(restored).startswith("AmplifierStatus(stable=False, system_status=")
+
+    seed_status = SeedStatus(payload[:40], "little")
+    assert pickle.loads(pickle.dumps(seed_status)).power == seed_status.power
+
+
+def test_status_asdict():
+    payload = bytes(range(PrecilaserReturnParamLength.AMP_STATUS))
+    status = AmplifierStatus(payload)
+    fields = status.asdict()
+    assert list(fields) == list(AmplifierStatus._fields)
+    assert fields["driver_current"] == status.driver_current
+    assert fields["system_status"]["fault"] == status.system_status.fault
+    assert fields["pd_status"][1]["status"] == status.pd_status[1].status
+
+    seed_status = SeedStatus(payload[:40], "big")
+    assert seed_status.asdict()["wavelength"] == seed_status.wavelength
+
+
+def test_status_dataclass_fields():
+    payload = bytes(range(PrecilaserReturnParamLength.AMP_STATUS))
+    status = AmplifierStatus(payload)
+    assert dataclasses.is_dataclass(status)
+    assert [f.name for f in dataclasses.fields(status)] == [
+        "status_bytes",
+        "endian",
+        *AmplifierStatus._fields,
+    ]
+    assert status == AmplifierStatus(bytes(payload))
+    assert dataclasses.asdict(status) == {
+        "status_bytes": payload,
+        "endian": "big",
+        **status.asdict(),
+    }
+
+    little = dataclasses.replace(status, endian="little")
+    assert little == AmplifierStatus(payload, "little")
+    assert little.driver_current != status.driver_current
+    with pytest.raises(ValueError, match="init=False"):
+        dataclasses.replace(status, stable=True)
+
+    seed_status = SeedStatus(payload[:40], "big")
+    replaced = dataclasses.replace(seed_status, status_bytes=bytes(40))
+    assert replaced == SeedStatus(bytes(40), "big")
+
+
+def test_decode_amplifier_status_batch():
+    np = pytest.importorskip("numpy")
+    rng = random.Random(0)
+    for endian in ["big", "little"]:
+        payloads = [rng.randbytes(64) for _ in range(20)]
+        # a sequence of payloads and one contiguous buffer decode identically
+        columns = decode_amplifier_status_batch(payloads, endian)
+        buffer_columns = decode_amplifier_status_batch(b"".join(payloads), endian)
+        for name, column in columns.items():
+            np.testing.assert_array_equal(column, buffer_columns[name])
+            assert len(column) == len(payloads)
+
+        for row, payload in enumerate(payloads):
+            status = AmplifierStatus(payload, endian)
+            assert bool(columns["stable"][row]) == status.stable
+            assert tuple(columns["driver_current"][row]) == status.driver_current
+            assert tuple(columns["pd_value"][row]) == status.pd_value
+            assert tuple(columns["temperatures"][row]) == status.temperatures
+            system_status = status.system_status
+            assert tuple(columns["pd_protection"][row]) == system_status.pd_protection
+            assert (
+                tuple(columns["temperature_protection"][row])
+                == system_status.temperature_protection
+            )
+            assert bool(columns["system_fault"][row]) == system_status.fault
+            driver_unlock = status.driver_unlock
+            assert (
+                tuple(columns["driver_enable_flag"][row])
+                == driver_unlock.driver_enable_flag
+            )
+            assert bool(columns["interlock"][row]) == driver_unlock.interlock
+            for pd, pd_status in enumerate(status.pd_status):
+                assert bool(columns["pd_fault"][row, pd]) == pd_status.fault
+                assert (
+                    bool(columns["pd_upper_limit_event"][row, pd])
+                    == pd_status.upper_limit_event
+                )
+
+
+def test_decode_seed_status_batch():
+    np = pytest.importorskip("numpy")
+    rng = random.Random(1)
+    payloads = [rng.randbytes(40) for _ in range(20)]
+    columns = decode_seed_status_batch(np.frombuffer(b"".join(payloads), np.uint8))
+    for row, payload in enumerate(payloads):
+        status = SeedStatus(payload, "big")
+        for name in columns:
+            assert columns[name][row] == getattr(status, name)
+
+    with pytest.raises(ValueError, match="not a multiple of the payload length"):
+        decode_seed_status_batch(bytes(41))
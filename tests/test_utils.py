@@ -0,0 +1,136 @@
+import math
+import time
+
+import pytest
+
+from precilaser import PrecilaserBus
+from precilaser.sim import SimulatedSerial, SimulatedSHGAmplifier, VirtualClock
+from precilaser.utils import (
+    SettlingEstimator,
+    SHGTemperatureWaiter,
+    StabilityWindow,
+    wait_until_shg_temperatures_stable,
+)
+
+
+def test_stability_window():
+    window = StabilityWindow(setpoint=40.0, max_deviation=0.02, duration=1.0)
+    assert not window.add(0.0, 40.0)
+    assert not window.add(0.5, 40.01)
+    # the window spans the duration with all samples within range
+    assert window.add(1.0, 40.0)
+    # an out of range sample makes the window unstable until it leaves the window
+    assert not window.add(1.5, 40.05)
+    assert not window.add(2.4, 40.0)
+    assert not window.add(2.6, 40.0)
+    assert window.add(3.5, 40.0)
+
+
+def test_stability_window_slope():
+    window = StabilityWindow(setpoint=40.0, max_deviation=0.1, duration=1.0)
+    for i in range(11):
+        stable = window.add(i * 0.1, 39.95 + 0.009 * i)
+    # within range, but drifting faster than 0.1 C/s
+    assert window.slope == pytest.approx(0.09)
+    assert stable
+    window.max_slope = 0.05
+    assert not window.stable
+
+
+def test_wait_until_shg_temperatures_stable_multiple_amplifiers():
+    clock = VirtualClock()
+    sim = SimulatedSerial(
+        [
+            SimulatedSHGAmplifier(address=0, time_constant=5.0),
+            SimulatedSHGAmplifier(address=1, time_constant=10.0),
+        ],
+        clock=clock,
+    )
+    bus = PrecilaserBus(sim)
+    amplifiers = [bus.shg_amplifier(0), bus.shg_amplifier(1)]
+    with clock.patch():
+        amplifiers[0].shg_temperature = 42.0
+        amplifiers[1].shg_temperature = 38.0
+        tstart = clock.monotonic()
+        wait_until_shg_temperatures_stable(amplifiers, [42.0, 38.0], time_stable=2)
+        elapsed = clock.monotonic() - tstart
+    assert amplifiers[0]._temperatures[1] == pytest.approx(42.0, abs=0.02)
+    assert amplifiers[1]._temperatures[1] == pytest.approx(38.0, abs=0.02)
+    # the slower amplifier settles to a reported (rounded to 0.01 C) temperature
+    # within 0.02 C of a 2 C step after ln(2 / 0.015) time constants, plus the stable
+    # time
+    settle = 10 * math.log(2 / 0.015) + 2
+    assert settle - 0.5 < elapsed < settle + 1
+    # the waiters unsubscribed
+    assert all(
+        len(callbacks) == 0
+        for amplifier in amplifiers
+        for callbacks in amplifier._subscribers.values()
+    )
+
+
+def test_shg_temperature_waiter_timeout():
+    clock = VirtualClock()
+    sim = SimulatedSerial([SimulatedSHGAmplifier(time_constant=100.0)], clock=clock)
+    amplifier = PrecilaserBus(sim).shg_amplifier(0)
+    with clock.patch():
+        amplifier.shg_temperature = 45.0
+        with SHGTemperatureWaiter(amplifier, 45.0) as waiter:
+            with pytest.raises(TimeoutError):
+                waiter.wait(timeout=30)
+            assert not waiter.stable
+            assert waiter.temperature is not None and waiter.temperature < 45.0
+
+
+def test_shg_temperature_waiter_with_background_reader():
+    sim = SimulatedSerial(
+        [SimulatedSHGAmplifier(time_constant=0.2)], clock=time, timeout=0.05
+    )
+    with PrecilaserBus(sim, timeout=0.05) as bus:
+        amplifier = bus.shg_amplifier(0)
+        amplifier.start_reader()
+        amplifier.shg_temperature = 41.0
+        wait_until_shg_temperatures_stable(
+            amplifier, 41.0, temp_stable=0.1, time_stable=0.6, timeout=5
+        )
+        assert amplifier.shg_temperature == pytest.approx(41.0, abs=0.1)
+
+
+def test_settling_estimator_fits_first_order_response():
+    estimator = SettlingEstimator(setpoint=42.0, tolerance=0.02)
+    assert estimator.settle_time is None
+    for i in range(60):
+        t = 100.0 + 0.3 * i
+        estimator.add(t, 42.0 - 2.0 * math.exp(-(t - 100.0) / 8.0))
+    final, amplitude, tau, residual = estimator.fit()
+    assert final == pytest.approx(42.0, abs=1e-3)
+    assert amplitude == pytest.approx(-2.0, abs=1e-3)
+    assert tau == pytest.approx(8.0, rel=1e-3)
+    assert residual < 1e-4
+    assert estimator.settle_time == pytest.approx(100.0 + 8.0 * math.log(100), rel=1e-3)
+    # 17.7 s of samples, settling predicted after 36.8 s
+    assert not estimator.settled
+
+
+def test_early_stop_shortens_stability_wait():
+    def wait(early_stop: bool) -> tuple:
+        clock = VirtualClock()
+        sim = SimulatedSerial(
+            [SimulatedSHGAmplifier(time_constant=10.0, temperature_noise=0.003)],
+            clock=clock,
+        )
+        amplifier = PrecilaserBus(sim).shg_amplifier(0)
+        with clock.patch():
+            amplifier.shg_temperature = 42.0
+            tstart = clock.monotonic()
+            with SHGTemperatureWaiter(
+                amplifier, 42.0, time_stable=10, early_stop=early_stop
+            ) as waiter:
+                waiter.wait()
+                return clock.monotonic() - tstart, waiter.settle_time - tstart
+
+    elapsed, _ = wait(early_stop=False)
+    elapsed_early, settle_time = wait(early_stop=True)
+    # ln(2 / 0.02) = 4.6 time constants
+    assert settle_time == pytest.approx(46, abs=1)
+    assert settle_time <= elapsed_early < elapsed - 5
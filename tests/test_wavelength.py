@@ -0,0 +1,42 @@
+import pytest
+
+from precilaser.wavelength import (
+    WavelengthCalibration,
+    temperature_to_wavelength,
+    wavelength_to_temperature,
+)
+
+PARAMS = (0x03, 0xE8, 0x00, 0xA5, 0xAC, 0x1C)
+
+
+def _reference_wavelength(p, temperature: float) -> float:
+    # bit-shifted parameter math of the seed manual
+    wavelength = ((p[0] << 8) | p[1]) * temperature * 1_000 / 10_000 + (
+        p[2] << 24 | p[3] << 16 | ((p[4] << 8) | p[5])
+    )
+    return wavelength / 10_000
+
+
+def test_calibration_from_params():
+    calibration = WavelengthCalibration.from_params(PARAMS)
+    assert calibration.slope == pytest.approx(0.01)
+    assert calibration.offset == pytest.approx(1085.75)
+    assert isinstance(calibration.wavelength(25.0), float)
+    assert calibration.wavelength(25.0) == pytest.approx(
+        _reference_wavelength(PARAMS, 25.0), abs=1e-9
+    )
+
+
+def test_array_conversion_round_trip():
+    np = pytest.importorskip("numpy")
+    temperatures = np.linspace(20, 40, 101)
+    wavelengths = temperature_to_wavelength(temperatures, PARAMS)
+    assert wavelengths.shape == (101,)
+    assert wavelengths == pytest.approx(
+        [_reference_wavelength(PARAMS, t) for t in temperatures], abs=1e-9
+    )
+    calibration = WavelengthCalibration.from_params(PARAMS)
+    assert wavelength_to_temperature(wavelengths, calibration) == pytest.approx(
+        temperatures, abs=1e-9
+    )
+    assert wavelength_to_temperature([1086.0], PARAMS) == pytest.approx([25.0])